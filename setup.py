@@ -17,7 +17,8 @@ setup(
         "scipy",
         "matplotlib",
         "tqdm",
-        "astropy"
+        "astropy",
+        "h5py"
     ],
     classifiers=[
         "Programming Language :: Python :: 3",
@@ -8,11 +8,33 @@ Modules:
 # Import core functionalities
 from .src.advection import calculate_advection
 from .src.diffusion import calculate_diffusion
-from .src.time_step import calculate_time_step
-from .src.grid import create_grid
+from .src.time_step import calculate_time_step, calculate_cfl_limits, fit_time_step
+from .src.grid import create_grid, grid_dtype
 from .src.initial_conditions import initialize_field
+from .src.remap import read_synoptic_map, remap_synoptic_map, remap_matrices
 from .src.transport_profiles import meridional_flow, differential_rotation
+from .src.sft_operator import SFTOperator, apply_boundary_conditions
+from .src.simulation import Simulation, run
+from .src.axisymmetric import (AxisymmetricOperator, AxisymmetricSimulation, AxisymmetricBMRSource,
+                               longitude_average, check_consistency)
+from .src.decomposition import ProcessBandOperator
+from .src.exponential import ExponentialPropagator, assemble_matrix
+from .src.snapshots import SnapshotWriter, SnapshotReader
+from .src.checkpoint import Checkpointer
+from .src.implicit import ImplicitDiffusion
+from .src.polar_filter import PolarFilter
+from .src.rotation import SpectralRotation
+from .src.multirate import MultiRateScheduler
+from .src.ensemble import EnsembleRunner, EnsembleResult, parameter_grid
+from .src.sources import BMRSource, bipole_field, bipole_centres
+from .src.catalog import BMRCatalog, read_catalog
+from .src.ingest import build_rgo_catalog, read_rgo_file
+from .src.response import ResponseEngine
+from .src.calibration import Calibration, read_polar_flux
 from .analysis.analysis import calculate_usflx, calculate_dm, calculate_polar_field, calculate_polar_flux
+from .analysis.diagnostics import DiagnosticsAccumulator, diagnostic_weights
+from .analysis.batch import CubeAnalyzer, open_cube
+from .analysis.modes import decay_modes, decay_time_map
 from .analysis.visualize import plot_bfly, plot_mag
 
 
@@ -21,15 +43,59 @@ __all__ = [
     "calculate_advection",
     "calculate_diffusion",
     "calculate_time_step",
+    "calculate_cfl_limits",
+    "fit_time_step",
     "create_grid",
+    "grid_dtype",
     "initialize_field",
+    "read_synoptic_map",
+    "remap_synoptic_map",
+    "remap_matrices",
     "meridional_flow",
     "differential_rotation",
+    "SFTOperator",
+    "Simulation",
+    "run",
+    "AxisymmetricOperator",
+    "AxisymmetricSimulation",
+    "AxisymmetricBMRSource",
+    "longitude_average",
+    "check_consistency",
+    "apply_boundary_conditions",
+    "ProcessBandOperator",
+    "ExponentialPropagator",
+    "assemble_matrix",
+    "SnapshotWriter",
+    "SnapshotReader",
+    "Checkpointer",
+    "ImplicitDiffusion",
+    "PolarFilter",
+    "SpectralRotation",
+    "MultiRateScheduler",
+    "EnsembleRunner",
+    "EnsembleResult",
+    "parameter_grid",
+    "BMRSource",
+    "bipole_field",
+    "bipole_centres",
+    "BMRCatalog",
+    "read_catalog",
+    "build_rgo_catalog",
+    "read_rgo_file",
+    "ResponseEngine",
+    "Calibration",
+    "read_polar_flux",
     # Analysis modules
     "calculate_usflx",
     "calculate_dm",
     "calculate_polar_field",
     "calculate_polar_flux",
+    "DiagnosticsAccumulator",
+    "diagnostic_weights",
+    "CubeAnalyzer",
+    "open_cube",
+    "decay_modes",
+    "decay_time_map",
     # Visualization modules
     "plot_bfly",
     "plot_mag"
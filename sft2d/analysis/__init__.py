@@ -7,6 +7,9 @@ Modules:
 
 # Import analysis functionalities
 from .analysis import calculate_usflx, calculate_dm, calculate_polar_field, calculate_polar_flux
+from .diagnostics import DiagnosticsAccumulator, diagnostic_weights
+from .batch import CubeAnalyzer, open_cube
+from .modes import decay_modes, decay_time_map
 from .visualize import plot_bfly, plot_mag
 
 
@@ -16,6 +19,12 @@ __all__ = [
     "calculate_dm",
     "calculate_polar_field",
     "calculate_polar_flux",
+    "DiagnosticsAccumulator",
+    "diagnostic_weights",
+    "CubeAnalyzer",
+    "open_cube",
+    "decay_modes",
+    "decay_time_map",
     # Visualization modules
     "plot_bfly",
     "plot_mag"
@@ -0,0 +1,105 @@
+"""
+batch.py
+
+This module provides a batched analysis of SFT output cubes [time, latitude, longitude].
+The latitude weights and polar cap rows are precomputed once and each metric is evaluated as a
+weighted reduction over a block of snapshots, so that in-memory arrays, memory-mapped `.npy`
+files and HDF5 snapshot files can all be processed block by block without loading the cube.
+
+Functions:
+    - open_cube: Opens a stored cube (.npy as memory map, .h5 through SnapshotReader).
+
+Classes:
+    - CubeAnalyzer: Evaluates the diagnostics of a cube block by block.
+"""
+
+import numpy as np
+
+from .diagnostics import (
+    DIAGNOSTICS,
+    diagnostic_keys,
+    diagnostic_weights,
+    evaluate_diagnostics,
+)
+
+
+def open_cube(path):
+    """
+    Opens a stored SFT output cube without loading it into memory.
+
+    Parameters:
+        path (str): Path to a `.npy` file (opened as a read-only memory map) or to an HDF5 file
+            written by `SnapshotWriter`.
+
+    Returns:
+        np.memmap or SnapshotReader: Object that can be sliced along the time axis.
+    """
+    if str(path).endswith('.npy'):
+        return np.load(path, mmap_mode='r')
+
+    from ..src.snapshots import SnapshotReader
+    return SnapshotReader(path)
+
+
+class CubeAnalyzer:
+    """
+    Batched evaluation of the SFT diagnostics over the time axis of an output cube.
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        chunk_size (int): Number of snapshots read and reduced at a time.
+        **kwargs: Options of `diagnostic_weights` (deg_pol, pol_cap_extent_deg, R_sun).
+    """
+
+    def __init__(self, grid, chunk_size=64, **kwargs):
+        self.grid = grid
+        self.chunk_size = chunk_size
+        self.weights = diagnostic_weights(grid, **kwargs)
+        self.num_phi = grid['longitude'].size
+
+    def analyze(self, cube, time_duration=None, quantities=None):
+        """
+        Evaluates the diagnostics for a range of snapshots of a cube.
+
+        Parameters:
+            cube (np.ndarray, np.memmap, h5py.Dataset or SnapshotReader): 3D data [time, latitude, longitude],
+                or a path accepted by `open_cube` (the file is closed again on return).
+            time_duration (list, optional): First and last snapshot index (inclusive), e.g. [0, 365].
+                Default is the whole cube.
+            quantities (list, optional): Subset of 'usflx', 'dm', 'polar_field', 'polar_flux' and 'bfly'.
+                Default is all of them.
+
+        Returns:
+            dict: One array per diagnostic key, with time as the first axis.
+        """
+        if isinstance(cube, str):
+            # A cube opened here is also closed here
+            cube = open_cube(cube)
+            try:
+                return self.analyze(cube, time_duration, quantities)
+            finally:
+                if hasattr(cube, 'close'):
+                    cube.close()
+
+        quantities = DIAGNOSTICS if quantities is None else tuple(quantities)
+        if time_duration is None:
+            time_duration = [0, cube.shape[0] - 1]
+        time_start = int(time_duration[0])
+        time_end = int(time_duration[1])
+        time_total = time_end - time_start + 1
+
+        results = {}
+        for key in diagnostic_keys(quantities):
+            shape = (time_total, cube.shape[1]) if key == 'bfly' else (time_total,)
+            results[key] = np.zeros(shape)
+
+        for start in range(time_start, time_end + 1, self.chunk_size):
+            stop = min(start + self.chunk_size, time_end + 1)
+            block = np.asarray(cube[start:stop])
+            row_sum = block.sum(axis=-1, dtype=np.float64)
+            abs_row_sum = np.abs(block).sum(axis=-1, dtype=np.float64) if 'usflx' in quantities else None
+
+            values = evaluate_diagnostics(row_sum, abs_row_sum, self.weights, self.num_phi, quantities)
+            for key, value in values.items():
+                results[key][start - time_start:stop - time_start] = value
+        return results
@@ -0,0 +1,208 @@
+"""
+diagnostics.py
+
+This module evaluates the derived quantities of the SFT model (USFLUX, DM, polar field and polar flux,
+butterfly diagram) on the live field during a run, so that only their time series need to be stored.
+
+Functions:
+    - diagnostic_weights: Precomputes the latitude weights and polar cap rows used by the diagnostics.
+    - evaluate_diagnostics: Evaluates the diagnostics from the longitude sums of one or more fields.
+
+Classes:
+    - DiagnosticsAccumulator: Simulation hook that records the diagnostics at a given cadence.
+"""
+
+import numpy as np
+
+from ..src.simulation import Cadence
+
+DIAGNOSTICS = ('usflx', 'dm', 'polar_field', 'polar_flux', 'bfly')
+
+
+def diagnostic_weights(grid, deg_pol=70, pol_cap_extent_deg=20, R_sun=6.98e10):
+    """
+    Precomputes the latitude weights of the diagnostics, consistent with the functions of `analysis.py`.
+
+    All diagnostics are linear in the longitude sums of the field (or of its absolute value),
+    so each one is represented by a weight per latitude row.
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        deg_pol (float): Colatitude (degrees) bounding the polar field averages, as in `calculate_polar_field`.
+        pol_cap_extent_deg (float): Polar cap extent (degrees) of `calculate_polar_flux`.
+        R_sun (float): Solar radius in cm used by `calculate_polar_flux`.
+
+    Returns:
+        dict: Row weights 'usflx', 'dm', 'polar_flux_north', 'polar_flux_south' (1D arrays) and the
+        row slices 'polar_field_north', 'polar_field_south'.
+    """
+    colatitude = grid['colatitude']
+    longitude = grid['longitude']
+    delta_theta = grid['dtheta']
+    delta_phi = grid['dphi']
+    solar_radius = 6.955 * 10**8  # solar radius in meters
+    sin_theta = np.sin(colatitude)
+
+    # calculate_usflx
+    usflx = sin_theta * delta_theta * delta_phi * (solar_radius*1e2)**2
+
+    # compute_axial_dipole_moment (surface radius set to 1)
+    dm = (np.cos(colatitude) * sin_theta * np.abs(colatitude[1] - colatitude[0])
+          * np.abs(longitude[1] - longitude[0]))
+
+    # calculate_polar_field
+    north_end = np.argwhere(colatitude >= np.deg2rad(deg_pol))[0][0]
+    south_start = np.argwhere(colatitude >= np.deg2rad(180-deg_pol))[0][0]
+
+    # calculate_polar_flux
+    dA = (R_sun**2) * sin_theta * delta_theta * delta_phi
+    polar_cap_extent = np.deg2rad(pol_cap_extent_deg)
+    flux_north = np.where(colatitude <= polar_cap_extent, dA, 0.0)
+    flux_south = np.where(colatitude >= np.pi - polar_cap_extent, dA, 0.0)
+
+    return {
+        'usflx': usflx,
+        'dm': dm,
+        'polar_field_north': slice(0, north_end),
+        'polar_field_south': slice(south_start, None),
+        'polar_flux_north': flux_north,
+        'polar_flux_south': flux_south,
+    }
+
+
+def diagnostic_keys(quantities):
+    """
+    Expands the diagnostic quantities into the keys of their time series.
+    """
+    keys = []
+    for quantity in quantities:
+        if quantity in ('polar_field', 'polar_flux'):
+            keys += [quantity + '_north', quantity + '_south']
+        else:
+            keys.append(quantity)
+    return keys
+
+
+def evaluate_diagnostics(row_sum, abs_row_sum, weights, num_phi, quantities=DIAGNOSTICS):
+    """
+    Evaluates the diagnostics from the longitude sums of the field.
+
+    Parameters:
+        row_sum (np.ndarray): Sum of the field over longitude, [..., latitude].
+        abs_row_sum (np.ndarray): Sum of the absolute field over longitude, [..., latitude].
+            Only used for 'usflx' and can be None otherwise.
+        weights (dict): Row weights from `diagnostic_weights`.
+        num_phi (int): Number of longitude points.
+        quantities (list): Diagnostics to evaluate.
+
+    Returns:
+        dict: One entry per diagnostic key, with the leading axes of `row_sum`.
+    """
+    values = {}
+    if 'usflx' in quantities:
+        values['usflx'] = abs_row_sum @ weights['usflx']
+    if 'dm' in quantities:
+        values['dm'] = row_sum @ weights['dm']
+    if 'polar_field' in quantities:
+        for key in ('polar_field_north', 'polar_field_south'):
+            rows = row_sum[..., weights[key]]
+            values[key] = rows.sum(axis=-1) / (rows.shape[-1] * num_phi)
+    if 'polar_flux' in quantities:
+        values['polar_flux_north'] = row_sum @ weights['polar_flux_north']
+        values['polar_flux_south'] = row_sum @ weights['polar_flux_south']
+    if 'bfly' in quantities:
+        values['bfly'] = row_sum / num_phi
+    return values
+
+
+class DiagnosticsAccumulator:
+    """
+    Records the diagnostics of a run directly from the live field.
+
+    The accumulator is a hook for `Simulation.run`: register it as a daily hook for a cadence of one
+    or more days, or as a step hook for sub-daily cadences. Sums are accumulated in float64.
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        cadence (float): Cadence of the diagnostics in days. Default is 1 (daily).
+        quantities (list, optional): Subset of 'usflx', 'dm', 'polar_field', 'polar_flux' and 'bfly'
+            to record. Default is all of them.
+        **kwargs: Options of `diagnostic_weights` (deg_pol, pol_cap_extent_deg, R_sun).
+    """
+
+    def __init__(self, grid, cadence=1, quantities=None, **kwargs):
+        quantities = DIAGNOSTICS if quantities is None else tuple(quantities)
+        unknown = set(quantities) - set(DIAGNOSTICS)
+        if unknown:
+            raise ValueError(f"Unknown diagnostics {sorted(unknown)}, choose from {DIAGNOSTICS}.")
+
+        self.grid = grid
+        self.cadence = cadence
+        self.quantities = quantities
+        self.weights = diagnostic_weights(grid, **kwargs)
+        self.num_phi = grid['longitude'].size
+
+        self._cadence = Cadence(cadence)
+        self._abs_field = None
+        self.time = []
+        self.series = {key: [] for key in diagnostic_keys(quantities)}
+
+    def __call__(self, simulation):
+        """
+        Hook for `Simulation.run`: records the diagnostics if they fall on the cadence.
+        """
+        if self._cadence.due(simulation):
+            self.record(simulation.field, simulation.time)
+
+    def record(self, field, time):
+        """
+        Evaluates the diagnostics on a field and appends them to the time series.
+
+        Parameters:
+            field (np.ndarray): The magnetic field on the grid (2D array, or stacked members [member, theta, phi],
+                which give one value per member).
+            time (float): Simulated time in days.
+        """
+        abs_row_sum = None
+        if 'usflx' in self.quantities:
+            if self._abs_field is None:
+                self._abs_field = np.empty_like(field)
+            np.abs(field, out=self._abs_field)
+            abs_row_sum = self._abs_field.sum(axis=-1, dtype=np.float64)
+        row_sum = field.sum(axis=-1, dtype=np.float64)
+
+        values = evaluate_diagnostics(row_sum, abs_row_sum, self.weights, self.num_phi, self.quantities)
+        for key, value in values.items():
+            self.series[key].append(value)
+        self.time.append(time)
+
+    def state_dict(self):
+        """
+        Returns the recorded time series and the cadence state, for checkpoints (see `Checkpointer`).
+        """
+        return {
+            'time': np.array(self.time),
+            'series': {key: np.array(values) for key, values in self.series.items()},
+            'cadence': self._cadence.state_dict(),
+        }
+
+    def load_state_dict(self, state):
+        """
+        Restores the state returned by `state_dict`.
+        """
+        self.time = list(state['time'])
+        self.series = {key: list(state['series'][key]) for key in self.series}
+        self._cadence.load_state_dict(state.get('cadence', {}))
+
+    def results(self):
+        """
+        Returns the recorded time series.
+
+        Returns:
+            dict: 'time' (days) and one array per recorded quantity, with time as the first axis.
+            The polar quantities are split into '_north' and '_south' entries; 'bfly' is [time, latitude].
+        """
+        results = {'time': np.array(self.time)}
+        for key, values in self.series.items():
+            results[key] = np.array(values)
+        return results
@@ -0,0 +1,162 @@
+"""
+modes.py
+
+This module computes the slowest decay modes of the Solar Surface Flux Transport (SFT) operator, e.g. the
+decay time of the axial dipole for a diffusivity and meridional flow, without simulating years of evolution.
+
+The transport operator of `SFTOperator` (diffusion plus upwind advection, with the pole and periodic boundary
+conditions) is assembled as a sparse matrix L over the interior points (`assemble_matrix`). Its eigenvalues
+closest to zero, i.e. the slowest modes, are found with ARPACK in shift-invert mode, which factorises L once
+and converges in a few iterations. A field evolves as a superposition of the modes, each decaying at the
+rate -Re(lambda) and drifting in longitude at the frequency Im(lambda). The results are cached on disk per
+parameter set, keyed by the hash of the grid and of the operator coefficients.
+
+Functions:
+    - decay_modes: Slowest decay modes and rates of the transport operator for one parameter set.
+    - decay_time_map: Decay times of the axial dipole and of the slowest mode over diffusivities and flow speeds.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.sparse.linalg import eigs
+
+from ..src import transport_profiles
+from ..src.exponential import assemble_matrix
+from ..src.kernels import process_context
+from ..src.response import _digest, _load_cache, _save_cache
+from ..src.sft_operator import SFTOperator, apply_boundary_conditions
+from .diagnostics import diagnostic_weights
+
+# Seconds per year of the decay times
+SECONDS_PER_YEAR = 365.25 * 86400
+
+
+def decay_modes(grid, diffusivity, meridional_flow=None, differential_rotation=None, num_modes=6, shift=1e-12,
+                cache_dir=None):
+    """
+    Computes the slowest decay modes of the transport operator.
+
+    The eigenvalues of the assembled operator closest to `shift` are computed in shift-invert mode
+    and sorted from the slowest to the fastest decay. The small positive default shift keeps the
+    factorisation regular when the operator conserves flux exactly (zero eigenvalue, e.g. without
+    a meridional flow). Each mode is normalised to a largest absolute value of one.
+
+    The axial dipole mode is the mode with the largest dipole moment (see `diagnostic_weights`)
+    per unit field. With a strong meridional flow the two hemispheres decouple, and the dipole and
+    the symmetric mode share the same rate.
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        diffusivity (float): The diffusivity value (e.g., 250 km^2/s).
+        meridional_flow (np.ndarray, optional): Meridional flow profile. Default is `meridional_flow(grid)`.
+        differential_rotation (np.ndarray, optional): Angular velocity profile. Default is
+            `differential_rotation(grid)`.
+        num_modes (int): Number of modes.
+        shift (float): Shift of the shift-invert mode in 1/s.
+        cache_dir (str, optional): Directory of the cached modes. Default is 'modes' in the directory in
+            the environment variable SFT2D_CACHE_DIR, or ~/.cache/sft2d. False disables the disk cache.
+
+    Returns:
+        dict: 'rates' (decay rates in 1/s), 'frequencies' (drift frequencies in rad/s), 'decay_times'
+        (e-folding times in years, infinite for modes that do not decay), 'modes' (complex fields
+        [mode, theta, phi] with the ghost cells), 'dipole' (dipole moment of each mode) and
+        'dipole_decay_time' (years).
+    """
+    if meridional_flow is None:
+        meridional_flow = transport_profiles.meridional_flow(grid)
+    if differential_rotation is None:
+        differential_rotation = transport_profiles.differential_rotation(grid)
+    operator = SFTOperator(grid, diffusivity, meridional_flow, differential_rotation, backend='numpy',
+                           dtype=np.float64)
+    if operator.batch_shape:
+        raise ValueError("The decay modes require a single parameter set (no member axes).")
+
+    coefficients = [operator.coefficients[key] for key in ('centre', 'north', 'south', 'west', 'east')]
+    key = _digest(('decay_modes', grid['colatitude'], grid['longitude'], *coefficients, int(num_modes),
+                   float(shift)))
+    cached = _load_cache(cache_dir, key, 'modes')
+    if cached is None:
+        cached = _compute_modes(grid, operator, num_modes, shift)
+        _save_cache(cache_dir, key, cached, 'modes')
+
+    results = dict(cached)
+    rates = results['rates']
+    # Modes that do not decay (conserved flux) have an infinite decay time
+    results['decay_times'] = np.full(rates.shape, np.inf)
+    np.divide(1.0, rates * SECONDS_PER_YEAR, out=results['decay_times'], where=rates > 0)
+    results['dipole_decay_time'] = results['decay_times'][np.argmax(np.abs(results['dipole']))]
+    return results
+
+
+def _compute_modes(grid, operator, num_modes, shift):
+    matrix = assemble_matrix(operator)
+    eigenvalues, vectors = eigs(matrix, k=num_modes, sigma=shift, which='LM')
+    order = np.argsort(-eigenvalues.real)
+    eigenvalues, vectors = eigenvalues[order], vectors[:, order]
+
+    # Fields with the ghost cells, normalised to a largest value of one (real and positive)
+    num_theta, num_phi = operator.shape
+    modes = np.zeros((num_modes, num_theta, num_phi), dtype=complex)
+    modes[:, 1:-1, 1:-1] = vectors.T.reshape(num_modes, num_theta - 2, num_phi - 2)
+    apply_boundary_conditions(modes)
+    flat = modes.reshape(num_modes, -1)
+    peaks = flat[np.arange(num_modes), np.argmax(np.abs(flat), axis=1)]
+    modes /= peaks[:, np.newaxis, np.newaxis]
+
+    dipole = modes.sum(axis=-1) @ diagnostic_weights(grid)['dm']
+    return {
+        'rates': -eigenvalues.real,
+        'frequencies': eigenvalues.imag,
+        'modes': modes,
+        'dipole': dipole,
+    }
+
+
+def _decay_times(grid, diffusivity, peak_speed, num_modes, shift, cache_dir):
+    results = decay_modes(grid, diffusivity, transport_profiles.meridional_flow(grid, peak_speed),
+                          num_modes=num_modes, shift=shift, cache_dir=cache_dir)
+    return results['dipole_decay_time'], results['decay_times'][0]
+
+
+def decay_time_map(grid, diffusivities, peak_speeds, num_modes=4, shift=1e-12, cache_dir=None, max_workers=1):
+    """
+    Maps the decay times over a grid of diffusivities and meridional flow speeds.
+
+    Each parameter set is analysed with `decay_modes` (default rotation profile), so that parameter
+    sets already analysed are read from the cache.
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        diffusivities (array-like): Diffusivity values.
+        peak_speeds (array-like): Peak speeds of the meridional flow in m/s (see `meridional_flow`).
+        num_modes (int): Number of modes per parameter set.
+        shift (float): Shift of the shift-invert mode in 1/s.
+        cache_dir (str, optional): Directory of the cached modes (see `decay_modes`).
+        max_workers (int, optional): Number of worker processes (spawned, see `process_context`). Default is
+            1 (serial); None uses all CPUs.
+
+    Returns:
+        dict: 'diffusivity' and 'peak_speed' (the axes), 'dipole_decay_time' and 'decay_time' (slowest
+        mode), in years, of shape [diffusivity, peak_speed].
+    """
+    diffusivities = np.asarray(diffusivities, dtype=float)
+    peak_speeds = np.asarray(peak_speeds, dtype=float)
+    settings = [(diffusivity, peak_speed) for diffusivity in diffusivities for peak_speed in peak_speeds]
+
+    if max_workers == 1:
+        times = [_decay_times(grid, diffusivity, peak_speed, num_modes, shift, cache_dir)
+                 for diffusivity, peak_speed in settings]
+    else:
+        with ProcessPoolExecutor(max_workers, mp_context=process_context()) as executor:
+            futures = [executor.submit(_decay_times, grid, diffusivity, peak_speed, num_modes, shift, cache_dir)
+                       for diffusivity, peak_speed in settings]
+            times = [future.result() for future in futures]
+
+    times = np.array(times).reshape(diffusivities.size, peak_speeds.size, 2)
+    return {
+        'diffusivity': diffusivities,
+        'peak_speed': peak_speeds,
+        'dipole_decay_time': times[..., 0],
+        'decay_time': times[..., 1],
+    }
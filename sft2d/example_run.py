@@ -13,7 +13,6 @@
 # Import basic packages for simulation and visualization
 import numpy as np
 import matplotlib.pyplot as plt
-from tqdm import tqdm
 
 # Import packagess from the SFT model (For local installation)
 # Most likely this will also run after a simple clone of the repo. But it is recommended to install the package.
@@ -23,11 +22,8 @@ from src.grid import create_grid
 from src.initial_conditions import initialize_field
 from src.transport_profiles import meridional_flow, differential_rotation
 from src.time_step import calculate_time_step
-from src.diffusion import calculate_diffusion
-from src.advection import calculate_advection
-from analysis.analysis import calculate_usflx, calculate_dm, calculate_polar_field
-from analysis.visualize import plot_bfly
-from analysis.visualize import plot_mag
+from src.simulation import Simulation
+from src.snapshots import SnapshotWriter, SnapshotReader
 
 
 # Import packages from the SFT model (For package installation)
@@ -44,6 +40,7 @@ dr_ = differential_rotation(grid_sft.copy())
 ## Initial magnetic field (dipole)
 ## There is a choice between Dipole or HMI CR map for initial condition
 ## For HMI map, set 'read' in place of 'dipole'.
+## Any synoptic map can be read with path='...', remapped with method='nearest', 'linear' or 'area'.
 field = initialize_field(grid_sft.copy(), 'dipole')
 ## Magnetic diffusivity
 diffusivity = 2.5 * 10**8 # cm^2/s
@@ -90,38 +87,22 @@ num_theta = grid_sft['colatitude'].size
 num_phi = grid_sft['longitude'].size
 
 ## Initialize arrays to store the data
+## The daily maps are streamed to an HDF5 file instead of being kept in memory
 bfly_data = np.zeros((num_days+1,num_theta))
-all_br_data = np.zeros((num_days+1,num_theta,num_phi))
-all_br_data[0,:,:] = field.copy()
-bfly_data[0,:] = np.mean(field,axis=1)
+writer = SnapshotWriter('./sft_output.h5', grid_sft, cadence=1, compression='gzip',
+                        metadata={'diffusivity': diffusivity})
 
-## Define temporary arrays for updating the field
-B_temp = field.copy()
-B_temp_update = np.zeros_like(field)
+## Save the butterfly diagram at the end of every day
+def store_bfly(sim):
+    bfly_data[sim.day,:] = np.mean(sim.field,axis=1)
 
 # Time loop for evolution
-for t in tqdm(range(1,num_days+1),desc='Simulation days: '):
-    delta_t = ts
-    for steps in range(ndt):
-        # Calculate the diffusion term
-        B_temp_diff = calculate_diffusion(B_temp, diffusivity, grid_sft.copy())
-        # Calculate the advection term
-        B_temp_adv = calculate_advection(B_temp, dr_, mf_, grid_sft.copy())
-        
-        # Update magnetic field using all terms
-        B_temp_update = B_temp + delta_t * (1.0*B_temp_diff - 1.0*B_temp_adv)
-
-        # Apply periodic boundary conditions in the phi direction
-        B_temp_update[:, 0] = B_temp_update[:, -2]  # First column matches second-to-last column
-        B_temp_update[:, -1] = B_temp_update[:, 1]  # Last column matches second column
-
-        # Apply open boundary conditions in the theta direction
-        B_temp_update[0, :] = B_temp_update[1, :]    # Northern boundary (pole)
-        B_temp_update[-1, :] = B_temp_update[-2, :]  # Southern boundary (pole)
-        B_temp = B_temp_update.copy()
-    # Save the butterfly diagram
-    bfly_data[t,:] = np.mean(B_temp,axis=1)
-    all_br_data[t,:,:] = B_temp.copy()
+sim = Simulation(grid_sft, field, diffusivity, mf_, dr_, time_step=ts)
+sim.run(num_days, daily_hooks=[store_bfly, writer], progress=True)
+writer.close()
+
+## Lazy access to the stored maps, e.g. all_br_data[5] reads only day 5
+all_br_data = SnapshotReader('./sft_output.h5')
 
 ## Visualize the butterfly diagram (set 1 to run the following script)
 if 0:
@@ -139,8 +120,9 @@ def calc_usflx(all_br_data):
     temp_bsinth = np.zeros_like(all_br_data[0,:,:])
     usflx = np.zeros(num_days+1)
     for i in range(num_days+1):
+        br_day = all_br_data[i]
         for i1 in range(longitude.shape[0]):
-            temp_bsinth[:,i1] = np.abs(all_br_data[i,:,i1]) * np.sin(colatitude)
+            temp_bsinth[:,i1] = np.abs(br_day[:,i1]) * np.sin(colatitude)
         usf_1d = np.sum(temp_bsinth) * delta_theta * delta_phi * (solar_radius*1e2)**2
         usflx[i] = usf_1d
     return usflx
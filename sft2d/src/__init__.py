@@ -10,23 +10,99 @@ Submodules:
     - time_step: Manages time-stepping and the evolution of the magnetic field.
     - grid: Handles grid creation and management.
     - initial_conditions: Provides utilities for setting up initial conditions.
+    - remap: Remapping of synoptic magnetograms onto the grid.
     - transport_profiles: Contains functions for defining transport profiles like meridional flow and differential rotation.
+    - sft_operator: Precomputed grid-bound operator combining the diffusion and advection stencils.
+    - simulation: Time-integration driver that evolves the field in place.
+    - axisymmetric: Reduced longitude-averaged (1D) solver sharing the profiles of the 2D model.
+    - decomposition: Multi-process latitude-band decomposition of the explicit step over shared memory.
+    - exponential: Sparse assembled operator and exact exponential (Krylov) steps.
+    - snapshots: Streaming HDF5 storage of the field snapshots.
+    - checkpoint: Checkpoints and restart of long runs.
+    - implicit: Implicit (ADI) integration of the diffusion term.
+    - polar_filter: Longitudinal Fourier filter of the high-latitude rows.
+    - rotation: Exact (spectral) transport by the differential rotation.
+    - multirate: Multi-rate integration with the phi terms sub-cycled per latitude band.
+    - kernels: Optional compiled (Numba) backend of the stencil step.
+    - ensemble: Parameter sweeps and ensembles of runs over a process pool.
+    - sources: Bipolar magnetic region (BMR) source term.
+    - catalog: Binary-cached, time-sorted catalogs of BMRs.
+    - response: Linear-response predictions of the axisymmetric diagnostics from BMR catalogs.
+    - calibration: Parallel, memoized fit of the transport parameters to observed polar fluxes.
+    - ingest: Parallel, incremental ingest of the yearly RGO/NOAA sunspot files.
 """
 
 # Import core components
 from .advection import calculate_advection
 from .diffusion import calculate_diffusion
-from .time_step import calculate_time_step
-from .grid import create_grid
+from .time_step import calculate_time_step, calculate_cfl_limits, fit_time_step
+from .grid import create_grid, grid_dtype
 from .initial_conditions import initialize_field
+from .remap import read_synoptic_map, remap_synoptic_map, remap_matrices
 from .transport_profiles import meridional_flow, differential_rotation
+from .sft_operator import SFTOperator, apply_boundary_conditions
+from .simulation import Simulation, run
+from .axisymmetric import (AxisymmetricOperator, AxisymmetricSimulation, AxisymmetricBMRSource,
+                           longitude_average, check_consistency)
+from .decomposition import ProcessBandOperator
+from .exponential import ExponentialPropagator, assemble_matrix
+from .snapshots import SnapshotWriter, SnapshotReader
+from .checkpoint import Checkpointer
+from .implicit import ImplicitDiffusion
+from .polar_filter import PolarFilter
+from .rotation import SpectralRotation
+from .multirate import MultiRateScheduler
+from .ensemble import EnsembleRunner, EnsembleResult, parameter_grid
+from .sources import BMRSource, bipole_field, bipole_centres
+from .catalog import BMRCatalog, read_catalog
+from .ingest import build_rgo_catalog, read_rgo_file
+from .response import ResponseEngine
+from .calibration import Calibration, read_polar_flux
 
 __all__ = [
     "calculate_advection",
     "calculate_diffusion",
     "calculate_time_step",
+    "calculate_cfl_limits",
+    "fit_time_step",
     "create_grid",
+    "grid_dtype",
     "initialize_field",
+    "read_synoptic_map",
+    "remap_synoptic_map",
+    "remap_matrices",
     "meridional_flow",
-    "differential_rotation"
+    "differential_rotation",
+    "SFTOperator",
+    "Simulation",
+    "run",
+    "AxisymmetricOperator",
+    "AxisymmetricSimulation",
+    "AxisymmetricBMRSource",
+    "longitude_average",
+    "check_consistency",
+    "apply_boundary_conditions",
+    "ProcessBandOperator",
+    "ExponentialPropagator",
+    "assemble_matrix",
+    "SnapshotWriter",
+    "SnapshotReader",
+    "Checkpointer",
+    "ImplicitDiffusion",
+    "PolarFilter",
+    "SpectralRotation",
+    "MultiRateScheduler",
+    "EnsembleRunner",
+    "EnsembleResult",
+    "parameter_grid",
+    "BMRSource",
+    "bipole_field",
+    "bipole_centres",
+    "BMRCatalog",
+    "read_catalog",
+    "build_rgo_catalog",
+    "read_rgo_file",
+    "ResponseEngine",
+    "Calibration",
+    "read_polar_flux"
 ]
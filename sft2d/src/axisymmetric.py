@@ -0,0 +1,348 @@
+"""
+axisymmetric.py
+
+This module provides a reduced, longitude-averaged (1D) version of the Solar Surface Flux Transport (SFT) model,
+in the spirit of the 1D model of Yeates (2020), for runs that only need the axisymmetric diagnostics (axial
+dipole moment, polar field and polar flux), e.g. screening sweeps over the transport parameters.
+
+For a field that does not depend on longitude the phi terms of the SFT equation vanish, and the explicit step
+of `SFTOperator` reduces to its theta stencil acting on one latitude profile. For any other field the same
+stencil advances the longitude average over the ring of interior columns, since the phi terms of each row add
+up to zero over the ring. The reduced solver evaluates the theta stencil of `SFTOperator` on the profile
+[theta], on the colatitude grid of `create_grid` and with the same diffusivity and meridional flow profiles
+(e.g. `meridional_flow`, built on `vs`), including the pole ghost rows. With the same time step it follows the
+2D explicit run to rounding for axisymmetric fields; its default time step is only limited by the theta terms.
+
+The field of the reduced simulation is exposed as a read-only broadcast of the profile over longitude, so
+that the diagnostics (`DiagnosticsAccumulator`, `calculate_dm`, ...) and the snapshot writers apply unchanged.
+
+Functions:
+    - longitude_average: Longitude average of a field over the ring of interior columns.
+    - check_consistency: Compares the diagnostics of the reduced run with those of the 2D run.
+
+Classes:
+    - AxisymmetricOperator: Theta stencil of the SFT operator acting on latitude profiles.
+    - AxisymmetricSimulation: State and driver of a longitude-averaged run.
+    - AxisymmetricBMRSource: Deposits the longitude averages of the regions of `BMRSource`.
+"""
+
+import time
+
+import numpy as np
+
+from . import transport_profiles
+from .grid import grid_dtype
+from .initial_conditions import initialize_field
+from .multirate import THETA_LIMITS
+from .sft_operator import SFTOperator
+from .simulation import Simulation
+from .sources import BMRSource
+from .time_step import calculate_time_step, fit_time_step
+
+
+def longitude_average(field):
+    """
+    Returns the longitude average of a field over the ring of interior columns.
+
+    Parameters:
+        field (np.ndarray): The magnetic field on the grid (2D array including the ghost cells, optionally
+            stacked along leading axes).
+
+    Returns:
+        np.ndarray: Latitude profile [..., theta], including the pole ghost rows (float64).
+    """
+    return np.asarray(field)[..., 1:-1].mean(axis=-1, dtype=np.float64)
+
+
+def _apply_pole_conditions(profile):
+    # Pole ghost rows copy their neighbour, as in `apply_boundary_conditions`
+    profile[..., 0] = profile[..., 1]
+    profile[..., -1] = profile[..., -2]
+    return profile
+
+
+class AxisymmetricOperator:
+    """
+    Theta stencil (diffusion and meridional advection) of `SFTOperator` acting on latitude profiles.
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        diffusivity (float or np.ndarray): The diffusivity value (e.g., 250 km^2/s), or one value per member.
+        meridional_flow (np.ndarray, optional): Longitude-independent meridional flow profile on the grid,
+            optionally stacked per member. Default is `meridional_flow(grid)`.
+        dtype (np.dtype, optional): Precision of the step (float64 or float32). Default is the precision
+            of the grid.
+    """
+
+    def __init__(self, grid, diffusivity, meridional_flow=None, dtype=None):
+        if meridional_flow is None:
+            meridional_flow = transport_profiles.meridional_flow(grid)
+        self.grid = grid
+        self.diffusivity = diffusivity
+        self.dtype = grid_dtype(grid, dtype)
+        self.shape = (grid['colatitude'].size,)
+
+        coefficients = SFTOperator(grid, diffusivity, meridional_flow, terms=('diffusion_theta', 'advection_theta'),
+                                   backend='numpy', dtype=np.float64).coefficients
+        self.coefficients = {}
+        for key in ('centre', 'north', 'south'):
+            value = coefficients[key]
+            if np.ptp(value, axis=-1).max() > 1e-12 * np.abs(value).max():
+                raise ValueError("The axisymmetric operator requires longitude-independent transport profiles.")
+            self.coefficients[key] = value[..., 0]
+
+        # Leading (member) axes of the coefficients
+        self.batch_shape = np.broadcast_shapes(*(value.shape for value in self.coefficients.values()))[:-1]
+        self._step_dt = None
+        self._step_coefficients = None
+
+    def step_coefficients(self, time_step):
+        """
+        Returns the coefficients of one forward Euler step on the interior rows, cached per time step.
+
+        Parameters:
+            time_step (float): Time step in seconds.
+
+        Returns:
+            dict: 'centre' (including the identity), 'north' and 'south' [..., interior row].
+        """
+        if time_step != self._step_dt:
+            self._step_coefficients = {key: time_step * value for key, value in self.coefficients.items()}
+            self._step_coefficients['centre'] += 1.0
+            for key, value in self._step_coefficients.items():
+                self._step_coefficients[key] = value.astype(self.dtype, copy=False)
+            self._step_dt = time_step
+        return self._step_coefficients
+
+    def advance(self, profile, out, time_step):
+        """
+        Advances the profile by one forward Euler step and sets the pole ghost rows of `out`.
+
+        Parameters:
+            profile (np.ndarray): Latitude profile [..., theta] including the pole ghost rows.
+            out (np.ndarray): Preallocated array of the same shape as `profile` to store the update.
+            time_step (float): Time step in seconds.
+
+        Returns:
+            np.ndarray: The updated profile `out`.
+        """
+        coefficients = self.step_coefficients(time_step)
+        inner = out[..., 1:-1]
+        np.multiply(coefficients['centre'], profile[..., 1:-1], out=inner)
+        inner += coefficients['north'] * profile[..., :-2]
+        inner += coefficients['south'] * profile[..., 2:]
+        return _apply_pole_conditions(out)
+
+
+class AxisymmetricSimulation(Simulation):
+    """
+    State and driver of a longitude-averaged SFT run.
+
+    The simulation is advanced and hooked like `Simulation` (`run`, `advance_day`, `state_dict`, ...).
+    Its state is the latitude `profile`, and `field` is the profile broadcast over longitude (read-only),
+    so that the diagnostics of the 2D runs apply unchanged. Longitude-averaged sources are added with
+    `deposit` (e.g. in a step hook) or with `AxisymmetricBMRSource`.
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        field (np.ndarray): Initial field, either a latitude profile [..., theta] or a field on the grid
+            [..., theta, phi] (e.g. from `initialize_field`), which is averaged over longitude.
+        diffusivity (float or np.ndarray): The diffusivity value (e.g., 250 km^2/s), or one value per member.
+        meridional_flow (np.ndarray, optional): Meridional flow profile, optionally stacked per member.
+            Default is `meridional_flow(grid)`.
+        time_step (float, optional): Time step in seconds. It is rounded to fit exactly into one day.
+            Default is the CFL limited value of the theta terms.
+        cfl_number (float): CFL number used when the time step is not given.
+        flow_scale (float or np.ndarray, optional): Amplitude factor of the meridional flow, or one factor
+            per member.
+        dtype (np.dtype, optional): Precision of the profile and the step (float64 or float32). Default is
+            the precision of the grid.
+    """
+
+    def __init__(self, grid, field, diffusivity, meridional_flow=None, time_step=None, cfl_number=0.4,
+                 flow_scale=None, dtype=None):
+        if meridional_flow is None:
+            meridional_flow = transport_profiles.meridional_flow(grid)
+        if flow_scale is not None:
+            meridional_flow = np.asarray(flow_scale, dtype=float)[..., np.newaxis, np.newaxis] * meridional_flow
+
+        self.grid = grid
+        self.dtype = grid_dtype(grid, dtype)
+        self.diffusivity = diffusivity
+        self.meridional_flow = meridional_flow
+        self.differential_rotation = None
+        self.integrator = 'explicit'
+        self.diffusion = None
+        self.scheduler = None
+        self.rotation = None
+        self.polar_filter = None
+        self.operator = AxisymmetricOperator(grid, diffusivity, meridional_flow, self.dtype)
+
+        if time_step is None:
+            time_step, steps_per_day = calculate_time_step(grid, diffusivity, cfl_number, THETA_LIMITS,
+                                                           meridional_flow)
+        else:
+            time_step, steps_per_day = fit_time_step(time_step)
+        self.time_step = time_step
+        self.steps_per_day = steps_per_day
+
+        # Double buffer for the profile, with the members of all inputs
+        self.num_phi = grid['longitude'].size
+        profile = self._profile_of(field)
+        members = np.broadcast_shapes(profile.shape[:-1], np.shape(diffusivity), np.shape(meridional_flow)[:-2])
+        self._field = np.array(np.broadcast_to(profile, members + profile.shape[-1:]), dtype=self.dtype)
+        self._next = self._field.copy()
+
+        self.day = 0
+        self.step_count = 0
+
+    def _profile_of(self, values):
+        # Latitude profile of a profile or of a field on the grid
+        values = np.asarray(values)
+        num_theta = self.grid['colatitude'].size
+        if values.ndim >= 2 and values.shape[-2:] == (num_theta, self.num_phi):
+            return longitude_average(values)
+        if values.shape[-1:] != (num_theta,):
+            raise ValueError(f"Expected a profile of {num_theta} rows or a field on the grid, got {values.shape}.")
+        return values
+
+    @property
+    def profile(self):
+        """
+        Current latitude profile [..., theta]. This is a live view of the internal buffer.
+        """
+        return self._field
+
+    @property
+    def field(self):
+        """
+        Current field, the profile broadcast over longitude (read-only view).
+        """
+        return np.broadcast_to(self._field[..., np.newaxis], self._field.shape + (self.num_phi,))
+
+    def deposit(self, source):
+        """
+        Adds a longitude-averaged source term to the profile and sets the pole ghost rows.
+
+        Parameters:
+            source (np.ndarray): Latitude profile [..., theta] of the increment, or an increment on the
+                grid [..., theta, phi], which is averaged over longitude.
+        """
+        self._field += self._profile_of(source)
+        _apply_pole_conditions(self._field)
+
+    def step(self):
+        """
+        Advances the profile by one sub-step.
+        """
+        self.operator.advance(self._field, self._next, self.time_step)
+        self._field, self._next = self._next, self._field
+        self.step_count += 1
+
+
+class AxisymmetricBMRSource(BMRSource):
+    """
+    Deposits the longitude averages of the regions of `BMRSource` into latitude profiles.
+
+    The regions are evaluated with the footprints of `BMRSource` (same options and quantisation of the
+    centre longitudes), and their sum over the ring of interior columns is spread evenly over longitude.
+    As a hook for `AxisymmetricSimulation.run`, the source deposits the regions of `regions` whose
+    emergence time falls between the previous call and the current simulation time.
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        regions (dict or np.ndarray, optional): Table of regions (see `BMRSource`).
+        **kwargs: Further options of `BMRSource`.
+    """
+
+    def __call__(self, simulation):
+        """
+        Hook for `AxisymmetricSimulation.run`: deposits the regions that emerged since the previous call.
+        """
+        batch = self._emerged(simulation)
+        if batch is not None:
+            self.deposit(simulation.profile, batch['latitude'], batch['longitude'], batch['flux'],
+                         batch['tilt'], batch['separation'], batch.get('width'))
+
+    def deposit(self, profile, latitude, longitude, flux, tilt, separation, width=None):
+        """
+        Adds the longitude averages of one or several regions to a profile in place.
+
+        Parameters:
+            profile (np.ndarray): Latitude profile [..., theta] including the pole ghost rows.
+            latitude, longitude, flux, tilt, separation, width: Regions as for `BMRSource.deposit`.
+
+        Returns:
+            np.ndarray: The updated profile.
+        """
+        latitude, longitude, flux, tilt, separation = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(value, dtype=float)) for value in (latitude, longitude, flux, tilt, separation)))
+        width = np.broadcast_to(self.width if width is None else width, latitude.shape)
+
+        position = np.round(np.radians(longitude % 360.0) / self.grid['dphi'] * self.subcells) / self.subcells
+        fractions = position - np.floor(position)
+        for index in range(latitude.size):
+            rows, _, values = self.footprint(latitude[index], tilt[index], separation[index], width[index],
+                                             fractions[index])
+            profile[..., rows] += flux[index] * values.sum(axis=-1) / self._num_ring
+        return _apply_pole_conditions(profile)
+
+
+def check_consistency(grid, diffusivity, num_days=365, field=None, regions=None, meridional_flow=None,
+                      same_time_step=True, **kwargs):
+    """
+    Runs the reduced and the 2D (explicit) model side by side and compares their daily diagnostics.
+
+    The diagnostics of both runs are evaluated on the longitude average over the ring of interior
+    columns, which the reduced model advances. (The diagnostics of a 2D run also count the two
+    periodic ghost columns, which differ from the average while a region has not spread in longitude.)
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        diffusivity (float): The diffusivity value (e.g., 250 km^2/s).
+        num_days (int): Number of days to run.
+        field (np.ndarray, optional): Initial field on the grid. Default is the 'dipole' initial field.
+        regions (dict or np.ndarray, optional): Table of regions deposited by both runs (see `BMRSource`).
+        meridional_flow (np.ndarray, optional): Meridional flow profile. Default is `meridional_flow(grid)`.
+        same_time_step (bool): If True, the reduced run uses the time step of the 2D run, so that the
+            two only differ by rounding and by the non-axisymmetric part of the field. Otherwise it uses
+            its own (theta limited) default time step.
+        **kwargs: Further options of `Simulation` (e.g. backend, rotation).
+
+    Returns:
+        dict: 'difference' (largest difference of each diagnostic relative to its peak in the 2D run),
+        'axisymmetric' and 'full' (the daily diagnostics of both runs), and 'seconds' (wall-clock time of
+        each run).
+    """
+    from ..analysis.diagnostics import DiagnosticsAccumulator
+
+    if field is None:
+        field = initialize_field(grid)
+    full = Simulation(grid, field, diffusivity, meridional_flow, time_step=kwargs.pop('time_step', None), **kwargs)
+    reduced = AxisymmetricSimulation(grid, field, diffusivity, meridional_flow,
+                                     time_step=full.time_step if same_time_step else None)
+
+    num_phi = grid['longitude'].size
+    results = {}
+    seconds = {}
+    for name, simulation, source in (('full', full, BMRSource(grid, regions)),
+                                     ('axisymmetric', reduced, AxisymmetricBMRSource(grid, regions))):
+        accumulator = DiagnosticsAccumulator(grid, quantities=('dm', 'polar_field', 'polar_flux'))
+
+        def record(simulation, accumulator=accumulator):
+            average = longitude_average(simulation.field)
+            accumulator.record(np.broadcast_to(average[..., np.newaxis], average.shape + (num_phi,)), simulation.time)
+
+        start = time.perf_counter()
+        simulation.run(num_days, daily_hooks=[record], step_hooks=[source])
+        seconds[name] = time.perf_counter() - start
+        results[name] = accumulator.results()
+    full.close()
+
+    difference = {}
+    for key, series in results['full'].items():
+        if key != 'time':
+            scale = np.abs(series).max()
+            difference[key] = np.abs(results['axisymmetric'][key] - series).max() / (scale if scale > 0 else 1.0)
+    return {'difference': difference, 'axisymmetric': results['axisymmetric'], 'full': results['full'],
+            'seconds': seconds}
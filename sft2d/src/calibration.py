@@ -0,0 +1,450 @@
+"""
+calibration.py
+
+This module fits the transport parameters (diffusivity, meridional flow speed) and the scalings of the source
+regions (flux and tilt) of the Solar Surface Flux Transport (SFT) model to observed polar fluxes, e.g. the
+yearly series of `test_data/Polar_flux_data` (`PolarN_obs.dat`, `PolarS_obs.dat`).
+
+A candidate parameter set is evaluated by a forward run driven by a dated catalog of bipolar magnetic regions
+(`BMRCatalog`). The field is stored at the observation times and the polar fluxes are computed with
+`calculate_polar_flux`; the misfit is the mean squared normalised residual over both hemispheres.
+
+All candidates start from one spin-up run over the first years of the catalog with reference parameters. Its
+final state is written as a checkpoint (`Checkpointer`) and every forward run continues from it, so that the
+spin-up is computed once per setup. Forward runs are memoized on disk by the hash of the setup and of their
+parameters, and the candidates of a batch are evaluated in parallel over a process pool. `Calibration.fit`
+is a compass search in the logarithm of the parameters: every iteration evaluates the neighbours of the best
+point along each axis together, and repeated points are read from the memo.
+
+Functions:
+    - read_polar_flux: Reads an observed polar flux series (fractional year, flux, error).
+
+Classes:
+    - Calibration: Misfit of candidate parameter sets against observed polar fluxes, and its minimisation.
+
+Constants:
+    - PARAMETERS: Names and reference values of the calibrated parameters.
+"""
+
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import transport_profiles
+from .axisymmetric import AxisymmetricBMRSource, AxisymmetricSimulation
+from .catalog import CATALOG_EPOCH
+from .checkpoint import Checkpointer
+from .kernels import process_context
+from .response import _cache_path, _digest, _load_cache, _save_cache
+from .simulation import Simulation
+from .sources import BMRSource
+
+# Calibrated parameters and their reference values
+PARAMETERS = {
+    'diffusivity': 2.5e8,
+    'peak_speed': 15.0,
+    'flux_scale': 1.0,
+    'tilt_scale': 1.0,
+}
+
+# Forward models
+MODELS = ('full', 'axisymmetric')
+
+# Read-only inputs shared with the worker processes
+_shared = {}
+
+
+def read_polar_flux(path):
+    """
+    Reads an observed polar flux series.
+
+    Parameters:
+        path (str): Path of a whitespace separated table with the columns fractional year, flux (Mx)
+            and its error (Mx), e.g. `test_data/Polar_flux_data/PolarN_obs.dat`.
+
+    Returns:
+        dict: 'year', 'flux' and 'error' arrays.
+    """
+    table = np.loadtxt(path, ndmin=2)
+    return {'year': table[:, 0], 'flux': table[:, 1], 'error': table[:, 2]}
+
+
+def _days_of_year(year):
+    # Days since CATALOG_EPOCH of fractional years, from the length of each calendar year
+    year = np.asarray(year, dtype=float)
+    whole = np.floor(year).astype(np.int64)
+    start = (whole - 1970).astype('datetime64[Y]').astype('datetime64[s]')
+    length = ((whole - 1969).astype('datetime64[Y]').astype('datetime64[s]') - start).astype(float)
+    return (start - CATALOG_EPOCH).astype(float) / 86400 + (year - whole) * length / 86400
+
+
+def _init_worker(shared):
+    _shared.clear()
+    _shared.update(shared)
+
+
+def _scaled_regions(regions, parameters):
+    # Signed flux from the polarity of the cycle (Hale's law), scaled with the tilt
+    regions = dict(regions)
+    regions['flux'] = regions['flux'] * regions['polarity'] * parameters['flux_scale']
+    regions['tilt'] = regions['tilt'] * parameters['tilt_scale']
+    return regions
+
+
+def _build_simulation(field, parameters):
+    # Simulation and source hook of a forward run with the given parameters
+    grid = _shared['grid']
+    flow = transport_profiles.meridional_flow(grid, parameters['peak_speed'])
+    if _shared['model'] == 'axisymmetric':
+        simulation = AxisymmetricSimulation(grid, field, parameters['diffusivity'], flow, **_shared['options'])
+        source_type = AxisymmetricBMRSource
+    else:
+        simulation = Simulation(grid, field, parameters['diffusivity'], flow, **_shared['options'])
+        source_type = BMRSource
+    return simulation, source_type
+
+
+def _forward(index, parameters):
+    # Runs one candidate in a worker from the spin-up field; returns the polar fluxes at the observation days
+    try:
+        from ..analysis.analysis import calculate_polar_flux
+
+        grid = _shared['grid']
+        simulation, source_type = _build_simulation(_shared['spin_up_field'], parameters)
+        source = source_type(grid, _scaled_regions(_shared['regions'], parameters))
+        days = _shared['days']
+        snapshots = []
+
+        def store(simulation):
+            while len(snapshots) < days.size and simulation.day >= days[len(snapshots)]:
+                snapshots.append(np.array(simulation.field, dtype=np.float64))
+
+        simulation.run(int(days[-1]), daily_hooks=[store], step_hooks=[source])
+        simulation.close()
+        if not np.all(np.isfinite(simulation.field)):
+            raise FloatingPointError("The field is not finite at the end of the run.")
+        north, south = calculate_polar_flux(np.array(snapshots), grid, [0, len(snapshots) - 1],
+                                            **_shared['flux_options'])
+        return index, {'north': np.atleast_1d(north), 'south': np.atleast_1d(south)}, None
+    except Exception:
+        return index, None, traceback.format_exc()
+
+
+class Calibration:
+    """
+    Misfit of the SFT model against observed polar fluxes, and its minimisation over the parameters.
+
+    The run starts at `start_year` from `initial_field`. A spin-up with the `reference` parameters covers
+    the first `spin_up_years`; every candidate continues from its final state (written as a checkpoint)
+    with its own parameters and the regions that emerge later. Observations before the end of the
+    spin-up are left out of the misfit. The parameters of a candidate are those of `PARAMETERS`:
+    'diffusivity', 'peak_speed' (meridional flow), and 'flux_scale' and 'tilt_scale' (factors of the
+    flux and tilt of the regions); missing entries are taken from `reference`.
+
+    The misfit is the mean of ((model - observed) / error)^2 over the observations of both hemispheres.
+    Forward runs are memoized in `cache_dir` (key: grid, catalog window, observations, options, spin-up
+    and parameters), so that repeated candidates and refits with the same setup are not run again.
+
+    Example:
+        catalog = BMRCatalog.load('sunspot_data_rgo_1901_2025.csv')
+        calibration = Calibration(grid, catalog, read_polar_flux('PolarN_obs.dat'),
+                                  read_polar_flux('PolarS_obs.dat'), start_year=1901.8, max_workers=8)
+        best = calibration.fit({'diffusivity': 2.5e8, 'peak_speed': 15.0, 'flux_scale': 1.0})
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        catalog (BMRCatalog): Dated catalog of regions (emergence times in days since `CATALOG_EPOCH`).
+        north (dict): Observed northern polar flux, 'year', 'flux' and 'error' (see `read_polar_flux`).
+        south (dict): Observed southern polar flux.
+        start_year (float): Fractional year of the start of the runs.
+        end_year (float, optional): Fractional year of the end of the fit. Default is the last observation.
+        spin_up_years (float): Length of the shared spin-up in years (0 for none).
+        reference (dict, optional): Parameters of the spin-up and defaults of the candidates. Default is
+            `PARAMETERS`.
+        initial_field (np.ndarray, optional): Field at `start_year`. Default is no field.
+        model (str): Forward model, 'full' (`Simulation`) or 'axisymmetric' (`AxisymmetricSimulation`, which
+            evolves the longitude average and is much faster).
+        options (dict, optional): Further keyword arguments of the simulations (e.g. backend, time_step).
+        cache_dir (str, optional): Directory of the memoized runs and the spin-up checkpoints. Default is
+            'calibration' in the directory in the environment variable SFT2D_CACHE_DIR, or ~/.cache/sft2d.
+            False disables the memo on disk (the spin-up is then kept in memory).
+        max_workers (int, optional): Number of worker processes. Default is the number of CPUs.
+            With 1 the runs are executed in the calling process. The workers are spawned (see
+            `process_context`), so a script should fit under `if __name__ == '__main__':`.
+        **kwargs: Options of `calculate_polar_flux` (pol_cap_extent_deg, R_sun).
+    """
+
+    def __init__(self, grid, catalog, north, south, start_year, end_year=None, spin_up_years=10.0,
+                 reference=None, initial_field=None, model='full', options=None, cache_dir=None,
+                 max_workers=None, **kwargs):
+        if model not in MODELS:
+            raise ValueError(f"model must be one of {list(MODELS)}.")
+        self.grid = grid
+        self.model = model
+        self.options = dict(options or {})
+        self.reference = self._complete(reference or {}, PARAMETERS)
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.flux_options = dict(kwargs)
+
+        start = float(_days_of_year(start_year))
+        spin_up_days = int(round(spin_up_years * 365.25))
+        if end_year is None:
+            end_year = max(np.max(north['year']), np.max(south['year']))
+        num_days = int(np.ceil(float(_days_of_year(end_year)) - start))
+        if num_days <= spin_up_days:
+            raise ValueError("The fit ends before the end of the spin-up.")
+        self.start = start
+        self.spin_up_days = spin_up_days
+        self.num_days = num_days
+
+        # Observations after the spin-up, at whole days since the end of the spin-up
+        self.observations = {}
+        for name, series in (('north', north), ('south', south)):
+            day = np.round(_days_of_year(series['year']) - start - spin_up_days).astype(np.int64)
+            keep = (day > 0) & (day <= num_days - spin_up_days) & np.isfinite(series['flux'])
+            self.observations[name] = {'year': np.asarray(series['year'], dtype=float)[keep], 'day': day[keep],
+                                       'flux': np.asarray(series['flux'], dtype=float)[keep],
+                                       'error': np.asarray(series['error'], dtype=float)[keep]}
+        self._days = np.unique(np.concatenate([series['day'] for series in self.observations.values()]))
+        if self._days.size == 0:
+            raise ValueError("No observation falls between the end of the spin-up and the end of the fit.")
+
+        self._regions = catalog.regions(start, start + num_days)
+        num_theta, num_phi = grid['colatitude'].size, grid['longitude'].size
+        self._initial_field = (np.zeros((num_theta, num_phi)) if initial_field is None
+                               else np.asarray(initial_field, dtype=float))
+        self._setup = _digest(('calibration', grid['colatitude'], grid['longitude'], self._regions['time'],
+                               self._regions['latitude'], self._regions['longitude'], self._regions['flux'],
+                               self._regions['tilt'], self._regions['separation'], self._initial_field, model,
+                               sorted(self.options.items()), sorted(self.flux_options.items()), spin_up_days,
+                               sorted(self.reference.items()), self._days))
+        self._memo = {}
+        self._spin_up_field = None
+
+    @staticmethod
+    def _complete(parameters, defaults):
+        unknown = set(parameters) - set(PARAMETERS)
+        if unknown:
+            raise ValueError(f"Unknown parameters {sorted(unknown)}, choose from {list(PARAMETERS)}.")
+        return {name: float(parameters.get(name, defaults[name])) for name in PARAMETERS}
+
+    def _shared_inputs(self):
+        spin_up = self.spin_up()
+        return {
+            'grid': self.grid,
+            'model': self.model,
+            'options': self.options,
+            'flux_options': self.flux_options,
+            'spin_up_field': spin_up,
+            'regions': self._spin_up_regions(False),
+            'days': self._days,
+        }
+
+    def _spin_up_regions(self, during):
+        # Regions of the spin-up, or of the forward runs with times since the end of the spin-up
+        regions = dict(self._regions)
+        inside = regions['time'] < self.spin_up_days
+        keep = inside if during else ~inside
+        regions = {name: values[keep] for name, values in regions.items()}
+        if not during:
+            regions['time'] = regions['time'] - self.spin_up_days
+        return regions
+
+    def spin_up(self):
+        """
+        Returns the field at the end of the spin-up, from its checkpoint if it has been run before.
+
+        Returns:
+            np.ndarray: The field (float64).
+        """
+        if self._spin_up_field is not None:
+            return self._spin_up_field
+        path = _cache_path(self.cache_dir, self._setup, 'calibration')
+        path = None if path is None else path[:-len('.npz')] + '-spin-up.npz'
+        if path is not None and os.path.exists(path):
+            with np.load(path) as data:
+                self._spin_up_field = np.array(data['simulation/field'], dtype=np.float64)
+            return self._spin_up_field
+
+        _init_worker({'grid': self.grid, 'model': self.model, 'options': self.options})
+        simulation, source_type = _build_simulation(self._initial_field, self.reference)
+        source = source_type(self.grid, _scaled_regions(self._spin_up_regions(True), self.reference))
+        simulation.run(self.spin_up_days, step_hooks=[source])
+        simulation.close()
+        if path is not None and self.spin_up_days > 0:
+            try:
+                Checkpointer(path, every_days=self.spin_up_days, objects={'sources': source}).save(simulation)
+            except OSError:
+                pass  # The checkpoint is optional, e.g. on a read-only file system
+        self._spin_up_field = np.array(simulation.field, dtype=np.float64)
+        return self._spin_up_field
+
+    def _key(self, parameters):
+        return _digest((self._setup, sorted(parameters.items())))
+
+    def forward(self, parameters):
+        """
+        Returns the modelled polar fluxes of a candidate at the observation times (memoized).
+
+        Parameters:
+            parameters (dict): Candidate parameters (see `PARAMETERS`).
+
+        Returns:
+            dict: 'north' and 'south', the modelled polar fluxes (Mx) at the observations.
+        """
+        return self.evaluate_forward([parameters])[0]
+
+    def evaluate_forward(self, candidates, progress=False):
+        """
+        Runs the forward model of several candidates in parallel, skipping the memoized ones.
+
+        Parameters:
+            candidates (list): Candidate parameter sets (dicts).
+            progress (bool): If True, shows a progress bar over the completed runs (requires tqdm).
+
+        Returns:
+            list: The modelled polar fluxes of each candidate (see `forward`).
+        """
+        candidates = [self._complete(candidate, self.reference) for candidate in candidates]
+        keys = [self._key(candidate) for candidate in candidates]
+        pending = {}
+        for key, candidate in zip(keys, candidates):
+            if key in self._memo or key in pending:
+                continue
+            cached = _load_cache(self.cache_dir, key, 'calibration')
+            if cached is not None:
+                self._memo[key] = cached
+            else:
+                pending[key] = candidate
+
+        if pending:
+            shared = self._shared_inputs()
+            order = list(pending)
+            if self.max_workers == 1:
+                _init_worker(shared)
+                completed = (_forward(index, pending[key]) for index, key in enumerate(order))
+            else:
+                executor = ProcessPoolExecutor(self.max_workers, mp_context=process_context(),
+                                               initializer=_init_worker, initargs=(shared,))
+                futures = [executor.submit(_forward, index, pending[key]) for index, key in enumerate(order)]
+                completed = (future.result() for future in futures)
+            if progress:
+                from tqdm import tqdm
+                completed = tqdm(completed, total=len(order), desc='Forward runs: ')
+
+            errors = {}
+            try:
+                for index, output, error in completed:
+                    if error is None:
+                        key = order[index]
+                        self._memo[key] = self._at_observations(output)
+                        _save_cache(self.cache_dir, key, self._memo[key], 'calibration')
+                    else:
+                        errors[index] = error
+            finally:
+                if self.max_workers != 1:
+                    executor.shutdown(cancel_futures=True)
+            if errors:
+                index, error = next(iter(errors.items()))
+                raise RuntimeError(f"The forward run of {pending[order[index]]} failed:\n{error}")
+
+        return [self._memo[key] for key in keys]
+
+    def _at_observations(self, output):
+        # Model values of each hemisphere at its own observation days
+        return {name: output[name][np.searchsorted(self._days, series['day'])]
+                for name, series in self.observations.items()}
+
+    def misfit(self, modelled):
+        """
+        Returns the mean squared normalised residual of modelled polar fluxes.
+
+        Parameters:
+            modelled (dict): 'north' and 'south' fluxes at the observations (see `forward`).
+
+        Returns:
+            float: The misfit.
+        """
+        residuals = [(modelled[name] - series['flux']) / series['error'] for name, series in self.observations.items()]
+        return float(np.mean(np.concatenate(residuals)**2))
+
+    def evaluate(self, candidates, progress=False):
+        """
+        Returns the misfit of each candidate, running the forward models in parallel.
+
+        Parameters:
+            candidates (list): Candidate parameter sets (dicts), e.g. from `parameter_grid`.
+            progress (bool): If True, shows a progress bar over the completed runs (requires tqdm).
+
+        Returns:
+            np.ndarray: Misfit of each candidate.
+        """
+        return np.array([self.misfit(modelled) for modelled in self.evaluate_forward(candidates, progress)])
+
+    def fit(self, initial=None, steps=None, bounds=None, max_iterations=20, min_step=0.01, progress=False):
+        """
+        Minimises the misfit with a parallel compass search in the logarithm of the parameters.
+
+        Every iteration evaluates the 2 * n neighbours of the best point (one step up and down along each
+        fitted parameter) in one parallel batch. The best point moves to the best neighbour if it improves
+        the misfit, otherwise the steps are halved. The search stops when all steps are below `min_step`.
+
+        Parameters:
+            initial (dict, optional): Starting point; its keys are the fitted parameters. Default is
+                'diffusivity', 'peak_speed' and 'flux_scale' at their reference values.
+            steps (dict, optional): Initial steps of the fitted parameters, as factors in log space
+                (e.g. 0.3 is a factor exp(0.3)). Default is 0.3 for every fitted parameter.
+            bounds (dict, optional): (lower, upper) bounds of fitted parameters.
+            max_iterations (int): Maximum number of iterations.
+            min_step (float): Smallest step in log space.
+            progress (bool): If True, shows a progress bar over the iterations and writes the best point
+                of every iteration (requires tqdm).
+
+        Returns:
+            dict: 'parameters' (best candidate), 'misfit', 'modelled' (its polar fluxes) and 'history'
+            (best candidate and misfit of every iteration).
+        """
+        if initial is None:
+            initial = {name: self.reference[name] for name in ('diffusivity', 'peak_speed', 'flux_scale')}
+        names = list(initial)
+        self._complete(initial, self.reference)
+        steps = {name: 0.3 for name in names} if steps is None else {name: float(steps[name]) for name in names}
+        bounds = dict(bounds or {})
+
+        def clip(candidate):
+            for name, (lower, upper) in bounds.items():
+                candidate[name] = float(np.clip(candidate[name], lower, upper))
+            return candidate
+
+        best = clip({name: float(value) for name, value in initial.items()})
+        best_misfit = self.evaluate([best])[0]
+        history = [(dict(best), best_misfit)]
+        iterations = range(max_iterations)
+        if progress:
+            from tqdm import tqdm
+            iterations = tqdm(iterations, desc='Iterations: ')
+        for _ in iterations:
+            if max(steps.values()) < min_step:
+                break
+            neighbours = []
+            for name in names:
+                for sign in (1.0, -1.0):
+                    candidate = dict(best)
+                    candidate[name] = float(best[name] * np.exp(sign * steps[name]))
+                    neighbours.append(clip(candidate))
+            misfits = self.evaluate(neighbours)
+            index = int(np.argmin(misfits))
+            if misfits[index] < best_misfit:
+                best, best_misfit = neighbours[index], misfits[index]
+            else:
+                steps = {name: 0.5 * step for name, step in steps.items()}
+            history.append((dict(best), best_misfit))
+            if progress:
+                iterations.write(f"misfit {best_misfit:.4g} at {best}")
+        if progress:
+            iterations.close()
+
+        return {'parameters': best, 'misfit': best_misfit, 'modelled': self.forward(best), 'history': history}
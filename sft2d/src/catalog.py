@@ -0,0 +1,311 @@
+"""
+catalog.py
+
+This module reads catalogs of bipolar magnetic regions (BMRs) for emergence-driven runs of the Solar Surface
+Flux Transport (SFT) model: the tab-separated RGO/NOAA table (`sunspot_data_rgo_1901_2025.csv`) and the
+whitespace separated cycle tables (`test_data/SC_*.txt`, `test_data/SSN_*.dat`).
+
+A source file is parsed once into typed columns sorted by emergence time and cached on disk as an `.npz`
+file keyed by the hash of its content, so that later loads (e.g. by every run of an ensemble) only read the
+binary columns. The regions that emerge in a time window are found by binary search on the sorted times.
+
+Functions:
+    - read_catalog: Parses a catalog file into typed columns.
+
+Classes:
+    - BMRCatalog: Time-sorted, columnar table of regions with window queries.
+
+Constants:
+    - CATALOG_COLUMNS: Names and types of the catalog columns.
+    - CATALOG_EPOCH: Origin of the emergence times of dated catalogs.
+"""
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+# Columns of a catalog: emergence time in days, fractional year (NaN if undated), phase (e.g. rotation
+# index), latitude and longitude (degrees), unsigned flux (Mx), tilt and separation (degrees), spot area
+# (millionths of a hemisphere, NaN if unknown), group number (-1 if unknown) and polarity (sign of the flux
+# in the source file, e.g. the leading polarity in the north of the cycle for the RGO/NOAA table)
+CATALOG_COLUMNS = (
+    ('time', np.float64),
+    ('year', np.float64),
+    ('phase', np.float64),
+    ('latitude', np.float64),
+    ('longitude', np.float64),
+    ('flux', np.float64),
+    ('tilt', np.float64),
+    ('separation', np.float64),
+    ('area', np.float64),
+    ('group', np.int64),
+    ('polarity', np.float64),
+)
+CATALOG_EPOCH = np.datetime64('1900-01-01T00:00:00', 's')
+
+# Version of the cached layout, part of the cache key
+_CACHE_VERSION = 2
+
+# Header names of the columns of the RGO/NOAA table
+_RGO_COLUMNS = {
+    'phase': 'PHASE',
+    'latitude': 'Latitude',
+    'longitude': 'Longitude',
+    'tilt': 'TILT',
+    'separation': 'RADIUS',
+    'area': 'Spot_Area',
+    'group': 'GSG/NOAA',
+}
+
+
+def _fractional_year(dates):
+    # Fractional year of datetime64 values, from the length of each calendar year
+    year = dates.astype('datetime64[Y]')
+    start = year.astype('datetime64[s]')
+    length = (year + 1).astype('datetime64[s]') - start
+    return year.astype(float) + 1970 + (dates - start) / length
+
+
+def _read_rgo(path):
+    with open(path) as file:
+        header = file.readline().strip().split('\t')
+    table = np.loadtxt(path, dtype=str, delimiter='\t', skiprows=1, ndmin=2)
+    index = {name: position for position, name in enumerate(header)}
+
+    dates = table[:, index['Date']].astype('datetime64[s]')
+    columns = {name: table[:, index[label]].astype(float) for name, label in _RGO_COLUMNS.items()}
+    columns['group'] = columns['group'].astype(np.int64)
+    columns['time'] = (dates - CATALOG_EPOCH) / np.timedelta64(1, 'D')
+    columns['year'] = _fractional_year(dates)
+    columns['flux'] = np.abs(table[:, index['USFLUX']].astype(float))
+    columns['polarity'] = np.sign(table[:, index['USFLUX']].astype(float))
+    return columns
+
+
+def _read_cycle_table(path, rotation_period, flux_unit):
+    # Columns: phase, latitude, tilt, separation, longitude, unsigned flux in units of `flux_unit`
+    table = np.loadtxt(path, ndmin=2)
+    num_rows = table.shape[0]
+    return {
+        'time': table[:, 0] * rotation_period,
+        'year': np.full(num_rows, np.nan),
+        'phase': table[:, 0],
+        'latitude': table[:, 1],
+        'tilt': table[:, 2],
+        'separation': table[:, 3],
+        'longitude': table[:, 4],
+        'flux': np.abs(table[:, 5]) * flux_unit,
+        'area': np.full(num_rows, np.nan),
+        'group': np.full(num_rows, -1, dtype=np.int64),
+        'polarity': np.sign(table[:, 5]),
+    }
+
+
+def read_catalog(path, rotation_period=28.0, flux_unit=1e16, drop_empty=True):
+    """
+    Parses a catalog file into typed columns sorted by emergence time.
+
+    Files whose first line holds the header of the RGO/NOAA table are read as such: the emergence
+    time is taken from the 'Date' column in days since `CATALOG_EPOCH`. Other files are read as
+    cycle tables of six numeric columns (phase, latitude, tilt, separation, longitude and flux),
+    with the emergence time at `phase * rotation_period` days.
+
+    Parameters:
+        path (str): Path of the catalog file.
+        rotation_period (float): Days per phase of a cycle table.
+        flux_unit (float): Flux unit of a cycle table in Mx.
+        drop_empty (bool): If True, regions without flux or separation are left out.
+
+    Returns:
+        dict: One array per column of `CATALOG_COLUMNS`.
+    """
+    with open(path) as file:
+        first_line = file.readline()
+    if 'USFLUX' in first_line.strip().split('\t'):
+        columns = _read_rgo(path)
+    else:
+        columns = _read_cycle_table(path, rotation_period, flux_unit)
+
+    keep = np.ones(columns['time'].size, dtype=bool)
+    if drop_empty:
+        keep &= (columns['flux'] > 0) & (columns['separation'] > 0)
+    order = np.flatnonzero(keep)[np.argsort(columns['time'][keep], kind='stable')]
+    return {name: np.ascontiguousarray(columns[name][order], dtype=dtype) for name, dtype in CATALOG_COLUMNS}
+
+
+def _save_npz(path, arrays):
+    # Writes to a temporary file in the same directory and moves it into place
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(suffix='.npz', dir=directory)
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            np.savez(file, **arrays)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def _file_digest(path, options):
+    digest = hashlib.sha256(repr((_CACHE_VERSION,) + options).encode())
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BMRCatalog:
+    """
+    Table of BMRs sorted by emergence time, stored as one array per column.
+
+    The columns are those of `CATALOG_COLUMNS` and can be accessed by name, e.g. `catalog['flux']`.
+    Time windows [start, stop) are located by binary search on the sorted emergence times.
+
+    Parameters:
+        columns (dict): One array per column of `CATALOG_COLUMNS`, e.g. from `read_catalog`.
+    """
+
+    def __init__(self, columns):
+        missing = {name for name, _ in CATALOG_COLUMNS} - set(columns)
+        if missing:
+            raise ValueError(f"The catalog is missing the columns {sorted(missing)}.")
+        time = np.asarray(columns['time'], dtype=float)
+        order = None if np.all(time[1:] >= time[:-1]) else np.argsort(time, kind='stable')
+        self.columns = {}
+        for name, dtype in CATALOG_COLUMNS:
+            values = np.asarray(columns[name], dtype=dtype)
+            self.columns[name] = values if order is None else values[order]
+
+    @classmethod
+    def load(cls, path, cache_dir=None, rotation_period=28.0, flux_unit=1e16, drop_empty=True):
+        """
+        Loads a catalog, from its binary cache if the source file has been read before.
+
+        An `.npz` file written by `save` is loaded directly. Any other file is parsed with
+        `read_catalog` and cached in `cache_dir` under a name keyed by the SHA-256 hash of its
+        content and of the parsing options, so that an edited file is parsed again.
+
+        Parameters:
+            path (str): Path of the catalog file.
+            cache_dir (str, optional): Directory of the cached catalogs. Default is the directory
+                in the environment variable SFT2D_CACHE_DIR, or ~/.cache/sft2d.
+            rotation_period (float): Days per phase of a cycle table (see `read_catalog`).
+            flux_unit (float): Flux unit of a cycle table in Mx (see `read_catalog`).
+            drop_empty (bool): If True, regions without flux or separation are left out.
+
+        Returns:
+            BMRCatalog: The catalog.
+        """
+        if str(path).endswith('.npz'):
+            with np.load(path) as data:
+                return cls({name: data[name] for name in data.files})
+
+        if cache_dir is None:
+            cache_dir = os.environ.get('SFT2D_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'sft2d'))
+        digest = _file_digest(path, (float(rotation_period), float(flux_unit), bool(drop_empty)))
+        stem = os.path.splitext(os.path.basename(path))[0]
+        cache_path = os.path.join(cache_dir, f"{stem}-{digest[:16]}.npz")
+
+        if os.path.exists(cache_path):
+            try:
+                return cls.load(cache_path)
+            except (OSError, ValueError, KeyError):
+                pass  # Unreadable cache, parsed again below
+
+        catalog = cls(read_catalog(path, rotation_period, flux_unit, drop_empty))
+        try:
+            catalog.save(cache_path)
+        except OSError:
+            pass  # The cache is optional, e.g. on a read-only file system
+        return catalog
+
+    def save(self, path):
+        """
+        Writes the catalog as an `.npz` file with one array per column.
+
+        The file is written to a temporary file first and moved into place, so that concurrent
+        readers (e.g. the workers of an ensemble) never see a partial file.
+
+        Parameters:
+            path (str): Path of the `.npz` file.
+        """
+        _save_npz(path, self.columns)
+
+    def __len__(self):
+        return self.columns['time'].size
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def time(self):
+        """
+        Sorted emergence times in days.
+        """
+        return self.columns['time']
+
+    def span(self, start, stop):
+        """
+        Returns the index range of the regions with start <= time < stop.
+
+        Parameters:
+            start (float): Start of the window in days.
+            stop (float): End of the window in days (excluded).
+
+        Returns:
+            slice: Slice of the rows of the window.
+        """
+        time = self.columns['time']
+        return slice(int(np.searchsorted(time, start, side='left')), int(np.searchsorted(time, stop, side='left')))
+
+    def window(self, start, stop):
+        """
+        Returns the regions that emerge in [start, stop).
+
+        Parameters:
+            start (float): Start of the window in days.
+            stop (float): End of the window in days (excluded).
+
+        Returns:
+            dict: One array per column, views into the catalog.
+        """
+        rows = self.span(start, stop)
+        return {name: values[rows] for name, values in self.columns.items()}
+
+    def regions(self, start=None, stop=None):
+        """
+        Returns the table of regions of a run for `BMRSource`.
+
+        Parameters:
+            start (float, optional): Emergence time of the start of the run in days. Default is the
+                first emergence time of the catalog.
+            stop (float, optional): Emergence time of the end of the run in days (excluded).
+                Default is after the last region.
+
+        Returns:
+            dict: The regions in [start, stop), with 'time' in days since `start`.
+        """
+        time = self.columns['time']
+        if start is None:
+            start = time[0] if time.size else 0.0
+        table = self.window(start, np.inf if stop is None else stop)
+        table['time'] = table['time'] - start
+        return table
+
+    @staticmethod
+    def time_of(date):
+        """
+        Returns the emergence time (days since `CATALOG_EPOCH`) of a date, e.g. the start of a run.
+
+        Parameters:
+            date (str or np.datetime64): Date, e.g. '1996-05-01'.
+
+        Returns:
+            float: Time in days.
+        """
+        return (np.datetime64(date, 's') - CATALOG_EPOCH) / np.timedelta64(1, 'D')
@@ -0,0 +1,141 @@
+"""
+checkpoint.py
+
+This module writes and restores checkpoints of Solar Surface Flux Transport (SFT) runs, so that long runs can be
+resumed after an interruption (e.g. a wall-time limit or a preemption on a cluster).
+
+A checkpoint holds the state of the `Simulation` (field, step counter and simulated time) and of any stateful
+hooks, e.g. the time series of a `DiagnosticsAccumulator` and the position of a `BMRSource` in its table of
+regions. Every object provides its state with `state_dict()` and takes it back with `load_state_dict(state)`.
+The checkpoint is written as an `.npz` file to a temporary file that is moved into place, so that an
+interruption while writing leaves the previous checkpoint intact. A run restored from a checkpoint continues
+bit-for-bit identically to an uninterrupted run.
+
+Classes:
+    - Checkpointer: Simulation hook writing checkpoints on a simulated-time and/or wall-clock cadence.
+"""
+
+import os
+import time
+
+import numpy as np
+
+from .catalog import _save_npz
+
+
+def _flatten(state, prefix=''):
+    # Nested dicts of arrays and scalars into flat 'a/b' keys; None entries are left out
+    arrays = {}
+    for key, value in state.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            arrays.update(_flatten(value, name + '/'))
+        elif value is not None:
+            arrays[name] = np.asarray(value)
+    return arrays
+
+
+def _unflatten(arrays):
+    state = {}
+    for name, value in arrays.items():
+        node = state
+        *parents, key = name.split('/')
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[key] = value[()] if value.ndim == 0 else value
+    return state
+
+
+class Checkpointer:
+    """
+    Writes checkpoints of a run and restores a run from its checkpoint.
+
+    The checkpointer is a hook for `Simulation.run`. It should be registered after the hooks whose
+    state it saves, as a daily hook (checkpoints at the end of a day) or as a step hook. A checkpoint
+    is written when `every_days` of simulated time or `every_seconds` of wall-clock time have passed
+    since the previous one, whichever comes first.
+
+    Example:
+        checkpointer = Checkpointer('run.npz', every_days=27, every_seconds=1800,
+                                    objects={'diagnostics': accumulator, 'sources': source})
+        checkpointer.restore(simulation)  # no-op if there is no checkpoint yet
+        simulation.run(num_days - simulation.day, daily_hooks=[accumulator, checkpointer],
+                       step_hooks=[source])
+
+    Parameters:
+        path (str): Path of the checkpoint file (`.npz`). It is overwritten by every checkpoint.
+        every_days (float, optional): Simulated-time cadence in days.
+        every_seconds (float, optional): Wall-clock cadence in seconds.
+        objects (dict, optional): Stateful hooks saved with the simulation, by name. Each provides
+            `state_dict()` and `load_state_dict(state)`.
+    """
+
+    def __init__(self, path, every_days=None, every_seconds=None, objects=None):
+        if every_days is None and every_seconds is None:
+            raise ValueError("Give a checkpoint cadence, every_days and/or every_seconds.")
+        self.path = path
+        self.every_days = every_days
+        self.every_seconds = every_seconds
+        self.objects = dict(objects or {})
+        if 'simulation' in self.objects:
+            raise ValueError("The name 'simulation' is reserved for the simulation state.")
+
+        self._last_time = None
+        self._last_clock = time.monotonic()
+
+    def due(self, simulation):
+        """
+        Returns True if a checkpoint is due at the current state of the simulation.
+        """
+        if self._last_time is None:
+            self._last_time = simulation.time
+        tolerance = 0.5 / simulation.steps_per_day
+        if self.every_days is not None and simulation.time - self._last_time >= self.every_days - tolerance:
+            return True
+        return self.every_seconds is not None and time.monotonic() - self._last_clock >= self.every_seconds
+
+    def __call__(self, simulation):
+        """
+        Hook for `Simulation.run`: writes a checkpoint if it is due.
+        """
+        if self.due(simulation):
+            self.save(simulation)
+
+    def save(self, simulation):
+        """
+        Writes a checkpoint of the simulation and of the registered objects.
+
+        Parameters:
+            simulation (Simulation): The simulation.
+        """
+        state = {'simulation': simulation.state_dict()}
+        for name, item in self.objects.items():
+            state[name] = item.state_dict()
+        _save_npz(self.path, _flatten(state))
+        self._last_time = simulation.time
+        self._last_clock = time.monotonic()
+
+    def restore(self, simulation):
+        """
+        Restores the simulation and the registered objects from the checkpoint, if it exists.
+
+        Parameters:
+            simulation (Simulation): The simulation, set up with the same grid, inputs and options.
+
+        Returns:
+            bool: True if a checkpoint was restored.
+        """
+        if not os.path.exists(self.path):
+            return False
+        with np.load(self.path) as data:
+            state = _unflatten({name: data[name] for name in data.files})
+
+        missing = set(self.objects) - set(state)
+        if missing:
+            raise ValueError(f"The checkpoint has no state for {sorted(missing)}.")
+        simulation.load_state_dict(state['simulation'])
+        for name, item in self.objects.items():
+            item.load_state_dict(state[name])
+        self._last_time = simulation.time
+        self._last_clock = time.monotonic()
+        return True
@@ -0,0 +1,208 @@
+"""
+decomposition.py
+
+This module advances the explicit step of the Solar Surface Flux Transport (SFT) model with several processes,
+for large grids on installations without the compiled (Numba) backend, where threads do not scale.
+
+The interior rows of the grid are split into contiguous latitude bands, each owned by one worker process. The
+two buffers of the field (current and next) and the stencil coefficients live in `multiprocessing.shared_memory`
+blocks that all processes map, so that no array is ever pickled: per step the parent only writes which buffer
+holds the current field into a small shared control block. Each worker applies the same stencil as
+`SFTOperator` to its band, reading the edge rows of the neighbouring bands (the halos) directly from the shared
+current field, and sets the boundary cells of its rows. The processes meet at a barrier before and after every
+step, so that a step only starts once all halos of the previous one are written. Every point is computed with
+the same arithmetic as in the serial step, so the result does not depend on the number of processes.
+
+Classes:
+    - ProcessBandOperator: Advances the field with one worker process per latitude band.
+"""
+
+import ctypes
+import os
+import threading
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .kernels import process_context
+from .sft_operator import _latitude_bands, _stencil
+
+# Order of the coefficients in the shared coefficient block
+_KEYS = ('centre', 'north', 'south', 'west', 'east')
+
+# Commands of the control block
+_STEP = 0
+_STOP = 1
+
+
+class _SharedArray:
+    # Array interface over a shared memory block; arrays built from it keep the block mapped
+    # for as long as they exist, and the block is closed when the last of them is gone
+    def __init__(self, block, shape, dtype):
+        self.block = block
+        address = ctypes.addressof(ctypes.c_char.from_buffer(block.buf))
+        self.__array_interface__ = {'data': (address, False), 'shape': tuple(shape),
+                                    'typestr': np.dtype(dtype).str, 'version': 3}
+
+
+def _shared_array(shape, dtype, name=None):
+    # New shared array, or the existing block `name` attached as an array
+    if name is None:
+        size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        block = shared_memory.SharedMemory(create=True, size=size)
+    else:
+        block = shared_memory.SharedMemory(name=name)
+    return np.asarray(_SharedArray(block, shape, dtype))
+
+
+def _band_worker(names, field_shape, coefficient_shape, dtype, start, stop, barrier):
+    # Loop of a worker process advancing the rows start <= i < stop
+    try:
+        fields = _shared_array((2,) + field_shape, dtype, names[0])
+        coefficients = _shared_array((len(_KEYS),) + coefficient_shape, dtype, names[1])
+        control = _shared_array((2,), np.int64, names[2])
+        band = {key: coefficients[index][..., start - 1:stop - 1, :] for index, key in enumerate(_KEYS)}
+        scratch = np.empty(field_shape[:-2] + (stop - start, field_shape[-1] - 2), dtype=dtype)
+        num_theta = field_shape[-2]
+
+        while True:
+            barrier.wait()
+            if control[0] == _STOP:
+                break
+            field, out = fields[control[1]], fields[1 - control[1]]
+            _stencil(band, field[..., start - 1:stop + 1, :], out[..., start:stop, 1:-1], scratch)
+            # Periodic boundary conditions of the band rows, and the pole row next to the band
+            out[..., start:stop, 0] = out[..., start:stop, -2]
+            out[..., start:stop, -1] = out[..., start:stop, 1]
+            if start == 1:
+                out[..., 0, :] = out[..., 1, :]
+            if stop == num_theta - 1:
+                out[..., -1, :] = out[..., -2, :]
+            barrier.wait()
+    except BaseException:
+        # Releases the parent and the other workers from the barrier
+        barrier.abort()
+        raise
+
+
+def _shutdown(processes, barrier, control, arrays):
+    # Stops the workers and removes the shared memory blocks (they stay mapped while arrays use them)
+    processes = [process for process in processes if process.pid is not None]
+    if processes and all(process.is_alive() for process in processes):
+        control[0] = _STOP
+        try:
+            barrier.wait(timeout=10)
+        except threading.BrokenBarrierError:
+            pass
+    for process in processes:
+        process.join(timeout=10)
+        if process.is_alive():
+            process.terminate()
+    for array in arrays:
+        try:
+            array.base.block.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class ProcessBandOperator:
+    """
+    Advances the field by forward Euler steps of an `SFTOperator`, with one worker process per latitude band.
+
+    The operator provides `advance` like `SFTOperator`, and is used by `Simulation` with `processes` > 1.
+    The field should be held in the two shared `buffers` (e.g. as the double buffer of a simulation):
+    `advance` on the buffers only signals the workers, while other arrays are copied in and out of them.
+    The stencil is evaluated with NumPy in the workers, whatever the backend of the operator.
+
+    The workers are started when the operator is built and run until `close` is called or the operator
+    is garbage collected.
+
+    Parameters:
+        operator (SFTOperator): The operator providing the stencil coefficients.
+        field_shape (tuple): Shape of the field, including the leading member axes and the ghost cells.
+        processes (int, optional): Number of worker processes. Default is the number of CPUs.
+        start_method (str, optional): Start method of the workers (see `process_context`). Default is
+            'spawn', which is safe after compiled (Numba) steps in the parent process.
+    """
+
+    def __init__(self, operator, field_shape, processes=None, start_method=None):
+        field_shape = tuple(int(size) for size in field_shape)
+        if field_shape[-2:] != operator.shape:
+            raise ValueError(f"The field shape {field_shape} does not match the grid {operator.shape}.")
+        num_rows = operator.shape[0] - 2
+        self.operator = operator
+        self.dtype = operator.dtype
+        self.field_shape = field_shape
+        self.processes = max(1, min(os.cpu_count() if processes is None else int(processes), num_rows))
+        self.bands = _latitude_bands(num_rows, self.processes)
+
+        coefficient_shape = operator.batch_shape + (num_rows, operator.shape[1] - 2)
+        fields = _shared_array((2,) + field_shape, self.dtype)
+        self._coefficients = _shared_array((len(_KEYS),) + coefficient_shape, self.dtype)
+        self._control = _shared_array((2,), np.int64)
+        self.buffers = (fields[0], fields[1])
+        self._time_step = None
+
+        context = process_context(start_method)
+        self._barrier = context.Barrier(self.processes + 1)
+        names = tuple(array.base.block.name for array in (fields, self._coefficients, self._control))
+        self._workers = [
+            context.Process(target=_band_worker, name=f'sft-band-{index}', daemon=True,
+                            args=(names, field_shape, coefficient_shape, self.dtype, start, stop, self._barrier))
+            for index, (start, stop) in enumerate(self.bands)]
+        self._finalizer = weakref.finalize(self, _shutdown, self._workers, self._barrier, self._control,
+                                           [fields, self._coefficients, self._control])
+        for worker in self._workers:
+            worker.start()
+
+    def advance(self, field, out, time_step):
+        """
+        Advances the field by one forward Euler step and applies the boundary conditions to `out`.
+
+        Parameters:
+            field (np.ndarray): The magnetic field on the grid, ideally one of the two `buffers`.
+            out (np.ndarray): Array to store the update, ideally the other buffer.
+            time_step (float): Time step in seconds.
+
+        Returns:
+            np.ndarray: The updated field `out`.
+        """
+        if not self._finalizer.alive:
+            raise RuntimeError("The worker processes of the operator have been closed.")
+        if not all(worker.is_alive() for worker in self._workers):
+            self.close()
+            raise RuntimeError("A worker process of the operator has stopped.")
+        if time_step != self._time_step:
+            # The workers are waiting at the barrier, so the coefficients can be replaced
+            coefficients = self.operator._scaled_coefficients(time_step)
+            for index, key in enumerate(_KEYS):
+                self._coefficients[index] = coefficients[key]
+            self._time_step = time_step
+
+        current, following = self.buffers
+        if field is current and out is following:
+            source = 0
+        elif field is following and out is current:
+            source = 1
+        else:
+            current[...] = field
+            source = None
+
+        self._control[:] = (_STEP, 0 if source is None else source)
+        try:
+            self._barrier.wait()  # Start of the step
+            self._barrier.wait()  # All bands (and halos) written
+        except threading.BrokenBarrierError:
+            self.close()
+            raise RuntimeError("A worker process of the operator failed.") from None
+
+        if source is None:
+            out[...] = following
+        return out
+
+    def close(self):
+        """
+        Stops the worker processes and releases the shared memory (once no array uses it any more).
+        """
+        self._finalizer()
@@ -0,0 +1,248 @@
+"""
+ensemble.py
+
+This module runs ensembles of Solar Surface Flux Transport (SFT) simulations, e.g. parameter sweeps over the
+diffusivity, the meridional flow speed, the rotation profile or the initial field. The grid and every distinct
+transport profile and initial field are built once in the parent process and handed to each worker process
+once, when it starts, so that a task only carries its own parameters. Each run returns its diagnostic time
+series; failed runs are recorded with their error instead of stopping the ensemble.
+
+Functions:
+    - parameter_grid: Expands parameter axes into the list of all their combinations.
+
+Classes:
+    - EnsembleRunner: Runs a list of parameter sets over a process pool.
+    - EnsembleResult: Stacked diagnostics of all runs of an ensemble.
+"""
+
+import itertools
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import transport_profiles
+from .initial_conditions import initialize_field
+from .kernels import process_context
+from .simulation import Simulation
+
+# Parameters that select a transport profile or initial field, with their defaults
+PROFILE_DEFAULTS = {
+    'peak_speed': 15.0,
+    'rotation_profile': 'solar',
+    'frame': 'carrington',
+    'field_type': 'dipole',
+}
+
+# Read-only inputs shared with the worker processes
+_shared = {}
+
+
+def parameter_grid(**axes):
+    """
+    Expands parameter axes into the list of all their combinations.
+
+    Example:
+        parameter_grid(diffusivity=[2.5e8, 5e8], peak_speed=[10.0, 15.0]) gives four parameter sets.
+
+    Parameters:
+        **axes: Sequence of values for each parameter name.
+
+    Returns:
+        list: One dict per combination of the parameter values.
+    """
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+def _init_worker(shared):
+    _shared.clear()
+    _shared.update(shared)
+
+
+def _run_member(index, parameters):
+    # Runs one member in a worker; returns its diagnostics or the formatted error
+    try:
+        from ..analysis.diagnostics import DiagnosticsAccumulator
+
+        settings = dict(PROFILE_DEFAULTS, **parameters)
+        grid = _shared['grid']
+        field = settings.pop('field', None)
+        if field is None:
+            field = _shared['fields'][settings['field_type']]
+        flow = _shared['flows'][settings.pop('peak_speed')]
+        rotation = _shared['rotations'][(settings.pop('rotation_profile'), settings.pop('frame'))]
+        settings.pop('field_type')
+        diffusivity = settings.pop('diffusivity')
+
+        simulation = Simulation(grid, field, diffusivity, meridional_flow=flow, differential_rotation=rotation,
+                                **settings)
+        accumulator = DiagnosticsAccumulator(grid, _shared['cadence'], _shared['quantities'])
+        try:
+            if _shared['cadence'] < 1:
+                simulation.run(_shared['num_days'], step_hooks=[accumulator])
+            else:
+                simulation.run(_shared['num_days'], daily_hooks=[accumulator])
+        finally:
+            simulation.close()
+
+        if not np.all(np.isfinite(simulation.field)):
+            raise FloatingPointError("The field is not finite at the end of the run.")
+        return index, accumulator.results(), None
+    except Exception:
+        return index, None, traceback.format_exc()
+
+
+class EnsembleResult:
+    """
+    Diagnostics of all runs of an ensemble, stacked along a leading run axis.
+
+    Attributes:
+        parameters (list): Parameter set of each run.
+        time (np.ndarray): Output times in days (shared by all runs).
+        diagnostics (dict): One array [run, time] (or [run, time, latitude] for 'bfly') per diagnostic key.
+            Rows of failed runs are NaN.
+        errors (dict): Traceback of each failed run, keyed by the run index.
+    """
+
+    def __init__(self, parameters, time, diagnostics, errors):
+        self.parameters = parameters
+        self.time = time
+        self.diagnostics = diagnostics
+        self.errors = errors
+
+    @property
+    def succeeded(self):
+        """
+        Boolean mask of the runs that completed.
+        """
+        mask = np.ones(len(self.parameters), dtype=bool)
+        mask[list(self.errors)] = False
+        return mask
+
+    def __len__(self):
+        return len(self.parameters)
+
+    def __getitem__(self, key):
+        return self.diagnostics[key]
+
+
+class EnsembleRunner:
+    """
+    Runs an ensemble of SFT simulations on a shared grid over a process pool.
+
+    Each parameter set may contain 'diffusivity', 'peak_speed' (meridional flow), 'rotation_profile'
+    and 'frame' (differential rotation), 'field_type' or 'field' (initial field), and any further
+    keyword argument of `Simulation` (e.g. 'integrator', 'cfl_number'). Missing entries are taken
+    from `base`, then from the defaults of the profile functions.
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        num_days (int): Number of days of each run.
+        base (dict, optional): Parameters shared by all runs.
+        quantities (list, optional): Diagnostics to record (see `DiagnosticsAccumulator`).
+            Default is 'usflx', 'dm', 'polar_field' and 'polar_flux'.
+        cadence (float): Output cadence of the diagnostics in days.
+        max_workers (int, optional): Number of worker processes. Default is the number of CPUs.
+            With 1 the runs are executed in the calling process. The workers are spawned (see
+            `process_context`), so a script should run the ensemble under `if __name__ == '__main__':`.
+    """
+
+    def __init__(self, grid, num_days, base=None, quantities=None, cadence=1, max_workers=None):
+        self.grid = grid
+        self.num_days = num_days
+        self.base = dict(base or {})
+        self.quantities = ('usflx', 'dm', 'polar_field', 'polar_flux') if quantities is None else tuple(quantities)
+        self.cadence = cadence
+        self.max_workers = max_workers
+
+    def _shared_inputs(self, settings):
+        # Distinct profiles and initial fields of all runs, built once
+        flows, rotations, fields = {}, {}, {}
+        for setting in settings:
+            setting = dict(PROFILE_DEFAULTS, **setting)
+            speed = setting['peak_speed']
+            if speed not in flows:
+                flows[speed] = transport_profiles.meridional_flow(self.grid, speed)
+            key = (setting['rotation_profile'], setting['frame'])
+            if key not in rotations:
+                rotations[key] = transport_profiles.differential_rotation(self.grid, *key)
+            if 'field' not in setting and setting['field_type'] not in fields:
+                fields[setting['field_type']] = initialize_field(self.grid, setting['field_type'])
+
+        return {
+            'grid': self.grid,
+            'flows': flows,
+            'rotations': rotations,
+            'fields': fields,
+            'num_days': self.num_days,
+            'cadence': self.cadence,
+            'quantities': self.quantities,
+        }
+
+    def run(self, parameters, progress=False):
+        """
+        Runs one simulation per parameter set.
+
+        Parameters:
+            parameters (list): Parameter sets (dicts), e.g. from `parameter_grid`.
+            progress (bool): If True, shows a progress bar over the completed runs (requires tqdm).
+
+        Returns:
+            EnsembleResult: Stacked diagnostics and the errors of the failed runs.
+        """
+        parameters = [dict(p) for p in parameters]
+        settings = [dict(self.base, **p) for p in parameters]
+        shared = self._shared_inputs(settings)
+
+        outputs = [None] * len(settings)
+        errors = {}
+        if self.max_workers == 1:
+            _init_worker(shared)
+            completed = (_run_member(index, setting) for index, setting in enumerate(settings))
+        else:
+            executor = ProcessPoolExecutor(self.max_workers, mp_context=process_context(),
+                                           initializer=_init_worker, initargs=(shared,))
+            futures = [executor.submit(_run_member, index, setting) for index, setting in enumerate(settings)]
+            completed = (self._collect(future, index) for index, future in enumerate(futures))
+
+        if progress:
+            from tqdm import tqdm
+            completed = tqdm(completed, total=len(settings), desc='Ensemble runs: ')
+
+        try:
+            for index, output, error in completed:
+                if error is None:
+                    outputs[index] = output
+                else:
+                    errors[index] = error
+        finally:
+            if self.max_workers != 1:
+                executor.shutdown(cancel_futures=True)
+
+        return self._stack(parameters, outputs, errors)
+
+    @staticmethod
+    def _collect(future, index):
+        # Failures of the worker process itself (e.g. a crash) are recorded like run errors
+        try:
+            return future.result()
+        except Exception:
+            return index, None, traceback.format_exc()
+
+    @staticmethod
+    def _stack(parameters, outputs, errors):
+        template = next((output for output in outputs if output is not None), None)
+        if template is None:
+            return EnsembleResult(parameters, np.array([]), {}, errors)
+
+        diagnostics = {}
+        for key, value in template.items():
+            if key == 'time':
+                continue
+            stacked = np.full((len(outputs),) + np.shape(value), np.nan)
+            for index, output in enumerate(outputs):
+                if output is not None:
+                    stacked[index] = output[key]
+            diagnostics[key] = stacked
+        return EnsembleResult(parameters, template['time'], diagnostics, errors)
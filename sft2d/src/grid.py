@@ -5,11 +5,12 @@ This module handles the creation and management of the uniform grid used in the
 
 Functions:
     - create_grid: Generates a uniform grid in spherical polar coordinates (theta, phi).
+    - grid_dtype: Returns the floating point precision of the fields on a grid.
 """
 
 import numpy as np
 
-def create_grid(n_theta, n_phi, exclude_poles=True):
+def create_grid(n_theta, n_phi, exclude_poles=True, dtype=np.float64):
     """
     Creates a uniform grid in spherical polar coordinates (theta, phi).
 
@@ -17,6 +18,8 @@ def create_grid(n_theta, n_phi, exclude_poles=True):
         n_theta (int): Number of grid points in the theta (co-latitude) direction.
         n_phi (int): Number of grid points in the phi (longitude) direction.
         exclude_poles (bool): Whether to exclude 5 degrees near the poles. Default is True.
+        dtype (np.dtype): Precision of the fields on the grid (float64 or float32), used by default for
+            the profiles, the initial field, the solver and the snapshots. The coordinates stay float64.
 
     Returns:
         dict: A dictionary containing:
@@ -24,6 +27,7 @@ def create_grid(n_theta, n_phi, exclude_poles=True):
             - 'phi': Array of phi values (in radians).
             - 'dtheta': Spacing in the theta direction (in radians).
             - 'dphi': Spacing in the phi direction (in radians).
+            - 'dtype': Name of the precision of the fields.
     """
     # Define the theta (co-latitude) range
     if exclude_poles:
@@ -59,5 +63,27 @@ def create_grid(n_theta, n_phi, exclude_poles=True):
         'colatitude': colatitude,
         'longitude': longitude,
         'dtheta': delta_theta,
-        'dphi': delta_phi
+        'dphi': delta_phi,
+        'dtype': _check_dtype(dtype).name
     }
+
+
+def _check_dtype(dtype):
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.float64):
+        raise ValueError("dtype must be float32 or float64.")
+    return dtype
+
+
+def grid_dtype(grid, dtype=None):
+    """
+    Returns the precision of the fields on a grid.
+
+    Parameters:
+        grid (dict): Dictionary containing grid information, e.g. from `create_grid`.
+        dtype (np.dtype, optional): Explicit precision, returned instead of the one of the grid.
+
+    Returns:
+        np.dtype: float64 (default for grids without a 'dtype' entry) or float32.
+    """
+    return _check_dtype(grid.get('dtype', np.float64) if dtype is None else dtype)
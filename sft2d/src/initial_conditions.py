@@ -8,19 +8,23 @@ Functions:
 """
 
 import numpy as np
-from astropy.io import fits
-from scipy.interpolate import RegularGridInterpolator as rgi
 
-def initialize_field(grid, field_type='dipole'):
+from .grid import grid_dtype
+from .remap import read_synoptic_map, remap_synoptic_map
+
+def initialize_field(grid, field_type='dipole', path='./data/hmi_CR2097.fits', method='nearest'):
     """
     Creates initial condition based on user choice (Dipole/Read from fits file).
 
     Parameters:
         grid (dict): Dictionary containing grid information ('theta', 'phi', and their spacings).
         field_type: Choice for setting the initial field as global dipole or read data from Carrington Rotation fits file.
+        path (str): Synoptic map (FITS file) read with field_type='read'.
+        method (str): Remapping of the synoptic map onto the grid: 'nearest', 'linear' or 'area'
+            (flux-conserving average), see `remap_synoptic_map`.
 
     Returns:
-        np.ndarray: Initial magnetic field.
+        np.ndarray: Initial magnetic field (in the precision of the grid).
     """
     # Read the grid information
     theta = grid['colatitude']
@@ -38,33 +42,16 @@ def initialize_field(grid, field_type='dipole'):
         dipole_strength = 1.0
         B_init = dipole_strength*np.outer(np.abs(np.sin(np.pi/2-theta))**7*(np.sin(np.pi/2-theta)),np.ones(phi.shape[0]))
     elif field_type == 'read':
-        hmi_br = fits.getdata('./data/hmi_CR2097.fits')[::-1,:]
-        
-
-        # Coordinates of original map (pretend it goes only once around Sun in longitude!):
-        # Latitude axis is in sine of latitude.
-        nsm = np.size(hmi_br, axis=0)
-        npm = np.size(hmi_br, axis=1)
-        dsm = 2.0 / nsm
-
-        # Leaving a small gap at the poles for smoother interpolation:
-        scm = np.flip(np.arccos(np.linspace(-1 + 0.05 * dsm, 1 - 0.05 * dsm, nsm)))
-        pcm = np.linspace(0, 2 * np.pi, npm)
-
-        # Interpolate to the computational grid:
-        bri = rgi((scm, pcm), hmi_br, method="nearest", bounds_error=False, fill_value=0)
-        # B_init = np.zeros((num_theta, num_phi))
-
-        for i in range(num_theta):
-            for j in range(num_phi):
-                B_init[i, j] = bri((theta[i], phi[j]))
-
+        # Synoptic map (e.g. HMI Carrington rotation) remapped onto the grid
+        B_init = remap_synoptic_map(read_synoptic_map(path), grid, method)
+    else:
+        raise ValueError("field_type must be 'dipole' or 'read'.")
 
     # Correct for flux imbalance (if any)
     B_init = correct_flux_multiplicative(B_init)
 
     # Return the initial magnetic field array
-    return B_init
+    return B_init.astype(grid_dtype(grid), copy=False)
 
 def correct_flux_multiplicative(f):
     """
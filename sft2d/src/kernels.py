@@ -0,0 +1,120 @@
+"""
+kernels.py
+
+This module provides the compiled backend of the Solar Surface Flux Transport (SFT) model. When Numba is
+installed, the five-point stencil, the forward Euler update and the boundary conditions are fused into a
+single loop over the grid, parallelised over the latitude rows. Without Numba the NumPy implementation
+of `SFTOperator` is used.
+
+Functions:
+    - resolve_backend: Returns the backend to use for a requested backend name.
+    - process_context: Multiprocessing context of the worker processes of the package.
+    - fused_step: Compiled forward Euler step including the boundary conditions (requires Numba).
+    - band_step: Compiled forward Euler step of a band of latitude rows, releasing the GIL (requires Numba).
+"""
+
+import multiprocessing
+
+try:
+    import numba
+except ImportError:  # pragma: no cover - optional dependency
+    numba = None
+
+NUMBA_AVAILABLE = numba is not None
+BACKENDS = ('auto', 'numpy', 'numba')
+
+# Start method of the worker processes. Forking a process whose parent has run a parallel compiled step
+# (the threads of the Numba threading layer) can deadlock the child, so the workers start a fresh
+# interpreter instead
+START_METHOD = 'spawn'
+
+
+def resolve_backend(backend='auto'):
+    """
+    Returns the backend to use.
+
+    Parameters:
+        backend (str): 'auto' (Numba if it is installed, NumPy otherwise), 'numpy' or 'numba'.
+
+    Returns:
+        str: 'numpy' or 'numba'.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}.")
+    if backend == 'auto':
+        return 'numba' if NUMBA_AVAILABLE else 'numpy'
+    if backend == 'numba' and not NUMBA_AVAILABLE:
+        raise ImportError("The 'numba' backend requires numba to be installed.")
+    return backend
+
+
+def process_context(start_method=None):
+    """
+    Returns the multiprocessing context of worker processes (process pools and band workers).
+
+    Parameters:
+        start_method (str, optional): Start method ('spawn', 'forkserver' or 'fork'). Default is
+            `START_METHOD`, which is safe after compiled steps in the parent process.
+
+    Returns:
+        multiprocessing.context.BaseContext: The context.
+    """
+    return multiprocessing.get_context(START_METHOD if start_method is None else start_method)
+
+
+if NUMBA_AVAILABLE:
+    @numba.njit(cache=True)
+    def _update_row(field, out, centre, north, south, west, east, member, i, c):
+        # Forward Euler update of interior row i of one member, and its periodic ghost columns
+        num_phi = field.shape[2]
+        # Index of the row and column in the interior coefficient arrays
+        row = i - 1
+        for j in range(1, num_phi - 1):
+            column = j - 1
+            out[member, i, j] = (centre[c, row, column] * field[member, i, j]
+                                 + north[c, row, column] * field[member, i - 1, j]
+                                 + south[c, row, column] * field[member, i + 1, j]
+                                 + west[c, row, column] * field[member, i, j - 1]
+                                 + east[c, row, column] * field[member, i, j + 1])
+        # Periodic boundary conditions in the phi direction
+        out[member, i, 0] = out[member, i, num_phi - 2]
+        out[member, i, num_phi - 1] = out[member, i, 1]
+
+    @numba.njit(parallel=True, cache=True)
+    def fused_step(field, out, centre, north, south, west, east):
+        """
+        Advances stacked fields [member, theta, phi] by one forward Euler step with the time-step
+        scaled stencil coefficients (see `SFTOperator.step`) and applies the boundary conditions
+        to `out`. The coefficients are [member, theta, phi] interior arrays with either one entry
+        per member or a single entry shared by all members.
+        """
+        num_members, num_theta, num_phi = field.shape
+        shared = centre.shape[0] == 1
+        for index in numba.prange(num_members * (num_theta - 2)):
+            member = index // (num_theta - 2)
+            c = 0 if shared else member
+            _update_row(field, out, centre, north, south, west, east, member, index % (num_theta - 2) + 1, c)
+
+        # Open boundary conditions in the theta direction
+        for member in range(num_members):
+            for j in range(num_phi):
+                out[member, 0, j] = out[member, 1, j]
+                out[member, num_theta - 1, j] = out[member, num_theta - 2, j]
+        return out
+
+    @numba.njit(nogil=True, cache=True)
+    def band_step(field, out, centre, north, south, west, east, start, stop):
+        """
+        Advances the rows start <= i < stop of stacked fields like `fused_step`, including their periodic
+        ghost columns but not the pole ghost rows. It releases the GIL, so that bands can be advanced
+        concurrently by several threads.
+        """
+        shared = centre.shape[0] == 1
+        for member in range(field.shape[0]):
+            c = 0 if shared else member
+            for i in range(start, stop):
+                _update_row(field, out, centre, north, south, west, east, member, i, c)
+        return out
+else:
+    fused_step = None
+    band_step = None
@@ -0,0 +1,151 @@
+"""
+multirate.py
+
+This module provides a multi-rate time integration of the Solar Surface Flux Transport (SFT) model.
+The transport terms are split into a theta group (diffusion and meridional advection), which couples
+the latitude rows, and a phi group (diffusion and rotation along each row), which is local to each row.
+The theta group is advanced with one global step limited only by its own CFL limits. The phi group
+carries the stiff high-latitude limits and is sub-cycled on each latitude band at the rate that band
+needs, so that only the few rows near the poles take many small steps. The two groups are combined
+with Strang splitting: phi (half step), theta (full step), phi (half step).
+
+Classes:
+    - MultiRateScheduler: Split, band-wise sub-cycled forward Euler step.
+
+Constants:
+    - THETA_LIMITS, PHI_LIMITS: Stability limits (see `calculate_cfl_limits`) of the two term groups.
+"""
+
+import numpy as np
+
+from .sft_operator import SFTOperator
+from .time_step import calculate_cfl_limits
+
+# Stability limits of the term groups
+THETA_LIMITS = ('diff_theta', 'adv_theta')
+PHI_LIMITS = ('diff_phi', 'omega_phi')
+
+
+def _combined_limit(limits, names, cfl_number):
+    # The rates of the terms of a group add up in a single forward Euler update
+    return cfl_number / sum(1.0 / limits[name] for name in names)
+
+
+class MultiRateScheduler:
+    """
+    Multi-rate forward Euler integration with the phi terms sub-cycled per latitude band.
+
+    The stable step of each group is the CFL number over the sum of the inverse limits of its
+    terms, evaluated globally for the theta group and row by row for the phi group.
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        diffusivity (float or np.ndarray): The diffusivity value (e.g., 250 km^2/s), or one value per member.
+        meridional_flow (np.ndarray): Meridional flow profile, e.g. from `meridional_flow`.
+        differential_rotation (np.ndarray): Angular velocity profile, e.g. from `differential_rotation`.
+        cfl_number (float): CFL number applied to the limits of both groups.
+        rotation (bool): If False, the rotation is left out of the phi group (e.g. when it is
+            integrated by `SpectralRotation`) and does not limit the sub-steps.
+        polar_filter_latitude (float, optional): Reference latitude of a `PolarFilter` applied by the
+            caller, used for the effective row limits.
+        backend (str): Backend of the theta step (see `SFTOperator`).
+        dtype (np.dtype, optional): Precision of the fields (see `SFTOperator`). Default is the precision
+            of the grid.
+        threads (int, optional): Number of threads of the theta step (see `SFTOperator`).
+    """
+
+    def __init__(self, grid, diffusivity, meridional_flow, differential_rotation, cfl_number=0.4,
+                 rotation=True, polar_filter_latitude=None, backend='auto', dtype=None,
+                 threads=1):
+        self.grid = grid
+        self.cfl_number = cfl_number
+
+        phi_terms = ('diffusion_phi', 'advection_phi') if rotation else ('diffusion_phi',)
+        phi_limits = PHI_LIMITS if rotation else ('diff_phi',)
+        self.theta_operator = SFTOperator(grid, diffusivity, meridional_flow, differential_rotation,
+                                          terms=('diffusion_theta', 'advection_theta'), backend=backend,
+                                          dtype=dtype, threads=threads)
+        self.dtype = self.theta_operator.dtype
+        phi_coefficients = SFTOperator(grid, diffusivity, meridional_flow, differential_rotation,
+                                       terms=phi_terms).coefficients
+        self._phi_coefficients = {key: phi_coefficients[key] for key in ('centre', 'west', 'east')}
+
+        limits = calculate_cfl_limits(grid, diffusivity, meridional_flow, differential_rotation,
+                                      polar_filter_latitude)
+        self.theta_limit = _combined_limit(limits, THETA_LIMITS, cfl_number)
+
+        row_limits = calculate_cfl_limits(grid, diffusivity, meridional_flow, differential_rotation,
+                                          polar_filter_latitude, per_row=True)
+        self.row_limit = _combined_limit(row_limits, phi_limits, cfl_number)[1:-1]
+
+        self.bands = []
+        self._time_step = None
+
+    def _schedule(self, time_step):
+        # Contiguous bands of interior rows sharing the same number of phi sub-steps per half step
+        substeps = self.substeps(time_step)
+        edges = np.flatnonzero(np.diff(substeps)) + 1
+        starts = np.concatenate([[0], edges])
+        stops = np.concatenate([edges, [substeps.size]])
+
+        self.bands = []
+        for start, stop in zip(starts, stops):
+            count = int(substeps[start])
+            sub_dt = 0.5 * time_step / count
+            coefficients = {key: sub_dt * value[..., start:stop, :] for key, value in self._phi_coefficients.items()}
+            coefficients['centre'] += 1.0
+            coefficients = {key: value.astype(self.dtype, copy=False) for key, value in coefficients.items()}
+            self.bands.append((slice(start + 1, stop + 1), count, coefficients, []))
+        self._time_step = time_step
+
+    def _advance_phi(self, field):
+        # Half step of the phi terms, each band sub-cycled at its own rate
+        for rows, count, coefficients, scratch in self.bands:
+            band = field[..., rows, :]
+            shape = np.broadcast_shapes(band[..., 1:-1].shape, coefficients['centre'].shape)
+            if not scratch or scratch[0].shape != shape:
+                scratch[:] = [np.empty(shape, dtype=band.dtype), np.empty(shape, dtype=band.dtype)]
+            update, product = scratch
+            for _ in range(count):
+                np.multiply(coefficients['centre'], band[..., 1:-1], out=update)
+                np.multiply(coefficients['west'], band[..., :-2], out=product)
+                update += product
+                np.multiply(coefficients['east'], band[..., 2:], out=product)
+                update += product
+                band[..., 1:-1] = update
+                band[..., 0] = band[..., -2]
+                band[..., -1] = band[..., 1]
+        field[..., 0, :] = field[..., 1, :]
+        field[..., -1, :] = field[..., -2, :]
+
+    def substeps(self, time_step):
+        """
+        Returns the number of phi sub-steps per half step of each interior latitude row.
+
+        Parameters:
+            time_step (float): Global time step in seconds.
+
+        Returns:
+            np.ndarray: Sub-step counts of the interior rows.
+        """
+        return np.maximum(1, np.ceil(0.5 * time_step / self.row_limit)).astype(int)
+
+    def step(self, field, out, time_step):
+        """
+        Advances the field by one split step. Both `field` and `out` are overwritten, the result is in `out`.
+
+        Parameters:
+            field (np.ndarray): The magnetic field on the grid (2D array including the ghost cells),
+                satisfying the boundary conditions.
+            out (np.ndarray): Preallocated array of the same shape as `field` to store the update.
+            time_step (float): Time step in seconds, within `theta_limit`.
+
+        Returns:
+            np.ndarray: The updated field `out`.
+        """
+        if time_step != self._time_step:
+            self._schedule(time_step)
+        self._advance_phi(field)
+        self.theta_operator.advance(field, out, time_step)
+        self._advance_phi(out)
+        return out
@@ -0,0 +1,72 @@
+"""
+polar_filter.py
+
+This module provides a polar Fourier filter for the uniform latitude-longitude grid of the Solar Surface Flux
+Transport (SFT) model. Towards the poles the longitudinal grid spacing shrinks with sin(theta), which makes the
+explicit phi-diffusion limit very small. The filter removes, on every row poleward of a reference latitude, the
+longitudinal Fourier modes that are not resolved at the grid spacing of the reference latitude, so that the
+global time step only has to respect that spacing.
+
+Classes:
+    - PolarFilter: Damps the unresolved longitudinal modes of the high-latitude rows.
+"""
+
+import numpy as np
+
+from .sft_operator import apply_boundary_conditions
+
+
+class PolarFilter:
+    """
+    Longitudinal Fourier filter of the high-latitude rows.
+
+    On a row at colatitude theta poleward of the reference latitude, mode k of the periodic ring
+    of N interior longitudes is kept if sin(pi k / N) <= sin(theta) / cos(latitude), i.e. if its
+    explicit diffusion rate does not exceed the largest rate at the reference latitude. The other
+    modes are removed.
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        latitude (float): Reference latitude in degrees. Rows at higher latitudes (in both hemispheres) are filtered.
+    """
+
+    def __init__(self, grid, latitude=60.0):
+        self.grid = grid
+        self.latitude = latitude
+
+        sin_theta = np.sin(grid['colatitude'][1:-1])
+        sin_ref = np.cos(np.deg2rad(latitude))
+        num_ring = grid['longitude'].size - 2
+        wavenumber = np.arange(num_ring // 2 + 1)
+
+        # Highest resolvable wavenumber of each interior row
+        k_max = num_ring / np.pi * np.arcsin(np.minimum(sin_theta / sin_ref, 1.0))
+        filtered = sin_theta < sin_ref
+        self.response = (wavenumber[np.newaxis, :] <= k_max[:, np.newaxis]).astype(float)
+        self.num_ring = num_ring
+
+        # Contiguous blocks of filtered rows (as field row slices and response row slices)
+        self.blocks = []
+        edges = np.flatnonzero(np.diff(np.concatenate([[0], filtered.astype(int), [0]])))
+        for start, stop in zip(edges[::2], edges[1::2]):
+            self.blocks.append((slice(start + 1, stop + 1), slice(start, stop)))
+
+    def apply(self, field):
+        """
+        Filters the high-latitude rows of the field in place and updates the ghost cells.
+
+        Parameters:
+            field (np.ndarray): The magnetic field on the grid (2D array including the ghost cells,
+                optionally stacked along leading axes).
+
+        Returns:
+            np.ndarray: The filtered field.
+        """
+        response = self.response
+        if response.dtype != field.dtype:
+            response = self.response.astype(field.dtype)
+        for rows, response_rows in self.blocks:
+            spectrum = np.fft.rfft(field[..., rows, 1:-1], axis=-1)
+            spectrum *= response[response_rows]
+            field[..., rows, 1:-1] = np.fft.irfft(spectrum, n=self.num_ring, axis=-1)
+        return apply_boundary_conditions(field)
@@ -0,0 +1,152 @@
+"""
+remap.py
+
+This module remaps synoptic magnetograms (e.g. HMI Carrington rotation maps) onto the grid of the Solar Surface
+Flux Transport (SFT) model. A synoptic map is sampled uniformly in sine latitude and longitude, so the remapping
+separates into one sparse matrix over the latitude rows and one over the longitude columns, and the whole map is
+remapped with two sparse products. The matrices only depend on the shape of the map and on the target grid, and
+are cached for each (map shape, grid, method) so that remapping many maps of the same size costs only the two
+products.
+
+Functions:
+    - read_synoptic_map: Reads a synoptic map from a FITS file.
+    - remap_matrices: Returns the (cached) latitude and longitude remapping matrices.
+    - remap_synoptic_map: Remaps a synoptic map onto the grid.
+
+Constants:
+    - REMAP_METHODS: Available interpolation methods.
+"""
+
+import numpy as np
+from scipy import sparse
+
+REMAP_METHODS = ('nearest', 'linear', 'area')
+
+# Remapping matrices per (method, map shape, grid)
+_cache = {}
+
+
+def read_synoptic_map(path, hdu=0):
+    """
+    Reads a synoptic map from a FITS file.
+
+    Parameters:
+        path (str): Path of the FITS file.
+        hdu (int): Index of the HDU holding the map.
+
+    Returns:
+        np.ndarray: Map [sine latitude, longitude], with the first row at the south pole and missing
+        values set to zero.
+    """
+    from astropy.io import fits
+
+    data = np.asarray(fits.getdata(path, hdu), dtype=float)
+    return np.nan_to_num(data, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def _point_weights(target, source, method, period=None):
+    # Interpolation weights from ascending source points to target points; beyond the source
+    # points values are held constant, or wrap around if the axis is periodic
+    num_source = source.size
+    if period is None:
+        points = source
+        x = np.clip(target, source[0], source[-1])
+    else:
+        points = np.append(source, source[0] + period)
+        x = (target - source[0]) % period + source[0]
+
+    upper = np.clip(np.searchsorted(points, x, side='right'), 1, points.size - 1)
+    lower = upper - 1
+    weight = (x - points[lower]) / (points[upper] - points[lower])
+    rows = np.arange(target.size)
+    if method == 'nearest':
+        index = np.where(weight > 0.5, upper, lower) % num_source
+        return sparse.csr_matrix((np.ones(target.size), (rows, index)), shape=(target.size, num_source))
+    return sparse.csr_matrix((np.concatenate([1 - weight, weight]),
+                              (np.concatenate([rows, rows]), np.concatenate([lower, upper]) % num_source)),
+                             shape=(target.size, num_source))
+
+
+def _overlap_weights(target_edges, source_edges, period=None):
+    # Average over each target cell [lo, hi] of piecewise constant source cells (ascending edges),
+    # over the part of the target cell covered by the source
+    lower, upper = target_edges[:, 0, np.newaxis], target_edges[:, 1, np.newaxis]
+    shifts = (0.0,) if period is None else (-period, 0.0, period)
+    overlap = 0.0
+    for shift in shifts:
+        overlap = overlap + np.clip(np.minimum(upper, source_edges[1:] + shift)
+                                    - np.maximum(lower, source_edges[:-1] + shift), 0.0, None)
+    covered = overlap.sum(axis=1, keepdims=True)
+    return sparse.csr_matrix(np.divide(overlap, covered, out=np.zeros_like(overlap), where=covered > 0))
+
+
+def _cell_edges(centres, spacing, low=-np.inf, high=np.inf):
+    # Edges of the cells around grid points: midpoints between points, half a spacing at the ends
+    middle = 0.5 * (centres[1:] + centres[:-1])
+    lower = np.concatenate([[centres[0] - 0.5 * spacing], middle])
+    upper = np.concatenate([middle, [centres[-1] + 0.5 * spacing]])
+    return np.clip(np.stack([lower, upper], axis=1), low, high)
+
+
+def remap_matrices(shape, grid, method='linear'):
+    """
+    Returns the matrices remapping a synoptic map of the given shape onto the grid.
+
+    The remapped field is `theta_matrix @ map @ phi_matrix.T`. With 'nearest' and 'linear' the map
+    is interpolated at the grid points (in colatitude and longitude, periodic in longitude) from the
+    centres of its pixels. With 'area' every grid point gets the average of the map over its cell,
+    weighted by the overlap area of the cell with the pixels, which conserves the flux.
+
+    Parameters:
+        shape (tuple): Shape of the map [sine latitude, longitude].
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        method (str): 'nearest', 'linear' or 'area'.
+
+    Returns:
+        tuple: Sparse matrices (theta_matrix [colatitude, map row], phi_matrix [longitude, map column]).
+    """
+    if method not in REMAP_METHODS:
+        raise ValueError(f"method must be one of {REMAP_METHODS}.")
+    colatitude = np.asarray(grid['colatitude'], dtype=float)
+    longitude = np.asarray(grid['longitude'], dtype=float)
+    key = (method, tuple(shape), colatitude.tobytes(), longitude.tobytes())
+    if key in _cache:
+        return _cache[key]
+
+    num_rows, num_columns = shape
+    sine_edges = np.linspace(-1.0, 1.0, num_rows + 1)
+    phi_edges = np.linspace(0.0, 2 * np.pi, num_columns + 1)
+
+    if method == 'area':
+        theta_cells = _cell_edges(colatitude, grid['dtheta'], 0.0, np.pi)
+        # The sine latitude decreases with colatitude
+        theta_matrix = _overlap_weights(np.cos(theta_cells[:, ::-1]), sine_edges)
+        phi_matrix = _overlap_weights(_cell_edges(longitude, grid['dphi']), phi_edges, period=2 * np.pi)
+    else:
+        # Map rows in order of increasing colatitude
+        source_theta = np.arccos(0.5 * (sine_edges[1:] + sine_edges[:-1]))[::-1]
+        theta_matrix = _point_weights(colatitude, source_theta, method)[:, ::-1].tocsr()
+        source_phi = 0.5 * (phi_edges[1:] + phi_edges[:-1])
+        phi_matrix = _point_weights(longitude, source_phi, method, period=2 * np.pi)
+
+    _cache[key] = (theta_matrix, phi_matrix)
+    return theta_matrix, phi_matrix
+
+
+def remap_synoptic_map(data, grid, method='linear'):
+    """
+    Remaps a synoptic map onto the grid (see `remap_matrices` for the methods).
+
+    Parameters:
+        data (np.ndarray): Map [sine latitude, longitude] with the first row at the south pole,
+            e.g. from `read_synoptic_map`.
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        method (str): 'nearest', 'linear' or 'area'.
+
+    Returns:
+        np.ndarray: Field on the grid (2D array including the ghost cells).
+    """
+    data = np.asarray(data, dtype=float)
+    theta_matrix, phi_matrix = remap_matrices(data.shape, grid, method)
+    rows = theta_matrix @ data
+    return np.asarray((phi_matrix @ rows.T).T)
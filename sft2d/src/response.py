@@ -0,0 +1,386 @@
+"""
+response.py
+
+This module predicts the axisymmetric diagnostics (axial dipole moment, polar field and polar flux) of
+emergence-driven Solar Surface Flux Transport (SFT) runs directly from a catalog of bipolar magnetic regions
+(BMRs), without time stepping the field.
+
+The SFT equation is linear in the field and the transport profiles do not depend on longitude. The diffusion
+and rotation terms in phi then leave the longitude sum of every latitude row unchanged, so the row sums evolve
+on their own under the theta terms of the explicit step, and the diagnostics only depend on them. The row sums
+of a region deposited by `BMRSource` have a closed form (two Gaussians in colatitude), so a region only enters
+through its latitude, tilt, separation and flux. The engine decomposes the daily propagator of the row sums
+into its decay modes once (the tridiagonal theta operator is symmetrised by a diagonal scaling), and the
+diagnostics of a whole catalog follow by superposition: each mode is a first-order linear filter driven by
+the daily sum of the modal amplitudes of the emerging regions.
+
+The modes and the normalisation table of the regions are cached on disk, keyed by the hash of the grid,
+the transport operator and the source options, so that later engines with the same setup are built
+without recomputing them.
+
+Classes:
+    - ResponseEngine: Response of the diagnostics to BMRs and predictions for catalogs.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+from scipy.signal import lfilter
+from scipy.special import erf
+
+from . import transport_profiles
+from .axisymmetric import AxisymmetricOperator
+from .catalog import _save_npz
+from .sft_operator import solar_radius
+from .sources import REGION_COLUMNS, BMRSource, bipole_centres
+from .time_step import CFL_LIMITS, calculate_time_step, fit_time_step
+
+# Version of the cached layout, part of the cache key
+_CACHE_VERSION = 1
+
+# Grid of the normalisation table of the regions: latitude, tilt and separation in degrees
+_TABLE_LATITUDES = np.arange(-60.0, 60.1, 5.0)
+_TABLE_TILTS = np.arange(-12.0, 12.1, 2.0)
+_TABLE_SEPARATIONS = np.geomspace(0.25, 64.0, 17)
+
+
+class ResponseEngine:
+    """
+    Response of the axisymmetric diagnostics to BMRs, and their prediction for whole catalogs.
+
+    The engine reproduces a run of `Simulation` with the explicit integrator (the rotation and polar filter
+    options do not change the row sums), in which the regions are deposited by `BMRSource` as a daily hook
+    and the diagnostics are recorded daily by `DiagnosticsAccumulator`. A region emerging at time t is thus
+    deposited at the end of day ceil(t). The diagnostics include the two periodic ghost columns of the grid,
+    which are accounted for on average over longitude: the prediction of a single region differs from the
+    full run by at most 2/359 (on a 1 degree grid) until it has spread in longitude. The unsigned flux is
+    not linear in the field and cannot be predicted.
+
+    Example:
+        engine = ResponseEngine(grid, 2.5e8)
+        catalog = BMRCatalog.load('sunspot_data_rgo_1901_2025.csv')
+        prediction = engine.predict(catalog.regions(), num_days=45000)
+        prediction['dm']  # daily axial dipole moment
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        diffusivity (float): The diffusivity value (e.g., 250 km^2/s).
+        meridional_flow (np.ndarray, optional): Meridional flow profile. Default is `meridional_flow(grid)`.
+        differential_rotation (np.ndarray, optional): Angular velocity profile. Default is
+            `differential_rotation(grid)`.
+        time_step (float, optional): Time step in seconds, rounded to fit the day. Default is the time step
+            of `Simulation` with the explicit integrator.
+        cfl_number (float): CFL number of the default time step.
+        width (float): Gaussian width (sigma) of the polarities in degrees (see `BMRSource`).
+        window (float): Half size of the deposition window, in units of the width (see `BMRSource`).
+        apply_hale (bool): If False, the leading polarity is positive in both hemispheres.
+        R_sun (float): Solar radius in cm used for the area elements of the sources.
+        cache_dir (str, optional): Directory of the cached modes. Default is 'response' in the directory in
+            the environment variable SFT2D_CACHE_DIR, or ~/.cache/sft2d. False disables the disk cache.
+        **kwargs: Options of `diagnostic_weights` (deg_pol, pol_cap_extent_deg, R_sun of the polar flux).
+    """
+
+    def __init__(self, grid, diffusivity, meridional_flow=None, differential_rotation=None, time_step=None,
+                 cfl_number=0.4, width=4.0, window=4.0, apply_hale=True, R_sun=solar_radius * 1e2,
+                 cache_dir=None, **kwargs):
+        from ..analysis.diagnostics import diagnostic_weights
+
+        if np.ndim(diffusivity) != 0:
+            raise ValueError("The response engine takes a single diffusivity.")
+        if meridional_flow is None:
+            meridional_flow = transport_profiles.meridional_flow(grid)
+        if differential_rotation is None:
+            differential_rotation = transport_profiles.differential_rotation(grid)
+        if time_step is None:
+            time_step, steps_per_day = calculate_time_step(grid, diffusivity, cfl_number, CFL_LIMITS,
+                                                           meridional_flow, differential_rotation)
+        else:
+            time_step, steps_per_day = fit_time_step(time_step)
+
+        self.grid = grid
+        self.diffusivity = diffusivity
+        self.time_step = time_step
+        self.steps_per_day = steps_per_day
+        self.width = width
+        self.window = window
+        self.apply_hale = apply_hale
+        self.R_sun = R_sun
+
+        # Theta stencil of the row sums: the phi terms of each row add up to zero over the ring
+        operator = AxisymmetricOperator(grid, diffusivity, meridional_flow, dtype=np.float64)
+        if operator.batch_shape:
+            raise ValueError("The response engine takes transport profiles without member axes.")
+        coefficients = operator.step_coefficients(time_step)
+        centre, north, south = (coefficients[key] for key in ('centre', 'north', 'south'))
+
+        colatitude = grid['colatitude']
+        self.num_phi = grid['longitude'].size
+        theta = colatitude[1:-1]
+        self._theta = theta
+        self._area = R_sun**2 * np.sin(theta) * grid['dtheta'] * grid['dphi']
+
+        # Row weights of the diagnostics on the interior rows (pole ghost rows folded in), scaled for
+        # the ghost columns
+        weights = diagnostic_weights(grid, **kwargs)
+        vectors = {}
+        for key in ('dm', 'polar_flux_north', 'polar_flux_south'):
+            vectors[key] = np.asarray(weights[key], dtype=float)
+        for key in ('polar_field_north', 'polar_field_south'):
+            vector = np.zeros(colatitude.size)
+            rows_of_cap = np.arange(colatitude.size)[weights[key]]
+            vector[rows_of_cap] = 1.0 / (rows_of_cap.size * self.num_phi)
+            vectors[key] = vector
+        ring_factor = self.num_phi / (self.num_phi - 2)
+        self._keys = tuple(vectors)
+        output = np.array([vectors[key] for key in self._keys])
+        output[:, 1] += output[:, 0]
+        output[:, -2] += output[:, -1]
+        output = ring_factor * output[:, 1:-1]
+
+        key = _digest((grid['colatitude'], grid['longitude'], centre, north, south, output, steps_per_day,
+                       width, window, apply_hale, R_sun))
+        cached = _load_cache(cache_dir, key)
+        if cached is None:
+            cached = self._build(centre, north, south, steps_per_day)
+            _save_cache(cache_dir, key, cached)
+
+        self.rates = cached['rates']
+        self._inputs = cached['inputs']
+        self._outputs = output @ cached['modes']
+        self._correction = RegularGridInterpolator((_TABLE_LATITUDES, _TABLE_TILTS, np.log(_TABLE_SEPARATIONS)),
+                                                   cached['correction'])
+        self._tables = {}
+
+    def _build(self, centre, north, south, steps_per_day):
+        # Decay modes of the daily propagator of the row sums and the normalisation table of the regions
+        centre = centre.copy()
+        centre[0] += north[0]  # Pole ghost rows copy their neighbours
+        centre[-1] += south[-1]
+
+        # Diagonal scaling d making the tridiagonal step symmetric, (d[i+1] / d[i])^2 = south[i] / north[i+1]
+        log_scale = np.concatenate([[0.0], np.cumsum(0.5 * np.log(south[:-1] / north[1:]))])
+        scale = np.exp(log_scale - log_scale.mean())
+        off_diagonal = np.sqrt(south[:-1] * north[1:])
+        symmetric = np.diag(centre) + np.diag(off_diagonal, 1) + np.diag(off_diagonal, -1)
+        step_rates, vectors = np.linalg.eigh(symmetric)
+
+        # Ratio of the normalisation of the regions deposited by BMRSource (the inverse unsigned flux of
+        # the two polarities of unit flux on the deposition window) to the planar approximation
+        source = BMRSource(self.grid, width=self.width, window=self.window, apply_hale=self.apply_hale,
+                           R_sun=self.R_sun)
+        grid_points = np.meshgrid(_TABLE_LATITUDES, _TABLE_TILTS, _TABLE_SEPARATIONS, indexing='ij')
+        latitude, tilt, separation = (points.ravel() for points in grid_points)
+        (theta_lead, phi_lead), (theta_foll, phi_foll) = bipole_centres(latitude, 0.0, tilt, separation)
+        phi_lead = (phi_lead + np.pi) % (2 * np.pi) - np.pi
+        phi_foll = (phi_foll + np.pi) % (2 * np.pi) - np.pi
+        sigma = np.radians(self.width)
+        correction = np.empty(latitude.size)
+        for index in range(latitude.size):
+            rows, offsets, _ = source.footprint(latitude[index], tilt[index], separation[index])
+            theta = self._theta[rows.start - 1:rows.stop - 1, np.newaxis]
+            area = self._area[rows.start - 1:rows.stop - 1, np.newaxis]
+            phi = offsets * self.grid['dphi']
+            values = 0.0
+            for theta_c, phi_c, sign in ((theta_lead[index], phi_lead[index], 1.0),
+                                         (theta_foll[index], phi_foll[index], -1.0)):
+                gaussian = np.exp(-((theta - theta_c)**2 + (phi - phi_c)**2) / (2 * sigma**2))
+                values = values + sign * gaussian / np.sum(gaussian * area)
+            correction[index] = 1 / np.sum(np.abs(values) * area)
+        correction /= self._planar_normalisation(latitude, tilt, separation)
+
+        return {
+            'rates': step_rates**steps_per_day,
+            'modes': vectors / scale[:, np.newaxis],
+            'inputs': (vectors * scale[:, np.newaxis]).T,
+            'correction': correction.reshape(grid_points[0].shape),
+        }
+
+    def _polarity_profiles(self, latitude, tilt, separation):
+        # Longitude sums of the two polarities of unit regions on the interior rows, before the joint
+        # normalisation to unit unsigned flux: a Gaussian in colatitude per polarity, normalised to unit
+        # flux on the rows of the deposition window
+        (theta_lead, phi_lead), (theta_foll, phi_foll) = bipole_centres(latitude, 0.0, tilt, separation)
+        sigma = np.radians(self.width)
+        reach = self.window * sigma
+        theta = self._theta
+        inside = ((theta >= np.minimum(theta_lead, theta_foll)[:, np.newaxis] - reach)
+                  & (theta <= np.maximum(theta_lead, theta_foll)[:, np.newaxis] + reach))
+
+        profiles = np.zeros((np.size(theta_lead), theta.size))
+        sign_lead = np.where((np.asarray(latitude) >= 0) | (not self.apply_hale), 1.0, -1.0)
+        for theta_c, sign in ((theta_lead, sign_lead), (theta_foll, -sign_lead)):
+            gaussian = np.where(inside, np.exp(-(theta - theta_c[:, np.newaxis])**2 / (2 * sigma**2)), 0.0)
+            profiles += sign[:, np.newaxis] * gaussian / (gaussian @ self._area)[:, np.newaxis]
+        return profiles
+
+    def source_profiles(self, latitude, tilt, separation, flux=1.0):
+        """
+        Returns the longitude sums of the field of regions deposited by `BMRSource`.
+
+        The sums over the ring of interior columns do not depend on the longitude of the regions. The
+        joint normalisation of the two polarities to the unsigned flux (which depends on their overlap)
+        is interpolated from a table computed like `BMRSource`, to a few 1e-3 (the deposited footprints
+        also vary slightly with the position of the centre within its grid cell).
+
+        Parameters:
+            latitude (float or np.ndarray): Latitude of the centres in degrees.
+            tilt (float or np.ndarray): Tilt angles in degrees.
+            separation (float or np.ndarray): Separation of the polarities in degrees.
+            flux (float or np.ndarray): Unsigned flux of the regions in Mx.
+
+        Returns:
+            np.ndarray: Longitude sums [region, interior latitude row].
+        """
+        latitude, tilt, separation, flux = (np.atleast_1d(np.asarray(value, dtype=float)) for value in
+                                            np.broadcast_arrays(latitude, tilt, separation, flux))
+        profiles = self._polarity_profiles(latitude, tilt, separation)
+
+        points = np.stack([np.clip(latitude, _TABLE_LATITUDES[0], _TABLE_LATITUDES[-1]),
+                           np.clip(tilt, _TABLE_TILTS[0], _TABLE_TILTS[-1]),
+                           np.log(np.clip(separation, _TABLE_SEPARATIONS[0], _TABLE_SEPARATIONS[-1]))], axis=-1)
+        normalisation = self._planar_normalisation(latitude, tilt, separation) * self._correction(points)
+        return (flux * normalisation)[:, np.newaxis] * profiles
+
+    def _planar_normalisation(self, latitude, tilt, separation):
+        # Inverse unsigned flux of two overlapping Gaussians of unit flux on the plane, at the distance
+        # of the polarities in (colatitude, longitude)
+        (theta_lead, phi_lead), (theta_foll, phi_foll) = bipole_centres(latitude, 0.0, tilt, separation)
+        phi_distance = (phi_lead - phi_foll + np.pi) % (2 * np.pi) - np.pi
+        distance = np.hypot(theta_lead - theta_foll, phi_distance) / np.radians(self.width)
+        return 1 / np.maximum(2 * erf(distance / (2 * np.sqrt(2))), 1e-300)
+
+    def response(self, latitude, tilt, separation, num_days):
+        """
+        Returns the diagnostics of a single region of unit flux (1 Mx) deposited at day 0.
+
+        Parameters:
+            latitude (float): Latitude of the centre in degrees.
+            tilt (float): Tilt angle in degrees.
+            separation (float): Separation of the polarities in degrees.
+            num_days (int): Number of days after the emergence.
+
+        Returns:
+            dict: 'time' (days) and one time series per diagnostic key, as from `DiagnosticsAccumulator`.
+        """
+        amplitudes = self.source_profiles(latitude, tilt, separation) @ self._inputs.T
+        decay = self.rates ** np.arange(num_days + 1)[:, np.newaxis]
+        series = (decay * amplitudes) @ self._outputs.T
+        results = {'time': np.arange(num_days + 1, dtype=float)}
+        results.update({key: series[:, index] for index, key in enumerate(self._keys)})
+        return results
+
+    def table(self, latitudes, tilts, separation, num_days):
+        """
+        Returns the response table of unit regions (1 Mx) over a latitude/tilt grid. Tables are kept in
+        memory for repeated use.
+
+        Parameters:
+            latitudes (np.ndarray): Latitudes of the centres in degrees.
+            tilts (np.ndarray): Tilt angles in degrees.
+            separation (float): Separation of the polarities in degrees.
+            num_days (int): Number of days after the emergence.
+
+        Returns:
+            dict: 'time' (days) and one array [latitude, tilt, time] per diagnostic key.
+        """
+        latitudes = np.asarray(latitudes, dtype=float)
+        tilts = np.asarray(tilts, dtype=float)
+        key = (latitudes.tobytes(), tilts.tobytes(), float(separation), int(num_days))
+        if key not in self._tables:
+            latitude, tilt = np.meshgrid(latitudes, tilts, indexing='ij')
+            amplitudes = self.source_profiles(latitude.ravel(), tilt.ravel(), separation) @ self._inputs.T
+            decay = self.rates ** np.arange(num_days + 1)[:, np.newaxis]
+            table = {'time': np.arange(num_days + 1, dtype=float)}
+            for index, name in enumerate(self._keys):
+                series = (amplitudes * self._outputs[index]) @ decay.T
+                table[name] = series.reshape(latitude.shape + (num_days + 1,))
+            self._tables[key] = table
+        return self._tables[key]
+
+    def predict(self, regions, num_days, initial_field=None, chunk_size=4096):
+        """
+        Predicts the daily diagnostics of a run driven by a table of regions.
+
+        Parameters:
+            regions (dict or np.ndarray): Table of regions as for `BMRSource`, e.g. from `BMRCatalog.regions`,
+                with 'time' in days since the start of the run.
+            num_days (int): Number of days of the run.
+            initial_field (np.ndarray, optional): Initial field on the grid (2D array including the ghost cells).
+            chunk_size (int): Number of regions whose profiles are evaluated at once.
+
+        Returns:
+            dict: 'time' (days 0 to `num_days`) and one time series per diagnostic key, as from
+            `DiagnosticsAccumulator`.
+        """
+        names = regions.dtype.names if hasattr(regions, 'dtype') else list(regions.keys())
+        missing = set(REGION_COLUMNS) - set(names)
+        if missing:
+            raise ValueError(f"The table of regions is missing the columns {sorted(missing)}.")
+        if 'width' in names and np.any(np.asarray(regions['width'], dtype=float) != self.width):
+            raise ValueError(f"The response engine is set up for regions of width {self.width}.")
+
+        # Regions are deposited at the end of the day of their emergence (at day 0 if t <= 0)
+        day = np.maximum(np.ceil(np.asarray(regions['time'], dtype=float)), 0)
+        keep = day <= num_days
+        day = day[keep].astype(np.int64)
+        columns = {name: np.asarray(regions[name], dtype=float)[keep]
+                   for name in ('latitude', 'tilt', 'separation', 'flux')}
+
+        # Daily modal amplitudes of the deposited regions
+        forcing = np.zeros((num_days + 1, self.rates.size))
+        for start in range(0, day.size, chunk_size):
+            rows = slice(start, start + chunk_size)
+            profiles = self.source_profiles(columns['latitude'][rows], columns['tilt'][rows],
+                                            columns['separation'][rows], columns['flux'][rows])
+            np.add.at(forcing, day[rows], profiles @ self._inputs.T)
+        if initial_field is not None:
+            field = np.asarray(initial_field, dtype=float)
+            forcing[0] += field[1:-1, 1:-1].sum(axis=-1) @ self._inputs.T
+
+        # Each mode decays by its daily rate between deposits
+        modes = np.empty_like(forcing)
+        for index, rate in enumerate(self.rates):
+            modes[:, index] = lfilter([1.0], [1.0, -rate], forcing[:, index])
+        series = modes @ self._outputs.T
+
+        results = {'time': np.arange(num_days + 1, dtype=float)}
+        results.update({key: series[:, index] for index, key in enumerate(self._keys)})
+        return results
+
+
+def _digest(values):
+    digest = hashlib.sha256(repr(_CACHE_VERSION).encode())
+    for value in values:
+        digest.update(np.ascontiguousarray(value).tobytes() if isinstance(value, np.ndarray) else repr(value).encode())
+    return digest.hexdigest()
+
+
+def _cache_path(cache_dir, key, subdirectory='response'):
+    if cache_dir is False:
+        return None
+    if cache_dir is None:
+        cache_dir = os.path.join(os.environ.get('SFT2D_CACHE_DIR',
+                                                os.path.join(os.path.expanduser('~'), '.cache', 'sft2d')), subdirectory)
+    return os.path.join(cache_dir, f"{key[:16]}.npz")
+
+
+def _load_cache(cache_dir, key, subdirectory='response'):
+    path = _cache_path(cache_dir, key, subdirectory)
+    if path is None or not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+    except (OSError, ValueError):
+        return None  # Unreadable cache, computed again
+
+
+def _save_cache(cache_dir, key, cached, subdirectory='response'):
+    path = _cache_path(cache_dir, key, subdirectory)
+    if path is not None:
+        try:
+            _save_npz(path, cached)
+        except OSError:
+            pass  # The cache is optional, e.g. on a read-only file system
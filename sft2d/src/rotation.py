@@ -0,0 +1,78 @@
+"""
+rotation.py
+
+This module provides an exact transport of the field by the differential rotation of the Solar Surface Flux
+Transport (SFT) model. The angular velocity only depends on latitude, so advection in phi over a time step
+is a pure shift of each latitude row. The shift is applied as a phase factor to the real Fourier transform
+of the periodic ring of interior columns, for all rows at once, so that it is neither limited by a CFL
+condition nor adds numerical diffusion.
+
+Classes:
+    - SpectralRotation: Shifts every latitude row by omega(theta) * dt with FFTs.
+"""
+
+import numpy as np
+
+from .sft_operator import apply_boundary_conditions
+
+
+class SpectralRotation:
+    """
+    Exact longitudinal transport of the field by a latitude dependent rotation rate.
+
+    The ring of interior columns is shifted by omega * dt / dphi grid cells, the same transport
+    speed as the upwind term of `calculate_advection`, without its numerical diffusion.
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        differential_rotation (np.ndarray): Angular velocity profile in rad/s, either 2D (e.g. from
+            `differential_rotation`, constant along each row) or 1D over the colatitudes, optionally
+            stacked along leading (member) axes.
+    """
+
+    def __init__(self, grid, differential_rotation):
+        omega = np.asarray(differential_rotation, dtype=float)
+        if omega.shape[-1] == grid['longitude'].size and omega.ndim > 1:
+            if not np.allclose(omega, omega[..., :1]):
+                raise ValueError("The spectral rotation requires a rotation rate that only depends on latitude.")
+            omega = omega[..., 0]
+
+        self.grid = grid
+        self.omega = omega[..., 1:-1, np.newaxis]
+        self.num_ring = grid['longitude'].size - 2
+        self._wavenumber = 2 * np.pi * np.fft.rfftfreq(self.num_ring)
+        self._time_step = None
+        self._phase = None
+
+    def _phase_factor(self, time_step):
+        shift = self.omega * time_step / self.grid['dphi']
+        phase = np.exp(-1j * self._wavenumber * shift)
+        if self.num_ring % 2 == 0:
+            # The Nyquist mode of a real signal can only be scaled
+            phase[..., -1] = phase[..., -1].real
+        return phase
+
+    def apply(self, field, time_step):
+        """
+        Rotates the field in place over a time step and updates the ghost cells.
+
+        Parameters:
+            field (np.ndarray): The magnetic field on the grid (2D array including the ghost cells,
+                optionally stacked along leading axes).
+            time_step (float): Time step in seconds.
+
+        Returns:
+            np.ndarray: The rotated field.
+        """
+        if time_step != self._time_step:
+            self._phase = self._phase_factor(time_step)
+            self._time_step = time_step
+
+        interior = field[..., 1:-1, 1:-1]
+        spectrum = np.fft.rfft(interior, axis=-1)
+        if self._phase.dtype != spectrum.dtype:
+            # Phase factor in the precision of the field
+            self._phase = self._phase.astype(spectrum.dtype)
+        spectrum *= self._phase
+        interior[...] = np.fft.irfft(spectrum, n=self.num_ring, axis=-1)
+        return apply_boundary_conditions(field)
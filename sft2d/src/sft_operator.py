@@ -0,0 +1,318 @@
+"""
+sft_operator.py
+
+This module provides a grid-bound operator for the Solar Surface Flux Transport (SFT) model.
+All geometric factors of the diffusion and upwind advection stencils are evaluated once when the
+operator is built, so that the right-hand side of the SFT equation can be applied repeatedly inside
+the time loop without rebuilding the grid geometry or allocating temporary arrays.
+Fields may carry leading axes (e.g. stacked ensemble members [member, theta, phi]), which are
+advanced together; the diffusivity and the flow profiles may then differ between members.
+
+With the 'numba' backend (see `kernels`) a full step including the boundary conditions is
+evaluated by a single compiled loop.
+
+With several threads, `advance` splits the interior rows into contiguous latitude bands that are
+advanced concurrently by a thread pool (NumPy and the compiled band kernel release the GIL). Each band
+reads its neighbours' edge rows (one-row halos) from the shared input field, and the threads are joined
+once per step before the boundary conditions are applied. Every point is computed with the same
+arithmetic as in the serial step, so the result does not depend on the number of threads.
+
+Classes:
+    - SFTOperator: Precomputed five-point stencil for diffusion plus upwind advection.
+
+Functions:
+    - apply_boundary_conditions: Applies the periodic (phi) and pole (theta) boundary conditions in place.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .grid import grid_dtype
+from .kernels import band_step, fused_step, resolve_backend
+
+solar_radius = 6.955 * 10**8  # Solar radius in meters
+
+# Transport terms that can be included in an operator
+TERMS = ('diffusion_theta', 'diffusion_phi', 'advection_theta', 'advection_phi')
+
+
+def apply_boundary_conditions(field):
+    """
+    Applies the boundary conditions of the SFT model to the field in place.
+
+    Parameters:
+        field (np.ndarray): The magnetic field on the grid (2D array including the ghost cells, or a
+            stack of such arrays along leading axes).
+
+    Returns:
+        np.ndarray: The same array with its ghost cells updated.
+    """
+    # Periodic boundary conditions in the phi direction
+    field[..., :, 0] = field[..., :, -2]  # First column matches second-to-last column
+    field[..., :, -1] = field[..., :, 1]  # Last column matches second column
+
+    # Open boundary conditions in the theta direction
+    field[..., 0, :] = field[..., 1, :]    # Northern boundary (pole)
+    field[..., -1, :] = field[..., -2, :]  # Southern boundary (pole)
+    return field
+
+
+def _latitude_bands(num_rows, count):
+    # Split of the interior rows 1 <= i <= num_rows into `count` contiguous bands [start, stop)
+    edges = np.linspace(1, num_rows + 1, count + 1).round().astype(int)
+    return [(int(start), int(stop)) for start, stop in zip(edges[:-1], edges[1:])]
+
+
+def _stencil(coefficients, field, out, scratch):
+    # Five-point stencil of the interior of `field` into `out`, accumulated through `scratch`
+    np.multiply(coefficients['centre'], field[..., 1:-1, 1:-1], out=out)
+    np.multiply(coefficients['north'], field[..., :-2, 1:-1], out=scratch)
+    out += scratch
+    np.multiply(coefficients['south'], field[..., 2:, 1:-1], out=scratch)
+    out += scratch
+    np.multiply(coefficients['west'], field[..., 1:-1, :-2], out=scratch)
+    out += scratch
+    np.multiply(coefficients['east'], field[..., 1:-1, 2:], out=scratch)
+    out += scratch
+
+
+class SFTOperator:
+    """
+    Precomputed right-hand side of the SFT equation on a fixed grid.
+
+    The diffusion term of `calculate_diffusion` and the upwind advection term of
+    `calculate_advection` are both linear in the field with coefficients that only depend on the
+    grid and the transport profiles. They are therefore folded into five coefficient arrays
+    (centre, north, south, west and east neighbours) of the interior shape, with the upwind
+    direction already resolved from the sign of the flows.
+
+    For stacked members, a vector of diffusivities and/or flow profiles with a leading member axis
+    give coefficient arrays with that leading axis, which broadcast against the stacked field.
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        diffusivity (float or np.ndarray): The diffusivity value (e.g., 250 km^2/s), or one value per member.
+        meridional_flow (np.ndarray): Meridional flow profile (2D array, or stacked per member), e.g. from
+            `meridional_flow`. Only needed for 'advection_theta'.
+        differential_rotation (np.ndarray): Angular velocity profile (2D array, or stacked per member), e.g.
+            from `differential_rotation`. Only needed for 'advection_phi'.
+        terms (tuple, optional): Subset of `TERMS` included in the operator, so that terms can be
+            integrated separately. Default is all of them.
+        backend (str): Backend of `advance`, 'auto' (Numba if installed), 'numpy' or 'numba'.
+        dtype (np.dtype, optional): Precision of the fields advanced by `step` and `advance` (float64 or
+            float32). Default is the precision of the grid. The coefficients are evaluated in float64 and
+            rounded once to this precision.
+        threads (int, optional): Number of threads of `advance`, each advancing a latitude band. Default
+            is 1 (serial); None uses all CPUs. The threads are stopped by `close`.
+    """
+
+    def __init__(self, grid, diffusivity, meridional_flow=None, differential_rotation=None, terms=TERMS,
+                 backend='auto', dtype=None, threads=1):
+        unknown = set(terms) - set(TERMS)
+        if unknown:
+            raise ValueError(f"Unknown terms {sorted(unknown)}, choose from {TERMS}.")
+
+        theta = grid['colatitude']
+        dtheta = grid['dtheta']
+        dphi = grid['dphi']
+
+        self.grid = grid
+        self.diffusivity = diffusivity
+        self.terms = tuple(terms)
+        self.backend = resolve_backend(backend)
+        self.dtype = grid_dtype(grid, dtype)
+        self.shape = (theta.size, grid['longitude'].size)
+        interior = (self.shape[0] - 2, self.shape[1] - 2)
+
+        # Latitude bands (interior rows of the field) of the threaded step
+        self.threads = max(1, min(os.cpu_count() if threads is None else int(threads), interior[0]))
+        self.bands = _latitude_bands(interior[0], self.threads)
+        self._executor = None
+        self._band_scratch = [None] * self.threads
+
+        sin_theta = np.sin(theta)[:, np.newaxis]
+        cos_theta = np.cos(theta)[:, np.newaxis]
+        sin_c = sin_theta[1:-1]
+        cot_c = cos_theta[1:-1] / sin_c
+
+        # Coefficients grow leading member axes by broadcasting when the inputs are stacked
+        coeff_c = np.zeros(interior)
+        coeff_n = np.zeros(interior)
+        coeff_s = np.zeros(interior)
+        coeff_w = np.zeros(interior)
+        coeff_e = np.zeros(interior)
+
+        # Diffusion terms (same discretisation as calculate_diffusion)
+        diff_fact = np.asarray(diffusivity, dtype=float)[..., np.newaxis, np.newaxis] / solar_radius**2
+        if 'diffusion_theta' in terms:
+            diff_theta_c = diff_fact / dtheta**2
+            diff_theta_cot = diff_fact * cot_c / (2 * dtheta)
+            coeff_c = coeff_c - 2 * diff_theta_c
+            coeff_n = coeff_n + (diff_theta_c - diff_theta_cot)
+            coeff_s = coeff_s + (diff_theta_c + diff_theta_cot)
+        if 'diffusion_phi' in terms:
+            diff_phi = diff_fact / (dphi * sin_c)**2
+            coeff_c = coeff_c - 2 * diff_phi
+            coeff_w = coeff_w + diff_phi
+            coeff_e = coeff_e + diff_phi
+
+        # Upwind advection in theta (same discretisation as calculate_advection)
+        if 'advection_theta' in terms:
+            u_c = meridional_flow[..., 1:-1, 1:-1]
+            u_n = meridional_flow[..., :-2, 1:-1]
+            u_s = meridional_flow[..., 2:, 1:-1]
+            positive_v_theta = u_c > 0
+            negative_v_theta = u_c < 0
+            adv_fact = 1 / (solar_radius * dtheta * sin_c)
+
+            coeff_c = coeff_c - np.abs(u_c) / (solar_radius * dtheta)
+            coeff_n = coeff_n + np.where(positive_v_theta, u_n * sin_theta[:-2] * adv_fact, 0.0)
+            coeff_s = coeff_s - np.where(negative_v_theta, u_s * sin_theta[2:] * adv_fact, 0.0)
+
+        # Upwind advection in phi
+        if 'advection_phi' in terms:
+            omega = differential_rotation[..., 1:-1, 1:-1]
+            coeff_c = coeff_c - np.abs(omega) / dphi
+            coeff_w = coeff_w + np.where(omega > 0, omega / dphi, 0.0)
+            coeff_e = coeff_e - np.where(omega < 0, omega / dphi, 0.0)
+
+        self.coefficients = {
+            'centre': coeff_c,
+            'north': coeff_n,
+            'south': coeff_s,
+            'west': coeff_w,
+            'east': coeff_e,
+        }
+
+        # Leading (member) axes of the coefficients
+        self.batch_shape = np.broadcast_shapes(*(value.shape for value in self.coefficients.values()))[:-2]
+
+        # Scratch buffer (allocated for the shape of the field) and cached time-step scaled coefficients
+        self._scratch = None
+        self._step_dt = None
+        self._step_coefficients = None
+        self._kernel_coefficients = None
+
+    def apply(self, field, out=None):
+        """
+        Evaluates the right-hand side (diffusion minus advection) on the interior of the grid.
+
+        Parameters:
+            field (np.ndarray): The magnetic field on the grid (2D array including the ghost cells,
+                optionally stacked along leading axes).
+            out (np.ndarray, optional): Preallocated interior-shaped array to store the result.
+
+        Returns:
+            np.ndarray: Time derivative of the field on the interior points.
+        """
+        if out is None:
+            out = np.empty(np.broadcast_shapes(field[..., 1:-1, 1:-1].shape, self.batch_shape + (1, 1)),
+                           dtype=np.result_type(field.dtype, self.dtype))
+        self._stencil(self.coefficients, field, out)
+        return out
+
+    def step(self, field, out, time_step):
+        """
+        Advances the interior of the field by one forward Euler step.
+
+        The boundary (ghost) cells of `out` are left untouched and have to be set by the caller.
+
+        Parameters:
+            field (np.ndarray): The magnetic field on the grid (2D array including the ghost cells,
+                optionally stacked along leading axes).
+            out (np.ndarray): Preallocated array of the same shape as `field` to store the update.
+            time_step (float): Time step in seconds.
+
+        Returns:
+            np.ndarray: The updated field `out`.
+        """
+        self._stencil(self._scaled_coefficients(time_step), field, out[..., 1:-1, 1:-1])
+        return out
+
+    def advance(self, field, out, time_step):
+        """
+        Advances the field by one forward Euler step and applies the boundary conditions to `out`.
+
+        With the 'numba' backend the stencil, update and boundary conditions are evaluated in one
+        compiled pass over the grid. With several threads the latitude bands are advanced concurrently.
+
+        Parameters:
+            field (np.ndarray): The magnetic field on the grid (2D array including the ghost cells,
+                optionally stacked along leading axes).
+            out (np.ndarray): Preallocated array of the same shape as `field` to store the update.
+            time_step (float): Time step in seconds.
+
+        Returns:
+            np.ndarray: The updated field `out`.
+        """
+        if self.threads > 1:
+            return self._advance_bands(field, out, time_step)
+        if self.backend == 'numba':
+            self._scaled_coefficients(time_step)
+            grid_shape = field.shape[-2:]
+            fused_step(field.reshape((-1,) + grid_shape), out.reshape((-1,) + grid_shape), *self._kernel_coefficients)
+            return out
+        self.step(field, out, time_step)
+        return apply_boundary_conditions(out)
+
+    def close(self):
+        """
+        Stops the threads of the latitude bands. They are started again if `advance` is called.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _advance_bands(self, field, out, time_step):
+        coefficients = self._scaled_coefficients(time_step)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix='sft-band')
+
+        if self.backend == 'numba':
+            grid_shape = field.shape[-2:]
+            field3d = field.reshape((-1,) + grid_shape)
+            out3d = out.reshape((-1,) + grid_shape)
+            futures = [self._executor.submit(band_step, field3d, out3d, *self._kernel_coefficients, start, stop)
+                       for start, stop in self.bands]
+        else:
+            futures = [self._executor.submit(self._step_band, coefficients, field, out, index)
+                       for index in range(self.threads)]
+        # Join all bands before the boundary conditions (and before the next step reads the halos)
+        for future in futures:
+            future.result()
+        return apply_boundary_conditions(out)
+
+    def _step_band(self, coefficients, field, out, index):
+        # Rows start <= i < stop, reading the rows start - 1 and stop as halos
+        start, stop = self.bands[index]
+        band = {key: value[..., start - 1:stop - 1, :] for key, value in coefficients.items()}
+        band_out = out[..., start:stop, 1:-1]
+        scratch = self._band_scratch[index]
+        if scratch is None or scratch.shape != band_out.shape:
+            scratch = self._band_scratch[index] = np.empty(band_out.shape, dtype=band_out.dtype)
+        _stencil(band, field[..., start - 1:stop + 1, :], band_out, scratch)
+        # Periodic boundary conditions of the band rows
+        out[..., start:stop, 0] = out[..., start:stop, -2]
+        out[..., start:stop, -1] = out[..., start:stop, 1]
+
+    def _scaled_coefficients(self, time_step):
+        if time_step != self._step_dt:
+            self._step_coefficients = {key: time_step * value for key, value in self.coefficients.items()}
+            self._step_coefficients['centre'] += 1.0
+            for key, value in self._step_coefficients.items():
+                self._step_coefficients[key] = value.astype(self.dtype, copy=False)
+            self._step_dt = time_step
+            if self.backend == 'numba':
+                # Contiguous [member, theta, phi] coefficients with a common member axis for the kernel
+                interior = (self.shape[0] - 2, self.shape[1] - 2)
+                self._kernel_coefficients = [
+                    np.ascontiguousarray(np.broadcast_to(self._step_coefficients[key], self.batch_shape + interior))
+                    .reshape((-1,) + interior) for key in ('centre', 'north', 'south', 'west', 'east')]
+        return self._step_coefficients
+
+    def _stencil(self, coefficients, field, out):
+        if self._scratch is None or self._scratch.shape != out.shape:
+            self._scratch = np.empty(out.shape, dtype=out.dtype)
+        _stencil(coefficients, field, out, self._scratch)
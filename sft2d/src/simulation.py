@@ -0,0 +1,375 @@
+"""
+simulation.py
+
+This module provides the time-integration driver for the Solar Surface Flux Transport (SFT) model.
+The field is advanced with a forward Euler scheme using the precomputed `SFTOperator`, with two
+preallocated buffers that are swapped after every sub-step instead of copying the field.
+With the 'semi-implicit' integrator the diffusion term is instead integrated implicitly
+(`ImplicitDiffusion`) after each explicit advection step. An optional `PolarFilter` is applied
+after every sub-step. With the 'spectral' rotation, the differential rotation is split off and
+applied exactly (`SpectralRotation`) in two half steps around the other terms (Strang splitting).
+The 'multirate' integrator (`MultiRateScheduler`) sub-cycles the phi terms per latitude band.
+The 'exponential' integrator (`ExponentialPropagator`) advances the field by the exact exponential of the
+assembled sparse operator, by default in one step per day.
+The explicit step can be split into latitude bands advanced by several threads (see `SFTOperator`) or
+worker processes sharing the field buffers (`ProcessBandOperator`).
+Several realisations (ensemble members) that share the grid and time step can be advanced together
+as one stacked field [member, theta, phi].
+
+Classes:
+    - Simulation: Holds the state of an SFT run and advances it in time.
+    - Cadence: Selects the sub-steps on which a periodic action (output, diagnostics) is due.
+
+Functions:
+    - run: Convenience wrapper that builds a Simulation and runs it for a number of days.
+"""
+
+import numpy as np
+
+from . import transport_profiles
+from .decomposition import ProcessBandOperator
+from .exponential import ExponentialPropagator
+from .grid import grid_dtype
+from .implicit import ImplicitDiffusion
+from .multirate import MultiRateScheduler
+from .polar_filter import PolarFilter
+from .rotation import SpectralRotation
+from .sft_operator import TERMS, SFTOperator
+from .time_step import (
+    ADVECTION_LIMITS,
+    CFL_LIMITS,
+    ROTATION_LIMITS,
+    calculate_time_step,
+    fit_time_step,
+)
+
+
+class Cadence:
+    """
+    Selects the sub-steps on which a periodic action falls, for use inside simulation hooks.
+
+    The action is due on the sub-step closest to each multiple of the cadence, counted from the
+    first time `due` is called, and at most once per sub-step.
+
+    Parameters:
+        every (float): Cadence in days, can be smaller than one day.
+    """
+
+    def __init__(self, every):
+        self.every = every
+        self._next_time = None
+        self._last_step = None
+
+    def due(self, simulation):
+        """
+        Returns True if the action is due at the current state of the simulation.
+        """
+        time = simulation.time
+        if self._next_time is None:
+            self._next_time = time
+
+        tolerance = 0.5 / simulation.steps_per_day
+        if time + tolerance < self._next_time or simulation.step_count == self._last_step:
+            return False
+
+        self._last_step = simulation.step_count
+        while self._next_time <= time + tolerance:
+            self._next_time += self.every
+        return True
+
+    def state_dict(self):
+        """
+        Returns the state of the cadence, for checkpoints (see `Checkpointer`).
+        """
+        return {'next_time': self._next_time, 'last_step': self._last_step}
+
+    def load_state_dict(self, state):
+        """
+        Restores the state returned by `state_dict`.
+        """
+        self._next_time = state.get('next_time')
+        self._last_step = state.get('last_step')
+
+
+class Simulation:
+    """
+    State and driver of a single SFT run.
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        field (np.ndarray): Initial magnetic field, e.g. from `initialize_field`, or a stack of initial
+            fields [member, theta, phi]. It is copied, and broadcast to the members of the other inputs.
+        diffusivity (float or np.ndarray): The diffusivity value (e.g., 250 km^2/s), or one value per member.
+        meridional_flow (np.ndarray, optional): Meridional flow profile, optionally stacked per member.
+            Default is `meridional_flow(grid)`.
+        differential_rotation (np.ndarray, optional): Angular velocity profile, optionally stacked per member.
+            Default is `differential_rotation(grid)`.
+        time_step (float, optional): Time step in seconds, at most one day. It is shortened to fit exactly
+            into one day. Default is the CFL limited value from `calculate_time_step`.
+        cfl_number (float): CFL number used when the time step is not given.
+        integrator (str): 'explicit' (forward Euler for all terms, the reference scheme) or
+            'semi-implicit' (explicit advection, implicit diffusion) or 'multirate' (explicit, with the
+            phi terms sub-cycled per latitude band) or 'exponential' (exact exponential of the assembled
+            operator, see `ExponentialPropagator`). With 'semi-implicit' the default time step is only
+            limited by the flows (the rotation limit keeps it short unless rotation='spectral'), with
+            'multirate' only by the theta terms, and with 'exponential' it is one day (a shorter
+            `time_step` gives outputs within the day; longer quiet intervals can be jumped over with
+            `ExponentialPropagator.advance`).
+        implicit_scheme (str): Scheme of the implicit diffusion, 'crank-nicolson' or 'backward-euler'.
+        exponential_method (str): Method of the exponential action, 'krylov' or 'expm_multiply'.
+        polar_filter_latitude (float, optional): If given, the longitudinal modes poleward of this
+            latitude (degrees) that are unresolved at its grid spacing are filtered after every sub-step,
+            and the default time step uses the effective spacing of the filtered grid.
+        rotation (str): 'upwind' (differential rotation in the explicit operator) or 'spectral'
+            (exact shift of each row, split from the other terms). With 'spectral' the default time
+            step is not limited by the rotation.
+        backend (str): Backend of the explicit stencil, 'auto' (Numba if installed), 'numpy' or 'numba'.
+        flow_scale (float or np.ndarray, optional): Amplitude factor of the meridional flow, or one factor
+            per member.
+        dtype (np.dtype, optional): Precision of the field and the solver (float64 or float32). Default is
+            the precision of the grid (see `create_grid`).
+        threads (int, optional): Number of threads of the explicit stencil step, each advancing a latitude
+            band (see `SFTOperator`). Default is 1; None uses all CPUs. The result does not depend on it.
+        processes (int, optional): Number of worker processes of the explicit stencil step, each advancing
+            a latitude band of the field held in shared memory (see `ProcessBandOperator`). Default is 1
+            (no workers); None uses all CPUs. Cannot be combined with several threads or with the
+            'exponential' integrator. The workers are stopped by `close`.
+    """
+
+    def __init__(self, grid, field, diffusivity, meridional_flow=None, differential_rotation=None,
+                 time_step=None, cfl_number=0.4, integrator='explicit', implicit_scheme='crank-nicolson',
+                 polar_filter_latitude=None, rotation='upwind', backend='auto', flow_scale=None, dtype=None,
+                 threads=1, processes=1, exponential_method='krylov'):
+        if meridional_flow is None:
+            meridional_flow = transport_profiles.meridional_flow(grid)
+        if differential_rotation is None:
+            differential_rotation = transport_profiles.differential_rotation(grid)
+        if flow_scale is not None:
+            meridional_flow = np.asarray(flow_scale, dtype=float)[..., np.newaxis, np.newaxis] * meridional_flow
+
+        self.grid = grid
+        self.dtype = grid_dtype(grid, dtype)
+        self.diffusivity = diffusivity
+        self.meridional_flow = meridional_flow
+        self.differential_rotation = differential_rotation
+        self.integrator = integrator
+        self.diffusion = None
+        self.scheduler = None
+        if processes != 1 and threads != 1:
+            raise ValueError("Use either several threads or several processes.")
+
+        if integrator == 'explicit':
+            terms = TERMS
+            limits = CFL_LIMITS
+        elif integrator == 'semi-implicit':
+            terms = ('advection_theta', 'advection_phi')
+            self.diffusion = ImplicitDiffusion(grid, diffusivity, implicit_scheme, self.dtype)
+            limits = ADVECTION_LIMITS + ROTATION_LIMITS
+        elif integrator == 'multirate':
+            terms = TERMS
+            limits = ()  # The scheduler provides the time step
+        elif integrator == 'exponential':
+            terms = TERMS
+            limits = ()
+            if processes != 1:
+                raise ValueError("The exponential integrator cannot be combined with several processes.")
+            if time_step is None:
+                time_step = 86400.0
+        else:
+            raise ValueError("integrator must be 'explicit', 'semi-implicit', 'multirate' or 'exponential'.")
+
+        if rotation == 'upwind':
+            self.rotation = None
+        elif rotation == 'spectral':
+            self.rotation = SpectralRotation(grid, differential_rotation)
+            terms = tuple(term for term in terms if term != 'advection_phi')
+            limits = tuple(limit for limit in limits if limit not in ROTATION_LIMITS)
+        else:
+            raise ValueError("rotation must be 'upwind' or 'spectral'.")
+
+        if integrator == 'multirate':
+            self.scheduler = MultiRateScheduler(grid, diffusivity, meridional_flow, differential_rotation,
+                                                cfl_number, 'advection_phi' in terms, polar_filter_latitude,
+                                                backend, self.dtype, threads)
+            self.operator = self.scheduler.theta_operator
+        else:
+            self.operator = SFTOperator(grid, diffusivity, meridional_flow, differential_rotation, terms=terms,
+                                        backend=backend, dtype=self.dtype, threads=threads)
+        if integrator == 'exponential':
+            self.operator = ExponentialPropagator(self.operator, exponential_method)
+
+        self.polar_filter = None
+        if polar_filter_latitude is not None:
+            self.polar_filter = PolarFilter(grid, polar_filter_latitude)
+
+        if time_step is None and self.scheduler is not None:
+            # Stable step of the theta group of the split scheme (at most a day), rounded to fit the day below
+            time_step = min(self.scheduler.theta_limit, 86400.0)
+        if time_step is None:
+            time_step, steps_per_day = calculate_time_step(grid, diffusivity, cfl_number, limits,
+                                                           meridional_flow, differential_rotation,
+                                                           polar_filter_latitude)
+        else:
+            if time_step > 86400:
+                raise ValueError("time_step must be at most one day (86400 s); the runs advance whole days.")
+            time_step, steps_per_day = fit_time_step(time_step)
+        self.time_step = time_step
+        self.steps_per_day = steps_per_day
+
+        # Double buffer for the field, with the members of all inputs
+        members = np.broadcast_shapes(np.shape(field)[:-2], np.shape(diffusivity),
+                                      np.shape(meridional_flow)[:-2], np.shape(differential_rotation)[:-2])
+        shape = members + np.shape(field)[-2:]
+        if processes == 1:
+            self._field = np.array(np.broadcast_to(field, shape), dtype=self.dtype)
+            self._next = self._field.copy()
+        else:
+            # The double buffer is held in the shared memory of the worker processes
+            self.operator = ProcessBandOperator(self.operator, shape, processes)
+            if self.scheduler is not None:
+                self.scheduler.theta_operator = self.operator
+            self._field, self._next = self.operator.buffers
+            self._field[...] = np.broadcast_to(field, shape)
+            self._next[...] = self._field
+
+        self.day = 0
+        self.step_count = 0
+
+    @property
+    def field(self):
+        """
+        Current magnetic field. This is a live view of the internal buffer, copy it to keep a snapshot.
+        """
+        return self._field
+
+    @property
+    def time(self):
+        """
+        Simulated time in days since the start of the run.
+        """
+        return self.step_count / self.steps_per_day
+
+    def state_dict(self):
+        """
+        Returns the state of the run (a copy of the field, the step and day counters and the time
+        step), for checkpoints (see `Checkpointer`).
+
+        Returns:
+            dict: The state.
+        """
+        return {
+            'field': self._field.copy(),
+            'step_count': self.step_count,
+            'day': self.day,
+            'time_step': self.time_step,
+            'steps_per_day': self.steps_per_day,
+        }
+
+    def load_state_dict(self, state):
+        """
+        Restores the state returned by `state_dict`. The simulation must have been set up with the
+        same grid, inputs and options as the one that wrote the state.
+
+        Parameters:
+            state (dict): The state.
+        """
+        field = np.asarray(state['field'])
+        if field.shape != self._field.shape:
+            raise ValueError(f"The saved field has the shape {field.shape}, expected {self._field.shape}.")
+        if state['steps_per_day'] != self.steps_per_day or state['time_step'] != self.time_step:
+            raise ValueError("The saved state was computed with a different time step.")
+        self._field[...] = field
+        self.step_count = int(state['step_count'])
+        self.day = int(state['day'])
+
+    def step(self):
+        """
+        Advances the field by one sub-step.
+        """
+        if self.rotation is not None:
+            self.rotation.apply(self._field, 0.5 * self.time_step)
+        if self.scheduler is not None:
+            self.scheduler.step(self._field, self._next, self.time_step)
+        else:
+            self.operator.advance(self._field, self._next, self.time_step)
+        if self.diffusion is not None:
+            self.diffusion.solve(self._next, self.time_step)
+        if self.polar_filter is not None:
+            self.polar_filter.apply(self._next)
+        if self.rotation is not None:
+            self.rotation.apply(self._next, 0.5 * self.time_step)
+        self._field, self._next = self._next, self._field
+        self.step_count += 1
+
+    def close(self):
+        """
+        Stops the worker processes or threads of a simulation with several of them. The field remains
+        readable.
+        """
+        if isinstance(self.operator, (ProcessBandOperator, SFTOperator)):
+            self.operator.close()
+
+    def advance_day(self, step_hooks=()):
+        """
+        Advances the field by one day (`steps_per_day` sub-steps).
+
+        Parameters:
+            step_hooks (list, optional): Callables `hook(simulation)` evaluated after every sub-step.
+        """
+        for _ in range(self.steps_per_day):
+            self.step()
+            for hook in step_hooks:
+                hook(self)
+        self.day += 1
+
+    def run(self, num_days, daily_hooks=(), step_hooks=(), progress=False):
+        """
+        Runs the simulation for a number of days.
+
+        Each hook is a callable `hook(simulation)`. All hooks are also evaluated once on the
+        initial field when the run starts from day 0, so that day 0 is included in any output.
+
+        Parameters:
+            num_days (int): Number of days to run.
+            daily_hooks (list, optional): Callables evaluated after every simulated day, e.g. to store output.
+            step_hooks (list, optional): Callables evaluated after every sub-step.
+            progress (bool): If True, shows a progress bar (requires tqdm).
+
+        Returns:
+            Simulation: The simulation itself.
+        """
+        if self.day == 0 and self.step_count == 0:
+            for hook in (*step_hooks, *daily_hooks):
+                hook(self)
+
+        days = range(num_days)
+        if progress:
+            from tqdm import tqdm
+            days = tqdm(days, desc='Simulation days: ')
+
+        for _ in days:
+            self.advance_day(step_hooks)
+            for hook in daily_hooks:
+                hook(self)
+        return self
+
+
+def run(grid, field, diffusivity, num_days, daily_hooks=(), step_hooks=(), progress=False, **kwargs):
+    """
+    Builds a Simulation and runs it for a number of days.
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        field (np.ndarray): Initial magnetic field.
+        diffusivity (float): The diffusivity value (e.g., 250 km^2/s).
+        num_days (int): Number of days to run.
+        daily_hooks (list, optional): Callables `hook(simulation)` evaluated after every simulated day.
+        step_hooks (list, optional): Callables `hook(simulation)` evaluated after every sub-step.
+        progress (bool): If True, shows a progress bar (requires tqdm).
+        **kwargs: Further keyword arguments passed to `Simulation`.
+
+    Returns:
+        Simulation: The simulation after the run.
+    """
+    simulation = Simulation(grid, field, diffusivity, **kwargs)
+    return simulation.run(num_days, daily_hooks=daily_hooks, step_hooks=step_hooks, progress=progress)
@@ -0,0 +1,206 @@
+"""
+snapshots.py
+
+This module handles the storage of the Solar Surface Flux Transport (SFT) model output on disk.
+Snapshots of the field are streamed into a chunked (and optionally compressed) HDF5 dataset
+together with the grid and run metadata, so that the memory use of a run does not grow with
+its length.
+
+Classes:
+    - SnapshotWriter: Streams field snapshots into an HDF5 file, usable as a Simulation hook.
+    - SnapshotReader: Gives lazy access to the snapshots stored by SnapshotWriter.
+"""
+
+import os
+
+import h5py
+import numpy as np
+
+from .grid import grid_dtype
+from .simulation import Cadence
+
+
+class SnapshotWriter:
+    """
+    Streams snapshots of the magnetic field into an HDF5 file.
+
+    The file contains the datasets 'br' [time, latitude, longitude] and 'time' (in days), the
+    grid arrays in the group 'grid' and the run metadata as attributes of the root group.
+    The writer can be passed directly as a hook to `Simulation.run`: as a daily hook for a
+    cadence of one or more days, or as a step hook for sub-daily cadences.
+
+    Parameters:
+        path (str): Path of the HDF5 file. An existing file is overwritten.
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        cadence (float): Output cadence in days. Default is 1 (daily).
+        compression (str, optional): HDF5 compression filter, e.g. 'gzip' or 'lzf'. Default is no compression.
+        compression_opts (int, optional): Compression level for 'gzip'.
+        dtype (np.dtype, optional): Storage type of the snapshots. Default is the precision of the grid.
+        metadata (dict, optional): Additional run metadata stored as attributes.
+        resume (bool): If True and the file exists, snapshots are appended to it instead, for a run
+            restored from a checkpoint.
+    """
+
+    def __init__(self, path, grid, cadence=1, compression=None, compression_opts=None, dtype=None,
+                 metadata=None, resume=False):
+        num_theta = grid['colatitude'].size
+        num_phi = grid['longitude'].size
+
+        self.path = path
+        self.cadence = cadence
+        if resume and os.path.exists(path):
+            # Continue the file of an interrupted run, see `load_state_dict`
+            self._file = h5py.File(path, 'a')
+            self._br = self._file['br']
+            self._time = self._file['time']
+            self._cadence = Cadence(cadence)
+            self._metadata_written = True
+            return
+
+        self._file = h5py.File(path, 'w')
+        self._br = self._file.create_dataset(
+            'br', shape=(0, num_theta, num_phi), maxshape=(None, num_theta, num_phi),
+            chunks=(1, num_theta, num_phi), dtype=grid_dtype(grid) if dtype is None else dtype,
+            compression=compression, compression_opts=compression_opts,
+            shuffle=compression is not None,
+        )
+        self._time = self._file.create_dataset('time', shape=(0,), maxshape=(None,), dtype=np.float64)
+
+        grid_group = self._file.create_group('grid')
+        for key, value in grid.items():
+            if np.ndim(value):
+                grid_group.create_dataset(key, data=value)
+            else:
+                grid_group.attrs[key] = value
+
+        self._file.attrs['cadence'] = cadence
+        for key, value in (metadata or {}).items():
+            self._file.attrs[key] = value
+
+        self._cadence = Cadence(cadence)
+        self._metadata_written = False
+
+    def write(self, field, time):
+        """
+        Appends one snapshot to the file.
+
+        Parameters:
+            field (np.ndarray): The magnetic field on the grid (2D array).
+            time (float): Simulated time of the snapshot in days.
+        """
+        index = self._br.shape[0]
+        self._br.resize(index + 1, axis=0)
+        self._time.resize(index + 1, axis=0)
+        self._br[index] = field
+        self._time[index] = time
+
+    def __call__(self, simulation):
+        """
+        Hook for `Simulation.run`: writes the current field if it falls on the output cadence.
+        """
+        if not self._metadata_written:
+            self._file.attrs['diffusivity'] = simulation.diffusivity
+            self._file.attrs['time_step'] = simulation.time_step
+            self._file.attrs['steps_per_day'] = simulation.steps_per_day
+            self._metadata_written = True
+
+        if self._cadence.due(simulation):
+            self.write(simulation.field, simulation.time)
+
+    def state_dict(self):
+        """
+        Returns the number of written snapshots and the cadence state, for checkpoints (see `Checkpointer`).
+        The snapshots are flushed to disk first.
+        """
+        self._file.flush()
+        return {'num_snapshots': self._br.shape[0], 'cadence': self._cadence.state_dict()}
+
+    def load_state_dict(self, state):
+        """
+        Restores the state returned by `state_dict`. Snapshots written after the checkpoint are
+        removed, they are written again by the restored run.
+        """
+        num_snapshots = int(state['num_snapshots'])
+        if num_snapshots > self._br.shape[0]:
+            raise ValueError(f"The file has {self._br.shape[0]} snapshots, the checkpoint expects {num_snapshots}.")
+        self._br.resize(num_snapshots, axis=0)
+        self._time.resize(num_snapshots, axis=0)
+        self._cadence.load_state_dict(state.get('cadence', {}))
+
+    def flush(self):
+        """
+        Flushes the buffered snapshots to disk.
+        """
+        self._file.flush()
+
+    def close(self):
+        """
+        Closes the HDF5 file.
+        """
+        if self._file:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SnapshotReader:
+    """
+    Lazy access to the snapshots written by `SnapshotWriter`.
+
+    Indexing the reader (or its `br` dataset) only reads the requested time slices from disk,
+    e.g. `reader[10]` returns the field of the eleventh snapshot and `reader[0:365:27]` a 3D array.
+
+    Parameters:
+        path (str): Path of the HDF5 file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = h5py.File(path, 'r')
+        self.br = self._file['br']
+        self.time = self._file['time'][:]
+        self.metadata = dict(self._file.attrs)
+
+        grid_group = self._file['grid']
+        self.grid = {key: grid_group[key][:] for key in grid_group}
+        self.grid.update(grid_group.attrs)
+
+    @property
+    def shape(self):
+        return self.br.shape
+
+    def __len__(self):
+        return self.br.shape[0]
+
+    def __getitem__(self, index):
+        return self.br[index]
+
+    def iter_chunks(self, chunk_size=64):
+        """
+        Iterates over the snapshots in blocks along the time axis.
+
+        Parameters:
+            chunk_size (int): Number of snapshots per block.
+
+        Yields:
+            tuple: Index of the first snapshot of the block and the 3D block [time, latitude, longitude].
+        """
+        for start in range(0, len(self), chunk_size):
+            yield start, self.br[start:start + chunk_size]
+
+    def close(self):
+        """
+        Closes the HDF5 file.
+        """
+        if self._file:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,259 @@
+"""
+sources.py
+
+This module provides the bipolar magnetic region (BMR) source term of the Solar Surface Flux Transport (SFT)
+model, following `docs/sft2d-theory.md`: two Gaussian polarities separated along the Joy's law tilt, with
+Hale's law polarity signs, normalised to a given unsigned flux.
+
+Each region is deposited on a small window of the grid around its polarities instead of the whole sphere.
+The footprint of a region only depends on its latitude, tilt, separation, width and polarity, so its centre
+longitude is quantised to a fraction of a grid cell and the footprint is computed once, cached, and shifted
+by whole grid columns in longitude.
+Each polarity is normalised separately on the window, so that every deposited region is exactly flux
+balanced.
+
+Functions:
+    - bipole_centres: Colatitude and longitude of the leading and following polarity centres.
+    - bipole_field: Field of a single BMR on the grid.
+
+Classes:
+    - BMRSource: Deposits BMRs into the field, directly or as a `Simulation` hook driven by a table of regions.
+"""
+
+import numpy as np
+
+from .grid import grid_dtype
+from .sft_operator import apply_boundary_conditions, solar_radius
+
+# Columns of a table of regions (see `BMRSource`); 'width' is optional
+REGION_COLUMNS = ('time', 'latitude', 'longitude', 'flux', 'tilt', 'separation')
+
+
+def bipole_centres(latitude, longitude, tilt, separation):
+    """
+    Computes the polarity centres of a bipole from its centre, tilt and separation.
+
+    The separation vector lies in the tangent plane at the centre, at an angle `tilt` from the local
+    east direction (Joy's law: a positive tilt puts the leading polarity closer to the equator in the
+    north, a negative tilt in the south), and the polarities are placed at +/- half the separation along it.
+
+    All parameters can also be arrays of the same shape (one entry per bipole).
+
+    Parameters:
+        latitude (float or np.ndarray): Latitude of the centre in degrees.
+        longitude (float or np.ndarray): Longitude of the centre in degrees.
+        tilt (float or np.ndarray): Tilt angle in degrees.
+        separation (float or np.ndarray): Angular separation of the polarities in degrees.
+
+    Returns:
+        tuple: ((theta_lead, phi_lead), (theta_foll, phi_foll)) in radians, with phi in [0, 2pi).
+    """
+    lat, lon, tilt, separation = np.broadcast_arrays(latitude, longitude, tilt, separation)
+    lat = np.radians(lat)
+    lon = np.radians(lon) % (2 * np.pi)
+    tilt = np.radians(tilt)
+    half_separation = np.radians(separation / 2)
+
+    # Centre and local tangent basis (e_lambda = -e_theta as defined in the theory document)
+    r0 = np.array([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+    e_phi = np.array([-np.sin(lon), np.cos(lon), np.zeros_like(lon)])
+    e_lambda = np.array([np.sin(lat) * np.cos(lon), np.sin(lat) * np.sin(lon), -np.cos(lat)])
+    direction = np.cos(tilt) * e_phi + np.sin(tilt) * e_lambda
+
+    centres = []
+    for vector in (r0 + half_separation * direction, r0 - half_separation * direction):
+        theta = np.arccos(vector[2] / np.linalg.norm(vector, axis=0))
+        phi = np.arctan2(vector[1], vector[0]) % (2 * np.pi)
+        centres.append((theta, phi))
+    return tuple(centres)
+
+
+def bipole_field(grid, latitude, longitude, flux, tilt, separation, width=4.0, apply_hale=True):
+    """
+    Returns the field of a single BMR on the grid (see `BMRSource` for the parameters).
+
+    Returns:
+        np.ndarray: Radial field of the BMR (2D array including the ghost cells).
+    """
+    field = np.zeros((grid['colatitude'].size, grid['longitude'].size), dtype=grid_dtype(grid))
+    source = BMRSource(grid, width=width, apply_hale=apply_hale)
+    source.deposit(field, latitude, longitude, flux, tilt, separation)
+    return field
+
+
+class BMRSource:
+    """
+    Deposits bipolar magnetic regions into the field on local windows.
+
+    The field of a region is `flux` times a footprint of unit unsigned flux,
+    s_lead * G_lead / F_lead + s_foll * G_foll / F_foll (scaled to unit unsigned flux), where G are
+    the Gaussians of the theory document and F their flux on the window. The leading polarity is
+    positive in the north and negative in the south (Hale's law); a negative flux reverses both.
+
+    As a hook for `Simulation.run`, the source deposits the regions of `regions` whose emergence time
+    falls between the previous call and the current simulation time.
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('colatitude', 'longitude', and their spacings).
+        regions (dict or np.ndarray, optional): Table of regions with the columns 'time' (days since the start
+            of the run), 'latitude', 'longitude' (degrees), 'flux' (Mx), 'tilt' and 'separation' (degrees),
+            and optionally 'width' (degrees). Any mapping or structured array with these names.
+        width (float): Default Gaussian width (sigma) of the polarities in degrees.
+        window (float): Half size of the deposition window, in units of the width.
+        apply_hale (bool): If False, the leading polarity is positive in both hemispheres.
+        R_sun (float): Solar radius in cm used for the area elements.
+        subcells (int): Number of positions per grid cell the centre longitudes are quantised to.
+        cache_size (int): Maximum number of cached footprints.
+    """
+
+    def __init__(self, grid, regions=None, width=4.0, window=4.0, apply_hale=True,
+                 R_sun=solar_radius * 1e2, subcells=4, cache_size=4096):
+        self.grid = grid
+        self.width = width
+        self.window = window
+        self.subcells = subcells
+        self.apply_hale = apply_hale
+        self.cache_size = cache_size
+
+        colatitude = grid['colatitude']
+        self._theta = colatitude[1:-1]
+        self._area = R_sun**2 * np.sin(self._theta) * grid['dtheta'] * grid['dphi']
+        self._num_ring = grid['longitude'].size - 2
+        self._cache = {}
+
+        self.regions = None
+        self._last_time = -np.inf
+        if regions is not None:
+            names = regions.dtype.names if hasattr(regions, 'dtype') else list(regions.keys())
+            missing = set(REGION_COLUMNS) - set(names)
+            if missing:
+                raise ValueError(f"The table of regions is missing the columns {sorted(missing)}.")
+            columns = REGION_COLUMNS + (('width',) if 'width' in names else ())
+            order = np.argsort(np.asarray(regions['time']), kind='stable')
+            self.regions = {name: np.asarray(regions[name], dtype=float)[order] for name in columns}
+
+    def footprint(self, latitude, tilt, separation, width=None, offset=0.0):
+        """
+        Returns the cached footprint of a region centred at `offset` grid cells east of a grid column.
+
+        Parameters:
+            latitude (float): Latitude of the centre in degrees.
+            tilt (float): Tilt angle in degrees.
+            separation (float): Angular separation of the polarities in degrees.
+            width (float, optional): Gaussian width in degrees. Default is the width of the source.
+            offset (float): Position of the centre within the grid cell, in cells (0 <= offset < 1).
+
+        Returns:
+            tuple: Row slice of the field, column offsets from the centre column, and the footprint values
+            (unit unsigned flux).
+        """
+        width = self.width if width is None else width
+        key = (latitude, tilt, separation, width, offset)
+        if key in self._cache:
+            return self._cache[key]
+
+        dphi = self.grid['dphi']
+        centre = np.degrees(offset * dphi)
+        (theta_lead, phi_lead), (theta_foll, phi_foll) = bipole_centres(latitude, centre, tilt, separation)
+        phi_lead = (phi_lead + np.pi) % (2 * np.pi) - np.pi
+        phi_foll = (phi_foll + np.pi) % (2 * np.pi) - np.pi
+        sigma = np.radians(width)
+        reach = self.window * sigma
+
+        # Window around both polarities
+        rows = np.flatnonzero((self._theta >= min(theta_lead, theta_foll) - reach)
+                              & (self._theta <= max(theta_lead, theta_foll) + reach))
+        if rows.size == 0:
+            raise ValueError(f"The deposition window of the region at latitude {latitude} (width {width} degrees) "
+                             "covers no row of the grid; use a larger width or window.")
+        first = int(np.floor((min(phi_lead, phi_foll) - reach) / dphi))
+        last = int(np.ceil((max(phi_lead, phi_foll) + reach) / dphi))
+        last = min(last, first + self._num_ring - 1)
+        offsets = np.arange(first, last + 1)
+
+        theta = self._theta[rows, np.newaxis]
+        phi = offsets * dphi
+        area = self._area[rows, np.newaxis]
+
+        # Each polarity normalised to unit flux on the window, so that the region is flux balanced
+        sign_lead = 1.0 if latitude >= 0 or not self.apply_hale else -1.0
+        values = np.zeros((rows.size, offsets.size))
+        for theta_c, phi_c, sign in ((theta_lead, phi_lead, sign_lead), (theta_foll, phi_foll, -sign_lead)):
+            gaussian = np.exp(-((theta - theta_c)**2 + (phi - phi_c)**2) / (2 * sigma**2))
+            values += sign * gaussian / np.sum(gaussian * area)
+        values /= np.sum(np.abs(values) * area)
+
+        entry = (slice(rows[0] + 1, rows[-1] + 2), offsets, values)
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[key] = entry
+        return entry
+
+    def deposit(self, field, latitude, longitude, flux, tilt, separation, width=None):
+        """
+        Adds one or several regions to the field in place and updates the ghost cells.
+
+        All parameters can be scalars or arrays of the same length (one entry per region).
+
+        Parameters:
+            field (np.ndarray): The magnetic field on the grid (2D array including the ghost cells,
+                optionally stacked along leading axes).
+            latitude (float or np.ndarray): Latitude of the centres in degrees.
+            longitude (float or np.ndarray): Longitude of the centres in degrees (quantised to `subcells`).
+            flux (float or np.ndarray): Unsigned flux of the regions in Mx.
+            tilt (float or np.ndarray): Tilt angles in degrees.
+            separation (float or np.ndarray): Separation of the polarities in degrees.
+            width (float or np.ndarray, optional): Gaussian widths in degrees. Default is the width of the source.
+
+        Returns:
+            np.ndarray: The updated field.
+        """
+        latitude, longitude, flux, tilt, separation = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(value, dtype=float)) for value in (latitude, longitude, flux, tilt, separation)))
+        width = np.broadcast_to(self.width if width is None else width, latitude.shape)
+
+        dphi = self.grid['dphi']
+        position = np.round(np.radians(longitude % 360.0) / dphi * self.subcells) / self.subcells
+        centres = np.floor(position).astype(int)
+        fractions = position - centres
+        for index in range(latitude.size):
+            rows, offsets, values = self.footprint(latitude[index], tilt[index], separation[index], width[index],
+                                                   fractions[index])
+            centre = centres[index]
+            # Columns wrap on the periodic ring of interior columns
+            columns = (centre - 1 + offsets) % self._num_ring + 1
+            field[..., rows, columns] += flux[index] * values
+        return apply_boundary_conditions(field)
+
+    def state_dict(self):
+        """
+        Returns the position of the source in its table of regions, for checkpoints (see `Checkpointer`).
+        """
+        return {'last_time': self._last_time}
+
+    def load_state_dict(self, state):
+        """
+        Restores the state returned by `state_dict`.
+        """
+        self._last_time = float(state['last_time'])
+
+    def __call__(self, simulation):
+        """
+        Hook for `Simulation.run`: deposits the regions that emerged since the previous call.
+        """
+        batch = self._emerged(simulation)
+        if batch is not None:
+            self.deposit(simulation.field, batch['latitude'], batch['longitude'], batch['flux'],
+                         batch['tilt'], batch['separation'], batch.get('width'))
+
+    def _emerged(self, simulation):
+        # Regions of the table that emerged since the previous call, or None
+        if self.regions is None:
+            return None
+        times = self.regions['time']
+        start = np.searchsorted(times, self._last_time, side='right')
+        stop = np.searchsorted(times, simulation.time, side='right')
+        self._last_time = simulation.time
+        if stop == start:
+            return None
+        return {name: values[start:stop] for name, values in self.regions.items()}
@@ -5,25 +5,44 @@ This module handles the computation of the time step for the Solar Surface Flux
 based on the Courant-Friedrichs-Lewy (CFL) condition.
 
 Functions:
+    - calculate_cfl_limits: Calculates the stability limit of each transport term separately.
+    - fit_time_step: Fits a time step into a whole number of steps per day.
     - calculate_time_step: Calculates the maximum allowable time step for the model.
 """
 
+import math
+
 import numpy as np
-from .transport_profiles import meridional_flow, differential_rotation
+from . import transport_profiles
+
+# Stability limits of the transport terms, grouped by the term they restrict
+DIFFUSION_LIMITS = ('diff_theta', 'diff_phi')
+ADVECTION_LIMITS = ('adv_theta', 'adv_phi')
+ROTATION_LIMITS = ('rot_theta', 'rot_phi', 'omega_phi')
+CFL_LIMITS = DIFFUSION_LIMITS + ADVECTION_LIMITS + ROTATION_LIMITS
 
 
-def calculate_time_step(grid, diffusivity, cfl_number=0.4):
+def calculate_cfl_limits(grid, diffusivity, meridional_flow=None, differential_rotation=None,
+                         polar_filter_latitude=None, per_row=False):
     """
-    Calculates the maximum allowable time step based on the CFL condition for advection and diffusion.
+    Calculates the explicit stability limit of each transport term.
+
+    With a polar filter (see `PolarFilter`) the longitudinal grid spacing poleward of the filter
+    latitude is replaced by the spacing at the filter latitude in the limits that depend on it.
+    The rotation limit 'omega_phi' is a Courant number in grid cells and is not relaxed by the filter.
 
     Parameters:
         grid (dict): Dictionary containing grid information ('theta', 'phi', and their spacings).
-        diffusivity: Magnetic diffusivity for SFT model in cm^2/s.
-        cfl_number (float): CFL number (e.g., 0.4).
+        diffusivity: Magnetic diffusivity for SFT model in cm^2/s (the largest value is used for stacked members).
+        meridional_flow (np.ndarray, optional): Meridional flow profile. Default is `meridional_flow(grid)`.
+        differential_rotation (np.ndarray, optional): Angular velocity profile. Default is `differential_rotation(grid)`.
+            Stacked profiles (leading member axes) give the limits over all members.
+        polar_filter_latitude (float, optional): Reference latitude (degrees) of the polar filter, if any.
+        per_row (bool): If True, the limits are returned for each latitude row (minimum over longitude)
+            instead of over the whole grid.
 
     Returns:
-        float: Maximum allowable time step in seconds.
-        float: Number of time steps per day.
+        dict: Time step limits in seconds (before applying the CFL number), keyed by the names in `CFL_LIMITS`.
     """
     # Read the grid information
     theta = grid['colatitude']
@@ -32,30 +51,86 @@ def calculate_time_step(grid, diffusivity, cfl_number=0.4):
     delta_phi = grid['dphi']
 
     Colatitude, _ = np.meshgrid(theta,phi,indexing='ij')
+    diffusivity = np.max(diffusivity)
 
     # Grid spacings in physical units
     solar_radius = 6.955 * 10**8  # Solar radius in meters
 
     # Advection velocities
-    mf_ = meridional_flow(grid)
-    dr_ = differential_rotation(grid)
+    mf_ = transport_profiles.meridional_flow(grid) if meridional_flow is None else meridional_flow
+    dr_ = transport_profiles.differential_rotation(grid) if differential_rotation is None else differential_rotation
     v_phi = dr_* solar_radius * np.sin(Colatitude)
 
+    # Effective sin(theta) of the longitudinal grid spacing
+    sin_phi = np.sin(Colatitude)
+    if polar_filter_latitude is not None:
+        sin_phi = np.maximum(sin_phi, np.cos(np.deg2rad(polar_filter_latitude)))
+
+    def reduce(limit):
+        if per_row:
+            limit = np.broadcast_to(limit, np.broadcast_shapes(np.shape(limit), Colatitude.shape))
+            return np.min(limit, axis=tuple(axis for axis in range(limit.ndim) if axis != limit.ndim - 2))
+        return np.min(limit)
+
     # Time step calculation based on CFL condition
-    dt_diff_theta = np.min((solar_radius * delta_theta) ** 2 / diffusivity)
-    dt_diff_phi = np.min((solar_radius * delta_phi * np.sin(theta)) ** 2 / diffusivity)
-    dt_adv_theta = np.min(np.abs((solar_radius * delta_theta) / (mf_ + 0.001)))
-    dt_adv_phi = np.min(np.abs((solar_radius * delta_phi * np.sin(Colatitude)) / (mf_ + 0.001)))
-    dt_rot_theta = np.min((solar_radius * delta_theta) / np.abs(v_phi))
-    dt_rot_phi = np.min((solar_radius * delta_phi * np.sin(Colatitude)) / np.abs(v_phi))
-    dt_omega_phi = np.min(delta_phi/np.abs(dr_))
-
-    time_step = cfl_number * np.min([dt_diff_theta, dt_diff_phi, dt_adv_theta, dt_adv_phi, dt_rot_theta, dt_rot_phi, dt_omega_phi])
-
-    # Modify to fit exactly into one day:
-    ndt = round(86400 / time_step)
+    return {
+        'diff_theta': reduce((solar_radius * delta_theta) ** 2 / diffusivity),
+        'diff_phi': reduce((solar_radius * delta_phi * sin_phi) ** 2 / diffusivity),
+        'adv_theta': reduce(np.abs((solar_radius * delta_theta) / (mf_ + 0.001))),
+        'adv_phi': reduce(np.abs((solar_radius * delta_phi * sin_phi) / (mf_ + 0.001))),
+        'rot_theta': reduce((solar_radius * delta_theta) / np.abs(v_phi)),
+        'rot_phi': reduce((solar_radius * delta_phi * sin_phi) / np.abs(v_phi)),
+        'omega_phi': reduce(delta_phi/np.abs(dr_)),
+    }
+
+
+def fit_time_step(time_step):
+    """
+    Fits a time step into a whole number of equal steps per day.
+
+    The day is split into the smallest number of steps that are not longer than `time_step`. Rounding
+    the count down instead would lengthen the step past a stability limit.
+
+    Parameters:
+        time_step (float): Largest allowed time step in seconds.
+
+    Returns:
+        float: Time step in seconds, dividing one day exactly.
+        int: Number of time steps per day.
+    """
+    # The tolerance keeps a time step of exactly 86400 / n at n steps
+    steps_per_day = max(1, math.ceil(86400 / time_step * (1 - 1e-12)))
+    return 86400 / steps_per_day, steps_per_day
+
+
+def calculate_time_step(grid, diffusivity, cfl_number=0.4, limits=CFL_LIMITS, meridional_flow=None,
+                        differential_rotation=None, polar_filter_latitude=None):
+    """
+    Calculates the maximum allowable time step based on the CFL condition for advection and diffusion.
+
+    Parameters:
+        grid (dict): Dictionary containing grid information ('theta', 'phi', and their spacings).
+        diffusivity: Magnetic diffusivity for SFT model in cm^2/s.
+        cfl_number (float): CFL number (e.g., 0.4).
+        limits (tuple): Names of the stability limits to respect (see `calculate_cfl_limits`).
+            Terms that are integrated implicitly can be left out. Default is all of them.
+        meridional_flow (np.ndarray, optional): Meridional flow profile. Default is `meridional_flow(grid)`.
+        differential_rotation (np.ndarray, optional): Angular velocity profile. Default is `differential_rotation(grid)`.
+        polar_filter_latitude (float, optional): Reference latitude (degrees) of the polar filter, if any.
+            The limits are then evaluated for the effective grid spacing of the filtered grid.
+
+    Returns:
+        float: Maximum allowable time step in seconds.
+        float: Number of time steps per day.
+    """
+    cfl_limits = calculate_cfl_limits(grid, diffusivity, meridional_flow, differential_rotation,
+                                      polar_filter_latitude)
+    time_step = cfl_number * np.min([cfl_limits[name] for name in limits])
+
+    # Modify to fit exactly into one day, without exceeding the limit:
+    ndt = fit_time_step(time_step)[1]
     dtday = 1 / ndt
     time_step = dtday * 86400
 
     # Return the smaller of the two time step restrictions
-    return time_step, ndt
\ No newline at end of file
+    return time_step, ndt
@@ -10,6 +10,8 @@ Functions:
 """
 import numpy as np
 
+from .grid import grid_dtype
+
 def meridional_flow(grid, peak_speed=15.0):
     """
     Creates meridional circulation profile based on the solar latitude.
@@ -19,7 +21,7 @@ def meridional_flow(grid, peak_speed=15.0):
         peak_speed (float): Peak speed of the meridional flow in m/s.
 
     Returns:
-        np.ndarray: Meridional flow profile.
+        np.ndarray: Meridional flow profile (in the precision of the grid).
     """
 
     # Read the grid information
@@ -29,7 +31,7 @@ def meridional_flow(grid, peak_speed=15.0):
     vth_mf_1D = vs(theta-np.pi/2, v0=peak_speed)
     v_theta = np.tile(vth_mf_1D, (phi.shape[0], 1)).T
 
-    return v_theta
+    return v_theta.astype(grid_dtype(grid), copy=False)
 
 def differential_rotation(grid,rotation='solar',frame='carrington'):
     """
@@ -41,7 +43,7 @@ def differential_rotation(grid,rotation='solar',frame='carrington'):
         frame (str): Frame of reference ('carrington' or 'synodic').
         
     Returns:
-        np.ndarray: Differential rotation profile.
+        np.ndarray: Differential rotation profile (in the precision of the grid).
     """
     # Read the grid information
     theta = grid['colatitude']
@@ -67,7 +69,7 @@ def differential_rotation(grid,rotation='solar',frame='carrington'):
         rotation_freq = 360.0/(rotation_period) # degrees/day
         omega_diff = (rotation_freq*np.ones(Colatitude.shape)) 
 
-    return omega_diff
+    return omega_diff.astype(grid_dtype(grid), copy=False)
 
 def vs(theta, v0=1, p=2.33):
     Du = v0 * (1 + p) ** (0.5 * (p + 1)) / p ** (0.5 * p)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from sft2d import apply_boundary_conditions, create_grid, initialize_field
+
+
+def bipolar_region(grid, latitude=20.0, longitude=100.0, separation=6.0, width=5.0, amplitude=100.0):
+    """
+    Returns a pair of opposite Gaussian polarities on the grid, a non-axisymmetric test field.
+    """
+    latitude_grid = 90.0 - np.rad2deg(grid['colatitude'])[:, np.newaxis]
+    longitude_grid = np.rad2deg(grid['longitude'])[np.newaxis, :]
+    region = 0.0
+    for sign, offset in ((1.0, -0.5 * separation), (-1.0, 0.5 * separation)):
+        distance_phi = (longitude_grid - longitude - offset) * np.cos(np.deg2rad(latitude))
+        distance_theta = latitude_grid - latitude
+        region = region + sign * amplitude * np.exp(-(distance_theta**2 + distance_phi**2) / (2 * width**2))
+    return region
+
+
+@pytest.fixture(scope='session')
+def grid():
+    return create_grid(90, 180)
+
+
+@pytest.fixture(scope='session')
+def fine_grid():
+    return create_grid(180, 360)
+
+
+@pytest.fixture(scope='session')
+def field(grid):
+    # Dipole plus a region, so that all transport terms act on the field
+    return apply_boundary_conditions(initialize_field(grid) + bipolar_region(grid))
+
+
+@pytest.fixture(scope='session')
+def fine_field(fine_grid):
+    return apply_boundary_conditions(initialize_field(fine_grid) + bipolar_region(fine_grid))
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from sft2d import (
+    CubeAnalyzer,
+    SnapshotReader,
+    SnapshotWriter,
+    calculate_dm,
+    calculate_polar_field,
+    calculate_polar_flux,
+    calculate_usflx,
+    initialize_field,
+    open_cube,
+)
+from sft2d.analysis import batch
+
+
+@pytest.fixture(scope='module')
+def cube(grid, field):
+    dipole = initialize_field(grid)
+    return np.array([field * (1 - 0.2 * day) + dipole * day for day in range(7)])
+
+
+def baseline_diagnostics(field, grid):
+    # The per-snapshot formulas of the original analysis functions
+    colatitude = grid['colatitude']
+    sin_theta = np.sin(colatitude)[:, np.newaxis]
+    area = grid['dtheta'] * grid['dphi']
+    north_end = np.argwhere(colatitude >= np.deg2rad(70))[0][0]
+    south_start = np.argwhere(colatitude >= np.deg2rad(110))[0][0]
+    dA = 6.98e10**2 * sin_theta * area
+    north_cap = colatitude <= np.deg2rad(20)
+    south_cap = colatitude >= np.pi - np.deg2rad(20)
+    return {
+        'usflx': np.sum(np.abs(field) * sin_theta) * area * (6.955e8 * 1e2)**2,
+        'dm': np.sum(field * np.cos(colatitude)[:, np.newaxis] * sin_theta) * area,
+        'polar_field_north': np.mean(field[:north_end]),
+        'polar_field_south': np.mean(field[south_start:]),
+        'polar_flux_north': np.sum(field[north_cap] * dA[north_cap]),
+        'polar_flux_south': np.sum(field[south_cap] * dA[south_cap]),
+    }
+
+
+def assert_matches_baseline(results, cube, grid):
+    for index, field in enumerate(cube):
+        for key, value in baseline_diagnostics(field, grid).items():
+            if key in results:
+                assert results[key][index] == pytest.approx(value, rel=1e-10)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 64])
+def test_analyzer_matches_baseline(grid, cube, chunk_size):
+    results = CubeAnalyzer(grid, chunk_size=chunk_size).analyze(cube)
+    assert_matches_baseline(results, cube, grid)
+    np.testing.assert_allclose(results['bfly'], cube.mean(axis=-1), rtol=1e-12)
+
+
+def test_analyzer_reads_stored_cubes(grid, cube, tmp_path):
+    np.save(tmp_path / 'cube.npy', cube)
+    with SnapshotWriter(tmp_path / 'cube.h5', grid) as writer:
+        for day, field in enumerate(cube):
+            writer.write(field, day)
+
+    analyzer = CubeAnalyzer(grid, chunk_size=2)
+    expected = analyzer.analyze(cube)
+    for path in ('cube.npy', 'cube.h5'):
+        results = analyzer.analyze(str(tmp_path / path))
+        for key in expected:
+            np.testing.assert_array_equal(results[key], expected[key])
+
+
+def test_analyzer_closes_the_files_it_opens(grid, cube, tmp_path, monkeypatch):
+    with SnapshotWriter(tmp_path / 'cube.h5', grid) as writer:
+        writer.write(cube[0], 0)
+
+    readers = []
+
+    def recording_open_cube(path):
+        readers.append(open_cube(path))
+        return readers[-1]
+
+    monkeypatch.setattr(batch, 'open_cube', recording_open_cube)
+    CubeAnalyzer(grid).analyze(str(tmp_path / 'cube.h5'))
+    assert not readers[0]._file
+
+    with SnapshotReader(tmp_path / 'cube.h5') as reader:
+        CubeAnalyzer(grid).analyze(reader)
+        assert reader._file
+
+
+def test_analysis_functions_on_a_time_range(grid, cube):
+    usflx = calculate_usflx(cube, grid, [2, 5])
+    assert usflx.shape == (4,)
+    assert_matches_baseline({'usflx': usflx}, cube[2:6], grid)
+
+    assert np.ndim(calculate_dm(cube, grid, [3, 3])) == 0
+    assert calculate_dm(cube, grid, [3, 3]) == pytest.approx(baseline_diagnostics(cube[3], grid)['dm'])
+    north, south = calculate_polar_field(cube, grid, [0, 6])
+    flux_north, flux_south = calculate_polar_flux(cube, grid, [0, 6])
+    assert_matches_baseline({'polar_field_north': north, 'polar_field_south': south,
+                             'polar_flux_north': flux_north, 'polar_flux_south': flux_south}, cube, grid)
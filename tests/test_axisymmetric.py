@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from sft2d import (
+    AxisymmetricSimulation,
+    DiagnosticsAccumulator,
+    apply_boundary_conditions,
+    check_consistency,
+    initialize_field,
+)
+
+
+@pytest.fixture(scope='module')
+def dipole(grid):
+    return apply_boundary_conditions(initialize_field(grid))
+
+
+@pytest.fixture(scope='module')
+def regions():
+    rng = np.random.default_rng(7)
+    count = 30
+    latitude = rng.choice([-1, 1], count) * rng.uniform(5, 35, count)
+    return {
+        'time': np.sort(rng.uniform(0, 40, count)),
+        'latitude': latitude,
+        'longitude': rng.uniform(0, 360, count),
+        'flux': rng.uniform(1e21, 1e22, count),
+        'tilt': 0.5 * latitude,
+        'separation': rng.uniform(3, 10, count),
+    }
+
+
+@pytest.mark.parametrize('backend', ['numpy', 'auto'])
+def test_same_time_step_agrees_to_rounding(grid, dipole, regions, backend):
+    result = check_consistency(grid, 2.5e8, 60, field=dipole, regions=regions, backend=backend)
+    for key, difference in result['difference'].items():
+        assert difference < 1e-10, key
+
+
+def test_own_time_step_is_close(grid, dipole):
+    result = check_consistency(grid, 2.5e8, 180, field=dipole, same_time_step=False)
+    for key, difference in result['difference'].items():
+        assert difference < 1e-3, key
+
+
+def test_members_match_single_runs(grid, dipole):
+    diffusivities = np.array([1.5e8, 4e8])
+    stacked = AxisymmetricSimulation(grid, dipole, diffusivities)
+    accumulator = DiagnosticsAccumulator(grid, quantities=['dm'])
+    stacked.run(30, daily_hooks=[accumulator])
+    for member, diffusivity in enumerate(diffusivities):
+        single = AxisymmetricSimulation(grid, dipole, diffusivity, time_step=stacked.time_step)
+        single.run(30)
+        np.testing.assert_allclose(stacked.profile[member], single.profile, rtol=1e-13, atol=1e-15)
+    assert accumulator.results()['dm'].shape == (31, 2)
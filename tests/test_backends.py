@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from sft2d import SFTOperator, Simulation, differential_rotation, meridional_flow
+from sft2d.src.kernels import NUMBA_AVAILABLE
+
+pytestmark = pytest.mark.skipif(not NUMBA_AVAILABLE, reason='Numba is not installed')
+
+
+def _run(grid, field, **kwargs):
+    simulation = Simulation(grid, field, 2.5e8, **kwargs)
+    simulation.run(3)
+    return np.array(simulation.field)
+
+
+def test_numba_step_matches_numpy(grid, field):
+    reference = _run(grid, field, backend='numpy')
+    np.testing.assert_allclose(_run(grid, field, backend='numba'), reference, rtol=1e-12,
+                               atol=1e-12 * np.abs(reference).max())
+
+
+def test_numba_step_on_stacked_members(grid, field):
+    members = np.stack([field, 0.5 * field])
+    profiles = (np.array([2.5e8, 4e8]), meridional_flow(grid), differential_rotation(grid))
+    out = SFTOperator(grid, *profiles, backend='numba').advance(members, np.empty_like(members), 1000.0)
+    expected = SFTOperator(grid, *profiles, backend='numpy').advance(members, np.empty_like(members), 1000.0)
+    np.testing.assert_allclose(out, expected, rtol=1e-12, atol=1e-12 * np.abs(field).max())
+
+
+def test_unknown_backend_is_rejected(grid):
+    with pytest.raises(ValueError):
+        SFTOperator(grid, 2.5e8, backend='cuda')
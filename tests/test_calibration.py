@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from sft2d import BMRCatalog, Calibration
+from sft2d.src.catalog import CATALOG_COLUMNS
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    # Regions emerging over three years from 1950, alternating hemispheres
+    rng = np.random.default_rng(1)
+    num_regions = 300
+    time = np.sort(rng.uniform(0, 3 * 365.25, num_regions)) + BMRCatalog.time_of('1950-01-01')
+    latitude = rng.uniform(10, 30, num_regions) * np.where(np.arange(num_regions) % 2, 1, -1)
+    columns = {name: np.zeros(num_regions, dtype=dtype) for name, dtype in CATALOG_COLUMNS}
+    columns.update(time=time, latitude=latitude, longitude=rng.uniform(0, 360, num_regions),
+                   flux=np.full(num_regions, 1e22), tilt=0.5 * latitude, separation=np.full(num_regions, 5.0),
+                   polarity=np.full(num_regions, -1.0))
+    return BMRCatalog(columns)
+
+
+def _observations(year, flux):
+    return {'year': year, 'flux': flux, 'error': np.full(year.size, 1e21)}
+
+
+def _calibration(grid, catalog, cache_dir, max_workers=1, north=None, south=None):
+    year = np.arange(1950.6, 1953.0, 0.5)
+    north = _observations(year, np.full(year.size, 1e21)) if north is None else north
+    south = _observations(year, np.full(year.size, -1e21)) if south is None else south
+    return Calibration(grid, catalog, north, south, start_year=1950.0, end_year=1953.0, spin_up_years=0.5,
+                       model='axisymmetric', cache_dir=cache_dir, max_workers=max_workers)
+
+
+def test_memo_and_pool_match_serial_runs(grid, catalog, tmp_path):
+    candidates = [{'diffusivity': 2e8}, {'diffusivity': 4e8, 'peak_speed': 10.0}]
+    serial = _calibration(grid, catalog, False).evaluate(candidates)
+    pooled = _calibration(grid, catalog, str(tmp_path), max_workers=2).evaluate(candidates)
+    np.testing.assert_allclose(pooled, serial, rtol=1e-12)
+
+    # A new engine with the same setup reads the spin-up and the runs from the disk memo
+    calibration = _calibration(grid, catalog, str(tmp_path))
+    assert calibration.spin_up() is not None
+    np.testing.assert_array_equal(calibration.evaluate(candidates), pooled)
+    assert len(list(tmp_path.glob('*-spin-up.npz'))) == 1
+
+
+def test_fit_recovers_the_flux_scale(grid, catalog, capsys):
+    calibration = _calibration(grid, catalog, False)
+    modelled = calibration.forward({'flux_scale': 2.0})
+    observed = {name: _observations(series['year'], modelled[name])
+                for name, series in calibration.observations.items()}
+    calibration = _calibration(grid, catalog, False, north=observed['north'], south=observed['south'])
+    best = calibration.fit({'flux_scale': 1.0}, steps={'flux_scale': 0.4}, max_iterations=30, min_step=1e-3,
+                           progress=True)
+    assert best['parameters']['flux_scale'] == pytest.approx(2.0, rel=0.01)
+    assert capsys.readouterr().out.count('misfit') == len(best['history']) - 1
+
+
+def test_unknown_parameters_are_rejected(grid, catalog):
+    with pytest.raises(ValueError):
+        _calibration(grid, catalog, False).evaluate([{'speed': 10.0}])
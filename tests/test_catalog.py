@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pytest
+
+from sft2d import BMRCatalog, read_catalog
+
+SOURCE = os.path.join(os.path.dirname(__file__), '..', 'test_data', 'SC_14.txt')
+
+
+@pytest.fixture(scope='module')
+def catalog(tmp_path_factory):
+    return BMRCatalog.load(SOURCE, cache_dir=str(tmp_path_factory.mktemp('cache')))
+
+
+def test_cycle_table_columns(catalog):
+    table = np.loadtxt(SOURCE)
+    kept = table[(table[:, 5] != 0) & (table[:, 3] > 0)]
+    assert len(catalog) == kept.shape[0]
+    assert np.all(np.diff(catalog.time) >= 0)
+    np.testing.assert_allclose(np.sort(catalog['flux']), np.sort(np.abs(kept[:, 5]) * 1e16))
+    np.testing.assert_array_equal(catalog.time, catalog['phase'] * 28.0)
+
+
+@pytest.mark.parametrize('start, stop', [(0.0, 100.0), (28.0, 56.0), (500.5, 1200.0), (1e6, 2e6)])
+def test_window_matches_a_mask(catalog, start, stop):
+    mask = (catalog.time >= start) & (catalog.time < stop)
+    window = catalog.window(start, stop)
+    for name in ('time', 'latitude', 'flux'):
+        np.testing.assert_array_equal(window[name], catalog[name][mask])
+
+    regions = catalog.regions(start, stop)
+    np.testing.assert_array_equal(regions['time'], catalog.time[mask] - start)
+
+
+def test_cache_is_reused_and_invalidated(tmp_path):
+    source = tmp_path / 'cycle.txt'
+    source.write_text('1 10.0 2.0 3.0 100.0 500.0\n2 -12.0 -1.0 4.0 200.0 -700.0\n')
+    cache_dir = tmp_path / 'cache'
+
+    first = BMRCatalog.load(str(source), cache_dir=str(cache_dir))
+    cached = os.listdir(cache_dir)
+    assert len(cached) == 1
+    second = BMRCatalog.load(str(source), cache_dir=str(cache_dir))
+    for name in first.columns:
+        np.testing.assert_array_equal(second[name], first[name])
+    np.testing.assert_array_equal(first['polarity'], [1.0, -1.0])
+
+    source.write_text('1 10.0 2.0 3.0 100.0 500.0\n')
+    assert len(BMRCatalog.load(str(source), cache_dir=str(cache_dir))) == 1
+    assert len(os.listdir(cache_dir)) == 2
+
+
+def test_npz_round_trip_and_missing_columns(catalog, tmp_path):
+    catalog.save(str(tmp_path / 'catalog.npz'))
+    loaded = BMRCatalog.load(str(tmp_path / 'catalog.npz'))
+    for name in catalog.columns:
+        np.testing.assert_array_equal(loaded[name], catalog[name])
+    with pytest.raises(ValueError):
+        BMRCatalog({'time': np.zeros(1)})
+    assert read_catalog(SOURCE, drop_empty=False)['time'].size >= len(catalog)
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from sft2d import (
+    BMRSource,
+    Checkpointer,
+    DiagnosticsAccumulator,
+    Simulation,
+    SnapshotReader,
+    SnapshotWriter,
+    initialize_field,
+)
+
+
+@pytest.fixture(scope='module')
+def regions():
+    rng = np.random.default_rng(3)
+    count = 40
+    return {
+        'time': np.sort(rng.uniform(0, 10, count)),
+        'latitude': rng.uniform(-30, 30, count),
+        'longitude': rng.uniform(0, 360, count),
+        'flux': rng.uniform(1e21, 1e22, count),
+        'tilt': rng.uniform(-10, 10, count),
+        'separation': rng.uniform(2, 8, count),
+    }
+
+
+def _setup(grid, regions, path, resume=False):
+    simulation = Simulation(grid, initialize_field(grid), 2.5e8, backend='numpy')
+    source = BMRSource(grid, regions)
+    diagnostics = DiagnosticsAccumulator(grid)
+    writer = SnapshotWriter(path / 'run.h5', grid, resume=resume)
+    checkpointer = Checkpointer(str(path / 'run.npz'), every_days=4,
+                                objects={'sources': source, 'diagnostics': diagnostics, 'snapshots': writer})
+    return simulation, source, diagnostics, writer, checkpointer
+
+
+def _run(simulation, source, diagnostics, writer, checkpointer, num_days):
+    simulation.run(num_days, daily_hooks=[diagnostics, writer, checkpointer], step_hooks=[source])
+
+
+def test_restart_is_bit_for_bit(grid, regions, tmp_path):
+    straight_dir = tmp_path / 'straight'
+    restart_dir = tmp_path / 'restart'
+    straight_dir.mkdir()
+    restart_dir.mkdir()
+
+    straight = _setup(grid, regions, straight_dir)
+    _run(*straight, 10)
+    straight[3].close()
+
+    # Interrupted after day 6; the checkpoint of day 4 is restored and the run continues to day 10
+    interrupted = _setup(grid, regions, restart_dir)
+    _run(*interrupted, 6)
+    interrupted[3].close()
+    restarted = _setup(grid, regions, restart_dir, resume=True)
+    assert restarted[4].restore(restarted[0])
+    assert restarted[0].day == 4
+    _run(*restarted, 10 - restarted[0].day)
+    restarted[3].close()
+
+    np.testing.assert_array_equal(restarted[0].field, straight[0].field)
+    assert restarted[0].step_count == straight[0].step_count
+    for key, value in straight[2].results().items():
+        np.testing.assert_array_equal(restarted[2].results()[key], value)
+    with SnapshotReader(straight_dir / 'run.h5') as expected, SnapshotReader(restart_dir / 'run.h5') as reader:
+        np.testing.assert_array_equal(reader.time, expected.time)
+        np.testing.assert_array_equal(reader[:], expected[:])
+
+
+def test_restore_without_checkpoint(grid, tmp_path):
+    simulation = Simulation(grid, initialize_field(grid), 2.5e8, backend='numpy')
+    assert not Checkpointer(str(tmp_path / 'none.npz'), every_days=1).restore(simulation)
+    with pytest.raises(ValueError):
+        Checkpointer(str(tmp_path / 'none.npz'))
+
+
+def test_restore_with_another_time_step_is_rejected(grid, tmp_path):
+    simulation = Simulation(grid, initialize_field(grid), 2.5e8, backend='numpy')
+    checkpointer = Checkpointer(str(tmp_path / 'run.npz'), every_days=1)
+    simulation.run(1, daily_hooks=[checkpointer])
+
+    other = Simulation(grid, initialize_field(grid), 2.5e8, backend='numpy', time_step=3600)
+    with pytest.raises(ValueError):
+        checkpointer.restore(other)
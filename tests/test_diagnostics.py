@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from sft2d import (
+    DiagnosticsAccumulator,
+    Simulation,
+    calculate_dm,
+    calculate_polar_field,
+    calculate_polar_flux,
+    calculate_usflx,
+)
+
+
+def test_accumulator_matches_stored_cube(grid, field):
+    fields = []
+    accumulator = DiagnosticsAccumulator(grid)
+    simulation = Simulation(grid, field, 2.5e8)
+    simulation.run(5, daily_hooks=[accumulator, lambda sim: fields.append(sim.field.copy())])
+
+    cube = np.array(fields)
+    results = accumulator.results()
+    expected = {'usflx': calculate_usflx(cube, grid, [0, 5]), 'dm': calculate_dm(cube, grid, [0, 5]),
+                'bfly': cube.mean(axis=-1)}
+    expected['polar_field_north'], expected['polar_field_south'] = calculate_polar_field(cube, grid, [0, 5])
+    expected['polar_flux_north'], expected['polar_flux_south'] = calculate_polar_flux(cube, grid, [0, 5])
+
+    np.testing.assert_array_equal(results['time'], np.arange(6))
+    for key, value in expected.items():
+        np.testing.assert_allclose(results[key], value, rtol=1e-12, atol=1e-12 * np.abs(value).max())
+
+
+def test_accumulator_cadence_and_quantities(grid, field):
+    accumulator = DiagnosticsAccumulator(grid, cadence=2, quantities=['dm', 'polar_flux'])
+    Simulation(grid, field, 2.5e8).run(5, daily_hooks=[accumulator])
+
+    results = accumulator.results()
+    np.testing.assert_array_equal(results['time'], [0, 2, 4])
+    assert sorted(results) == ['dm', 'polar_flux_north', 'polar_flux_south', 'time']
+    with pytest.raises(ValueError):
+        DiagnosticsAccumulator(grid, quantities=['dipole'])
+
+
+def test_accumulator_on_stacked_members(grid, field):
+    stacked = DiagnosticsAccumulator(grid)
+    stacked.record(np.stack([field, -2 * field]), 0.0)
+    single = DiagnosticsAccumulator(grid)
+    single.record(field, 0.0)
+
+    results = stacked.results()
+    expected = single.results()
+    assert results['dm'][0] == pytest.approx([expected['dm'][0], -2 * expected['dm'][0]])
+    assert results['usflx'][0] == pytest.approx([expected['usflx'][0], 2 * expected['usflx'][0]])
+    assert results['bfly'].shape == (1, 2, field.shape[0])
@@ -0,0 +1,21 @@
+import numpy as np
+
+from sft2d import EnsembleRunner, Simulation, initialize_field, parameter_grid
+
+
+def test_process_pool_matches_serial_runs(grid):
+    # A compiled step in the parent must not hang the (spawned) workers
+    Simulation(grid, initialize_field(grid), 2.5e8).run(1)
+
+    parameters = parameter_grid(diffusivity=[2e8, 3e8], peak_speed=[10.0, 15.0])
+    pooled = EnsembleRunner(grid, 5, max_workers=2).run(parameters)
+    serial = EnsembleRunner(grid, 5, max_workers=1).run(parameters)
+    assert not pooled.errors and not serial.errors
+    for name, values in serial.diagnostics.items():
+        np.testing.assert_array_equal(pooled.diagnostics[name], values)
+
+
+def test_failed_runs_are_recorded(grid):
+    result = EnsembleRunner(grid, 2, base={'diffusivity': 2.5e8}, max_workers=1).run([{}, {'integrator': 'unknown'}])
+    assert list(result.errors) == [1]
+    assert 'ValueError' in result.errors[1]
@@ -0,0 +1,90 @@
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from sft2d import build_rgo_catalog, read_catalog
+from sft2d.src import ingest
+from sft2d.src.ingest import FIRST_CYCLE, JOY_AMPLITUDES
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA = ROOT / 'data' / 'RGO_Sunspots'
+
+# A year inside each cycle, with the leading polarity in the north
+YEARS = {1875: (11, 1.0), 1884: (12, -1.0), 1894: (13, 1.0), 1906: (14, -1.0), 1917: (15, 1.0), 1927: (16, -1.0)}
+
+
+@pytest.fixture(scope='module')
+def directory(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('rgo')
+    for year in YEARS:
+        shutil.copy(DATA / f'g{year}.txt', directory)
+    return directory
+
+
+@pytest.fixture(scope='module')
+def catalog(directory, tmp_path_factory):
+    return build_rgo_catalog(str(directory), cache_dir=str(tmp_path_factory.mktemp('cache')), max_workers=1)
+
+
+def test_serial_and_pooled_parsing_agree(directory, tmp_path):
+    pooled = build_rgo_catalog(str(directory), cache_dir=str(tmp_path / 'pooled'), max_workers=2)
+    serial = build_rgo_catalog(str(directory), cache_dir=str(tmp_path / 'serial'), max_workers=1)
+    assert len(serial) > 0
+    for name in pooled.columns:
+        np.testing.assert_array_equal(serial[name], pooled[name])
+
+
+def test_parsed_files_are_cached(directory, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    first, stats = build_rgo_catalog(str(directory), cache_dir=cache_dir, max_workers=1, return_stats=True)
+    assert stats == {'parsed': len(YEARS), 'cached': 0}
+    second, stats = build_rgo_catalog(str(directory), cache_dir=cache_dir, max_workers=1, return_stats=True)
+    assert stats == {'parsed': 0, 'cached': len(YEARS)}
+    for name in first.columns:
+        np.testing.assert_array_equal(second[name], first[name])
+
+
+def test_no_pool_without_several_files_to_parse(directory, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    build_rgo_catalog(str(directory), cache_dir=cache_dir, max_workers=1)
+    for path in Path(cache_dir).glob('g1927*'):
+        path.unlink()
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError('A pool was started.')
+    monkeypatch.setattr(ingest, 'ProcessPoolExecutor', no_pool)
+    _, stats = build_rgo_catalog(str(directory), cache_dir=cache_dir, max_workers=2, return_stats=True)
+    assert stats == {'parsed': 1, 'cached': len(YEARS) - 1}
+    _, stats = build_rgo_catalog(str(directory), cache_dir=cache_dir, max_workers=2, return_stats=True)
+    assert stats == {'parsed': 0, 'cached': len(YEARS)}
+
+
+def test_catalog_reproduces_the_shipped_table(tmp_path):
+    # Group numbers are reused over the decades, so the whole data set is parsed
+    catalog = build_rgo_catalog(str(DATA), cache_dir=str(tmp_path), max_workers=1, start_year=1950, end_year=1953)
+    table = read_catalog(str(ROOT / 'sunspot_data_rgo_1901_2025.csv'))
+    rows = (table['year'] >= 1950) & (table['year'] < 1953)
+    order = np.argsort(catalog['group'])
+    expected = np.argsort(table['group'][rows])
+    assert len(order) == len(expected) > 0
+    for name in ('group', 'area', 'latitude', 'longitude', 'polarity'):
+        np.testing.assert_array_equal(catalog[name][order], table[name][rows][expected])
+    # The table is rounded to 3 decimals, and to 3 significant digits for the flux
+    np.testing.assert_allclose(catalog['time'][order], table['time'][rows][expected], atol=2e-5)
+    for name in ('tilt', 'separation'):
+        np.testing.assert_allclose(catalog[name][order], table[name][rows][expected], atol=1e-3)
+    np.testing.assert_allclose(catalog['flux'][order], table['flux'][rows][expected], rtol=5e-3)
+
+
+@pytest.mark.parametrize('year', sorted(YEARS))
+def test_hale_polarity_and_joy_amplitude_per_cycle(catalog, year):
+    cycle, polarity = YEARS[year]
+    rows = np.floor(catalog['year']) == year
+    assert rows.any()
+    assert np.all(catalog['polarity'][rows] == polarity)
+    rows &= catalog['latitude'] != 0
+    latitude = catalog['latitude'][rows]
+    amplitude = catalog['tilt'][rows] / (np.sign(latitude) * np.sqrt(np.abs(latitude)))
+    np.testing.assert_allclose(amplitude, JOY_AMPLITUDES[cycle - FIRST_CYCLE])
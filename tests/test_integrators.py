@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from sft2d import Simulation
+
+
+@pytest.fixture(scope='module')
+def explicit(fine_grid, fine_field):
+    simulation = Simulation(fine_grid, fine_field, 2.5e8)
+    simulation.run(27)
+    return np.array(simulation.field)
+
+
+def _relative(field, reference):
+    return np.abs(field - reference).max() / np.abs(reference).max()
+
+
+@pytest.mark.parametrize('options, tolerance', [
+    ({'integrator': 'semi-implicit'}, 1e-2),
+    ({'integrator': 'semi-implicit', 'implicit_scheme': 'backward-euler'}, 1e-2),
+    ({'polar_filter_latitude': 60}, 1e-2),
+    ({'integrator': 'multirate'}, 5e-2),
+    ({'integrator': 'exponential'}, 1e-3),
+])
+def test_integrator_matches_explicit(fine_grid, fine_field, explicit, options, tolerance):
+    simulation = Simulation(fine_grid, fine_field, 2.5e8, **options)
+    simulation.run(27)
+    assert _relative(simulation.field, explicit) < tolerance
+
+
+def test_semi_implicit_with_spectral_rotation_is_stable(fine_grid, fine_field, explicit):
+    # One step per day; the upwind reference is more diffusive in longitude, so compare the averages
+    simulation = Simulation(fine_grid, fine_field, 2.5e8, integrator='semi-implicit', rotation='spectral')
+    assert simulation.steps_per_day == 1
+    simulation.run(27)
+    assert np.abs(simulation.field).max() <= np.abs(fine_field).max()
+    average = simulation.field[:, 1:-1].mean(axis=-1)
+    reference = explicit[:, 1:-1].mean(axis=-1)
+    assert np.abs(average - reference).max() < 2e-3 * np.abs(reference).max()
@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+
+from sft2d import decay_modes, decay_time_map
+
+
+def test_dipole_decay_time_without_flow(fine_grid):
+    # Pure diffusion: the dipole (l = 1) decays at 2 D / R^2, about 30 years for 250 km^2/s
+    no_flow = np.zeros((fine_grid['colatitude'].size, fine_grid['longitude'].size))
+    results = decay_modes(fine_grid, 2.5e8, meridional_flow=no_flow, cache_dir=False)
+    assert results['dipole_decay_time'] == pytest.approx(30.7, rel=0.05)
+
+
+def test_decay_time_map_pool_matches_serial(fine_grid):
+    serial = decay_time_map(fine_grid, [2.5e8, 5e8], [15.0], cache_dir=False, max_workers=1)
+    pooled = decay_time_map(fine_grid, [2.5e8, 5e8], [15.0], cache_dir=False, max_workers=2)
+    np.testing.assert_allclose(pooled['dipole_decay_time'], serial['dipole_decay_time'], rtol=1e-8)
+    assert np.all(np.isfinite(serial['dipole_decay_time'])) and np.all(serial['dipole_decay_time'] > 0)
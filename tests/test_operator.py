@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from sft2d import (
+    SFTOperator,
+    apply_boundary_conditions,
+    calculate_advection,
+    calculate_diffusion,
+    differential_rotation,
+    meridional_flow,
+)
+
+
+@pytest.fixture(scope='module')
+def profiles(grid):
+    return meridional_flow(grid), differential_rotation(grid)
+
+
+def baseline_rhs(field, grid, profiles):
+    flow, rotation = profiles
+    return calculate_diffusion(field, 2.5e8, grid) - calculate_advection(field, rotation, flow, grid)
+
+
+def test_apply_matches_baseline_terms(grid, field, profiles):
+    operator = SFTOperator(grid, 2.5e8, *profiles)
+    expected = baseline_rhs(field, grid, profiles)
+    np.testing.assert_allclose(operator.apply(field), expected, rtol=1e-10, atol=1e-12 * np.abs(expected).max())
+
+
+def test_step_matches_baseline_step(grid, field, profiles):
+    time_step = 1000.0
+    operator = SFTOperator(grid, 2.5e8, *profiles)
+    out = apply_boundary_conditions(operator.step(field, np.empty_like(field), time_step))
+
+    expected = field.copy()
+    expected[1:-1, 1:-1] += time_step * baseline_rhs(field, grid, profiles)
+    apply_boundary_conditions(expected)
+    np.testing.assert_allclose(out, expected, rtol=1e-12, atol=1e-14 * np.abs(field).max())
+
+
+
+def test_unknown_term_is_rejected(grid):
+    with pytest.raises(ValueError):
+        SFTOperator(grid, 2.5e8, terms=('diffusion_r',))
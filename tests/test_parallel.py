@@ -0,0 +1,49 @@
+import threading
+
+import numpy as np
+import pytest
+
+from sft2d import Simulation
+
+
+def _run(grid, field, num_days=3, backend='numpy', **kwargs):
+    simulation = Simulation(grid, field, 2.5e8, backend=backend, **kwargs)
+    try:
+        simulation.run(num_days)
+        return np.array(simulation.field)
+    finally:
+        simulation.close()
+
+
+def _band_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith('sft-band')]
+
+
+@pytest.mark.parametrize('threads', [2, 3])
+def test_threaded_bands_match_serial_step(grid, field, threads):
+    np.testing.assert_array_equal(_run(grid, field, threads=threads), _run(grid, field))
+
+
+@pytest.mark.parametrize('options', [{'backend': 'auto'}, {'integrator': 'multirate'},
+                                     {'integrator': 'semi-implicit'}])
+def test_threaded_bands_match_serial_integrators(grid, field, options):
+    np.testing.assert_array_equal(_run(grid, field, threads=2, **options), _run(grid, field, **options))
+
+
+def test_threaded_bands_on_stacked_members(grid, field):
+    members = np.stack([field, -field])
+    np.testing.assert_array_equal(_run(grid, members, threads=2), _run(grid, members))
+
+
+def test_close_stops_the_band_threads(grid, field):
+    simulation = Simulation(grid, field, 2.5e8, backend='numpy', threads=2)
+    simulation.run(1)
+    assert _band_threads()
+    simulation.close()
+    assert not _band_threads()
+
+
+def test_process_bands_match_serial_step(grid, field):
+    # Numba steps first, so that the (spawned) band workers start after the compiled threads
+    Simulation(grid, field, 2.5e8).run(1)
+    np.testing.assert_array_equal(_run(grid, field, processes=2), _run(grid, field))
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from sft2d import (
+    DiagnosticsAccumulator,
+    SFTOperator,
+    Simulation,
+    SnapshotReader,
+    SnapshotWriter,
+    bipole_field,
+    create_grid,
+    differential_rotation,
+    initialize_field,
+    meridional_flow,
+)
+
+
+@pytest.fixture(scope='module')
+def single_grid():
+    return create_grid(90, 180, dtype='float32')
+
+
+def test_float32_grid_propagates(single_grid, tmp_path):
+    field = initialize_field(single_grid)
+    assert field.dtype == np.float32
+    assert meridional_flow(single_grid).dtype == np.float32
+    assert single_grid['colatitude'].dtype == np.float64
+
+    simulation = Simulation(single_grid, field, 2.5e8)
+    assert simulation.field.dtype == np.float32
+    with SnapshotWriter(tmp_path / 'run.h5', single_grid) as writer:
+        writer.write(simulation.field, 0.0)
+    with SnapshotReader(tmp_path / 'run.h5') as reader:
+        assert reader.br.dtype == np.float32
+
+
+@pytest.mark.parametrize('backend', ['numpy', 'auto'])
+def test_float32_run_follows_float64(grid, single_grid, backend):
+    results = []
+    for precision_grid in (grid, single_grid):
+        field = initialize_field(precision_grid) + bipole_field(precision_grid, 20.0, 100.0, 1e23, 5.0, 5.0)
+        diagnostics = DiagnosticsAccumulator(precision_grid, quantities=['dm', 'usflx'])
+        simulation = Simulation(precision_grid, field, 2.5e8, backend=backend)
+        simulation.run(10, daily_hooks=[diagnostics])
+        results.append((np.array(simulation.field, dtype=np.float64), diagnostics.results()))
+
+    (field64, diagnostics64), (field32, diagnostics32) = results
+    assert np.abs(field32 - field64).max() < 1e-5 * np.abs(field64).max()
+    for key in ('dm', 'usflx'):
+        np.testing.assert_allclose(diagnostics32[key], diagnostics64[key], rtol=1e-5)
+
+
+def test_unsupported_precision_is_rejected(grid):
+    with pytest.raises(ValueError):
+        SFTOperator(grid, 2.5e8, meridional_flow(grid), differential_rotation(grid), dtype='float16')
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from sft2d import remap_matrices, remap_synoptic_map
+from sft2d.src.remap import REMAP_METHODS, _cell_edges
+
+
+def _sine_latitude(num_rows):
+    edges = np.linspace(-1.0, 1.0, num_rows + 1)
+    return 0.5 * (edges[1:] + edges[:-1])
+
+
+@pytest.mark.parametrize('method, tolerance', [('nearest', 1e-2), ('linear', 2e-3), ('area', 5e-3)])
+def test_remap_of_a_smooth_map(grid, method, tolerance):
+    data = np.outer(_sine_latitude(120), np.ones(240))
+    field = remap_synoptic_map(data, grid, method)
+    expected = np.cos(grid['colatitude'])[:, np.newaxis] * np.ones(grid['longitude'].size)
+    assert np.abs(field - expected).max() < tolerance
+
+
+def test_area_remap_conserves_flux(grid):
+    data = np.random.default_rng(1).normal(size=(120, 240))
+    data[np.abs(_sine_latitude(120)) > 0.9] = 0.0  # Inside the latitudes covered by the grid
+    field = remap_synoptic_map(data, grid, 'area')
+
+    cells = _cell_edges(grid['colatitude'], grid['dtheta'], 0.0, np.pi)
+    area = (np.cos(cells[:, 0]) - np.cos(cells[:, 1]))[:, np.newaxis] * grid['dphi']
+    flux = np.sum(field[:, :-1] * area)  # One period of longitude
+    assert flux == pytest.approx(data.sum() * (2 / 120) * (2 * np.pi / 240), rel=1e-12)
+
+
+def test_matrices_are_cached(grid):
+    for method in REMAP_METHODS:
+        first = remap_matrices((60, 120), grid, method)
+        second = remap_matrices((60, 120), grid, method)
+        assert all(cached is matrix for cached, matrix in zip(second, first))
+    with pytest.raises(ValueError):
+        remap_matrices((60, 120), grid, 'cubic')
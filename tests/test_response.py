@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from sft2d import (
+    BMRSource,
+    DiagnosticsAccumulator,
+    ResponseEngine,
+    Simulation,
+    apply_boundary_conditions,
+    initialize_field,
+)
+
+
+@pytest.fixture(scope='module')
+def regions():
+    rng = np.random.default_rng(5)
+    count = 60
+    latitude = rng.choice([-1, 1], count) * rng.uniform(5, 35, count)
+    # Away from the periodic ghost columns, which the engine only accounts for on average over longitude
+    return {
+        'time': np.sort(rng.uniform(0, 60, count)),
+        'latitude': latitude,
+        'longitude': rng.uniform(60, 300, count),
+        'flux': rng.uniform(1e21, 1e22, count),
+        'tilt': 0.5 * latitude,
+        'separation': rng.uniform(2, 10, count),
+    }
+
+
+@pytest.fixture(scope='module')
+def cache_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp('cache')
+
+
+@pytest.fixture(scope='module')
+def engine(fine_grid, cache_dir):
+    return ResponseEngine(fine_grid, 2.5e8, cache_dir=str(cache_dir))
+
+
+def _full_run(grid, field, regions, num_days):
+    simulation = Simulation(grid, field, 2.5e8)
+    diagnostics = DiagnosticsAccumulator(grid, quantities=['dm', 'polar_field', 'polar_flux'])
+    hooks = [diagnostics] if regions is None else [BMRSource(grid, regions), diagnostics]
+    simulation.run(num_days, daily_hooks=hooks)
+    return diagnostics.results()
+
+
+def _assert_close(prediction, expected, tolerance):
+    np.testing.assert_array_equal(prediction['time'], expected['time'])
+    for key in ('dm', 'polar_flux_north', 'polar_flux_south', 'polar_field_north', 'polar_field_south'):
+        difference = np.abs(prediction[key] - expected[key]).max()
+        assert difference < tolerance * np.abs(expected[key]).max(), key
+
+
+def test_prediction_of_the_initial_field(fine_grid, regions, engine):
+    field = apply_boundary_conditions(initialize_field(fine_grid))
+    empty = {name: values[:0] for name, values in regions.items()}
+    _assert_close(engine.predict(empty, 90, initial_field=field), _full_run(fine_grid, field, None, 90), 1e-10)
+
+
+def test_prediction_of_regions(fine_grid, regions, engine):
+    expected = _full_run(fine_grid, np.zeros(fine_grid['colatitude'].shape + fine_grid['longitude'].shape), regions, 90)
+    _assert_close(engine.predict(regions, 90), expected, 2e-2)
+
+
+def test_engine_is_read_from_the_cache(fine_grid, engine, cache_dir):
+    assert any(cache_dir.rglob('*.npz'))
+    cached = ResponseEngine(fine_grid, 2.5e8, cache_dir=str(cache_dir))
+    np.testing.assert_array_equal(cached.rates, engine.rates)
+    np.testing.assert_array_equal(cached.response(20.0, 5.0, 4.0, 30)['dm'], engine.response(20.0, 5.0, 4.0, 30)['dm'])
+    with pytest.raises(ValueError):
+        ResponseEngine(fine_grid, np.array([2.5e8, 4e8]), cache_dir=False)
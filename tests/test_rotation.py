@@ -0,0 +1,57 @@
+import numpy as np
+
+from sft2d import (
+    SFTOperator,
+    Simulation,
+    SpectralRotation,
+    apply_boundary_conditions,
+    calculate_cfl_limits,
+    differential_rotation,
+    meridional_flow,
+)
+from sft2d.src.time_step import DIFFUSION_LIMITS
+
+
+def _ring_average(field):
+    return field[..., 1:-1].mean(axis=-1)
+
+
+def test_spectral_rotation_is_a_shift(fine_grid, fine_field):
+    rotation = SpectralRotation(fine_grid, differential_rotation(fine_grid))
+    rotated = rotation.apply(fine_field.copy(), 3600.0)
+    np.testing.assert_allclose(_ring_average(rotated), _ring_average(fine_field), atol=1e-12)
+    np.testing.assert_allclose(np.sum(rotated[:, 1:-1]**2, axis=-1), np.sum(fine_field[:, 1:-1]**2, axis=-1),
+                               rtol=1e-12)
+
+
+def test_spectral_rotation_with_polar_filter(fine_grid, fine_field):
+    simulation = Simulation(fine_grid, fine_field, 2.5e8, polar_filter_latitude=60, rotation='spectral')
+
+    # Only the (filtered) diffusion and flow limits remain; the step must respect them
+    limits = calculate_cfl_limits(fine_grid, 2.5e8, polar_filter_latitude=60)
+    assert simulation.time_step <= 0.4 * min(limits[name] for name in DIFFUSION_LIMITS)
+
+    # The rotation and the filter leave the longitude average to the theta terms
+    theta_terms = SFTOperator(fine_grid, 2.5e8, meridional_flow(fine_grid), terms=('diffusion_theta',
+                                                                                   'advection_theta'))
+    reference = fine_field.copy()
+    buffer = np.empty_like(reference)
+    for _ in range(60 * simulation.steps_per_day):
+        theta_terms.step(reference, buffer, simulation.time_step)
+        reference, buffer = apply_boundary_conditions(buffer), reference
+    simulation.run(60)
+
+    difference = np.abs(_ring_average(simulation.field) - _ring_average(reference)).max()
+    assert difference < 1e-10 * np.abs(_ring_average(reference)).max()
+    assert np.abs(simulation.field).max() <= np.abs(fine_field).max()
+
+
+def test_filtered_spectral_run_stays_bounded(fine_grid, fine_field):
+    # A limit just under one day used to round to a single (unstable) step per day
+    simulation = Simulation(fine_grid, fine_field, 2.5e8, polar_filter_latitude=60, rotation='spectral')
+    limit = calculate_cfl_limits(fine_grid, 2.5e8, polar_filter_latitude=60)['diff_phi']
+    assert simulation.time_step <= 0.4 * limit
+
+    simulation.run(180)
+    assert np.all(np.isfinite(simulation.field))
+    assert np.abs(simulation.field).max() <= np.abs(fine_field).max()
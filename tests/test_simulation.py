@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from sft2d import (
+    Simulation,
+    apply_boundary_conditions,
+    calculate_advection,
+    calculate_diffusion,
+    differential_rotation,
+    meridional_flow,
+    run,
+)
+
+
+def baseline_run(grid, field, diffusivity, time_step, steps):
+    # The copy-based loop of the original example script
+    flow = meridional_flow(grid)
+    rotation = differential_rotation(grid)
+    current = field.copy()
+    for _ in range(steps):
+        update = current.copy()
+        update[1:-1, 1:-1] = current[1:-1, 1:-1] + time_step * (calculate_diffusion(current, diffusivity, grid)
+                                                                - calculate_advection(current, rotation, flow, grid))
+        current = apply_boundary_conditions(update)
+    return current
+
+
+def test_run_matches_baseline_loop(grid, field):
+    simulation = Simulation(grid, field, 2.5e8)
+    days = []
+    simulation.run(2, daily_hooks=[lambda sim: days.append(sim.day)])
+
+    expected = baseline_run(grid, field, 2.5e8, simulation.time_step, 2 * simulation.steps_per_day)
+    np.testing.assert_allclose(simulation.field, expected, rtol=1e-9, atol=1e-12 * np.abs(field).max())
+    assert days == [0, 1, 2]
+    assert simulation.time == pytest.approx(2)
+
+
+def test_run_does_not_modify_the_initial_field(grid, field):
+    initial = field.copy()
+    simulation = run(grid, field, 2.5e8, 1)
+    np.testing.assert_array_equal(field, initial)
+    assert simulation.day == 1
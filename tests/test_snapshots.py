@@ -0,0 +1,48 @@
+import numpy as np
+
+from sft2d import Simulation, SnapshotReader, SnapshotWriter
+
+
+def test_snapshots_match_the_run(grid, field, tmp_path):
+    fields = []
+    simulation = Simulation(grid, field, 2.5e8)
+    with SnapshotWriter(tmp_path / 'run.h5', grid, cadence=2, compression='gzip', metadata={'label': 'dipole'}) as writer:
+        simulation.run(6, daily_hooks=[writer, lambda sim: fields.append(sim.field.copy())])
+
+    with SnapshotReader(tmp_path / 'run.h5') as reader:
+        assert reader.shape == (4,) + field.shape
+        np.testing.assert_array_equal(reader.time, [0, 2, 4, 6])
+        np.testing.assert_array_equal(reader[:], np.array(fields[::2]))
+        np.testing.assert_array_equal(reader.grid['colatitude'], grid['colatitude'])
+        assert reader.grid['dphi'] == grid['dphi']
+        assert reader.metadata['label'] == 'dipole'
+        assert reader.metadata['steps_per_day'] == simulation.steps_per_day
+
+        chunks = [(start, block.shape[0]) for start, block in reader.iter_chunks(chunk_size=3)]
+        assert chunks == [(0, 3), (3, 1)]
+
+
+
+def test_sub_daily_cadence(grid, field, tmp_path):
+    simulation = Simulation(grid, field, 2.5e8)
+    with SnapshotWriter(tmp_path / 'run.h5', grid, cadence=0.5) as writer:
+        simulation.run(2, step_hooks=[writer])
+
+    with SnapshotReader(tmp_path / 'run.h5') as reader:
+        np.testing.assert_allclose(reader.time, [0, 0.5, 1, 1.5, 2], atol=0.5 / simulation.steps_per_day)
+
+
+def test_resume_truncates_to_the_checkpoint(grid, field, tmp_path):
+    with SnapshotWriter(tmp_path / 'run.h5', grid) as writer:
+        for day in range(5):
+            writer.write(field * day, day)
+        state = writer.state_dict()
+        writer.write(field * 5, 5)
+
+    with SnapshotWriter(tmp_path / 'run.h5', grid, resume=True) as writer:
+        writer.load_state_dict(state)
+        writer.write(-field, 5)
+
+    with SnapshotReader(tmp_path / 'run.h5') as reader:
+        assert len(reader) == 6
+        np.testing.assert_array_equal(reader[5], -field)
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from sft2d import BMRSource, bipole_field, create_grid
+
+
+def _signed_flux(grid, field):
+    area = BMRSource(grid)._area[:, np.newaxis]
+    return np.sum(field[1:-1, 1:-1] * area), np.sum(np.abs(field[1:-1, 1:-1]) * area)
+
+
+@pytest.mark.parametrize('latitude, longitude', [(20.0, 100.0), (-15.0, 359.5), (5.0, 0.2)])
+def test_region_is_flux_balanced(fine_grid, latitude, longitude):
+    field = bipole_field(fine_grid, latitude, longitude, 1e22, 5.0, 5.0)
+    signed, unsigned = _signed_flux(fine_grid, field)
+    assert unsigned == pytest.approx(1e22, rel=1e-12)
+    assert abs(signed) < 1e-12 * unsigned
+    # Periodic ghost columns follow the ring
+    np.testing.assert_array_equal(field[:, 0], field[:, -2])
+    np.testing.assert_array_equal(field[:, -1], field[:, 1])
+
+
+def test_hale_law(fine_grid):
+    # Leading polarity (east of the centre) positive in the north and negative in the south
+    east = (np.degrees(fine_grid['longitude']) > 100.0)[np.newaxis, :]
+    north = bipole_field(fine_grid, 20.0, 100.0, 1e22, 0.0, 5.0)
+    south = bipole_field(fine_grid, -20.0, 100.0, 1e22, 0.0, 5.0)
+    assert np.sum(north * east) > 0
+    assert np.sum(south * east) < 0
+
+
+def test_empty_window_raises():
+    coarse = create_grid(45, 90)
+    with pytest.raises(ValueError, match='covers no row'):
+        bipole_field(coarse, 89.5, 0.0, 1e22, 0.0, 0.5, width=0.2)
@@ -0,0 +1,29 @@
+import pytest
+
+from sft2d import Simulation, calculate_cfl_limits, calculate_time_step, fit_time_step
+from sft2d.src.time_step import CFL_LIMITS, DIFFUSION_LIMITS
+
+
+@pytest.mark.parametrize('limit', [86400 / 75, 86400 / 7, 1152.0001, 58940.0, 86400.0, 2e5])
+def test_fitted_steps_never_exceed_limit(limit):
+    time_step, steps = fit_time_step(limit)
+    assert time_step == 86400 / steps
+    assert time_step <= limit * (1 + 1e-12)
+    assert steps == 1 or 86400 / (steps - 1) > limit
+
+
+@pytest.mark.parametrize('polar_filter_latitude', [None, 60.0])
+@pytest.mark.parametrize('limits', [CFL_LIMITS, DIFFUSION_LIMITS])
+def test_time_step_within_cfl_limit(fine_grid, limits, polar_filter_latitude):
+    time_step, steps_per_day = calculate_time_step(fine_grid, 2.5e8, 0.4, limits,
+                                                   polar_filter_latitude=polar_filter_latitude)
+    cfl_limits = calculate_cfl_limits(fine_grid, 2.5e8, polar_filter_latitude=polar_filter_latitude)
+    assert time_step * steps_per_day == pytest.approx(86400)
+    assert time_step <= 0.4 * min(cfl_limits[name] for name in limits) * (1 + 1e-12)
+
+
+def test_time_step_longer_than_a_day_is_rejected(grid, field):
+    with pytest.raises(ValueError):
+        Simulation(grid, field, 2.5e8, integrator='exponential', time_step=27 * 86400)
+    simulation = Simulation(grid, field, 2.5e8, integrator='exponential', time_step=86400)
+    assert simulation.steps_per_day == 1